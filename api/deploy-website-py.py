@@ -1,20 +1,39 @@
 from http.server import BaseHTTPRequestHandler
 import json
 import os
+import sys
+import time
 import logging
 
+# Shared helpers live in backend/ so both deployments store sites the same way
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+from artifact_store import ArtifactStore
+from documents import wrap_document
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Only /tmp is writable on serverless hosts; warm containers keep the store
+_store = None
+
+def get_store() -> ArtifactStore:
+    global _store
+    if _store is None:
+        _store = ArtifactStore(os.getenv("ARTIFACT_STORE_PATH", "/tmp/artifacts"))
+    return _store
+
 class handler(BaseHTTPRequestHandler):
+    def end_headers(self):
+        # CORS headers must follow the status line, so they are added here
+        # rather than before send_response
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        super().end_headers()
+
     def do_POST(self):
         try:
-            # Handle CORS
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            
             # Parse request body
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
@@ -33,23 +52,19 @@ class handler(BaseHTTPRequestHandler):
             # 3. Deploy to Vercel/Netlify using their APIs
             # 4. Return the deployment URL
             
-            # For now, simulate deployment
+            # For now, store the page and simulate deployment
             code = data["code"]
-            prompt = data["prompt"]
-            
-            # Generate a mock deployment URL
-            import hashlib
-            import time
             
-            # Create a unique identifier based on content and timestamp
-            content_hash = hashlib.md5((code + prompt + str(time.time())).encode()).hexdigest()[:8]
-            mock_url = f"https://generated-website-{content_hash}.vercel.app"
+            # Identified by a hash of the page itself, so identical sites dedupe
+            digest, deduplicated = get_store().put(wrap_document(code).encode("utf-8"))
+            mock_url = f"https://generated-website-{digest[:16]}.vercel.app"
             
             result = {
                 "success": True,
                 "url": mock_url,
                 "message": "Website deployed successfully (simulation)",
-                "deployment_id": content_hash,
+                "deployment_id": digest,
+                "deduplicated": deduplicated,
                 "timestamp": time.time()
             }
             
@@ -71,7 +86,4 @@ class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         # Handle preflight CORS request
         self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
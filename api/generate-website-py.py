@@ -1,162 +1,67 @@
 from http.server import BaseHTTPRequestHandler
 import json
 import os
+import sys
 import logging
+import threading
 from typing import Dict, Any
-from datetime import datetime
-from google import genai
+from urllib.parse import parse_qs, urlparse
+
+# The generation core lives in backend/; this handler only adapts it to Vercel
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+from documents import FALLBACK_HEADER, FALLBACK_STATUS, document_chunks, multipart_document, response_format, wrap_document
+from output_compression import ArtifactCache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class WebsiteGenerator:
-    """Website generator using Google Gemini 2.5 Flash for Vercel serverless"""
-    
-    def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY environment variable is required")
-        
-        # Configure Gemini client
-        self.client = genai.Client(api_key=self.api_key)
-        logger.info("Website generator initialized with Gemini 2.5 Flash")
-    
-    async def generate_website(self, prompt: str) -> Dict[str, Any]:
-        """Generate a complete website from a prompt"""
-        logger.info(f"Starting website generation for: {prompt[:100]}...")
-        
-        try:
-            # Create an enhanced prompt for better results
-            enhanced_prompt = f"""
-Create a complete, modern, and visually stunning HTML website based on this description: "{prompt}"
+_artifacts = ArtifactCache(max_bytes=16 * 1024 * 1024)
 
-Requirements:
-1. Use modern HTML5 semantic elements
-2. Include Tailwind CSS classes for beautiful styling (use CDN)
-3. Make it fully responsive for all devices
-4. Add smooth animations and hover effects
-5. Include proper structure with header, main content, and footer
-6. Use modern typography and professional color schemes
-7. Add interactive elements where appropriate
-8. Include placeholder content that fits the theme
-9. Make sure all elements are properly styled and functional
-10. Add some JavaScript for basic interactivity
+def warm_up():
+    """Load the generation core and model SDK ahead of the first request"""
+    from website_generator import warm_up as warm_up_core
+    warm_up_core()
 
-IMPORTANT: Return ONLY the HTML content that goes inside the <body> tag. Do not include <!DOCTYPE html>, <html>, <head>, or <body> tags.
+# Off by default: preflights and validation errors never need the SDK, and a
+# background warm-up competes with them for the interpreter
+if os.getenv("GENERATION_WARM_UP", "false").lower() == "true":
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
 
-The HTML should be production-ready and look professional with:
-- Beautiful design with modern UI/UX principles
-- Smooth animations using CSS transitions and JavaScript
-- Proper spacing and typography
-- Consistent color scheme
-- Mobile-first responsive design
-- Accessibility features
+def generate_result(prompt: str, allow_fallback: bool = False) -> Dict[str, Any]:
+    """Run a generation on the shared generator, raising if it fell back unless ``allow_fallback``"""
+    # Imported here so preflights and bad requests never load the model SDK
+    from website_generator import shared_generator, shared_runner
+    generator = shared_generator()
+    result = shared_runner().run(generator.generate_website(prompt))
+    if result["errors"] and not allow_fallback:
+        raise Exception(f"Failed to generate website: {result['errors'][0]}")
+    return result
 
-Example themes you might consider:
-- Business/Corporate websites
-- Portfolio/Personal websites
-- E-commerce/Product showcase
-- Blog/Content websites
-- Landing pages
-- Creative/Agency websites
-- Educational/Learning platforms
+def summarize(prompt: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "prompt": prompt,
+        "timestamp": result["metadata"]["generation_timestamp"],
+        "model": result["metadata"]["model"],
+        "success": not result["errors"]
+    }
 
-Please generate clean, semantic HTML with Tailwind CSS classes that creates a visually appealing and functional website.
-"""
-
-            # Generate content using Gemini
-            response = await self.client.models.generate_content_async(
-                model="gemini-2.5-flash",
-                contents=[enhanced_prompt]
-            )
-            
-            if not response or not response.text:
-                raise Exception("Empty response from Gemini API")
-            
-            html_content = response.text.strip()
-            
-            # Clean up the response - remove any markdown code blocks if present
-            if html_content.startswith("```html"):
-                html_content = html_content[7:]
-            elif html_content.startswith("```"):
-                html_content = html_content[3:]
-            
-            if html_content.endswith("```"):
-                html_content = html_content[:-3]
-            
-            html_content = html_content.strip()
-            
-            # Wrap in complete HTML document
-            complete_html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Generated Website</title>
-    <script src="https://cdn.tailwindcss.com"></script>
-    <style>
-        @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap');
-        body {{ font-family: 'Inter', sans-serif; }}
-        .fade-in {{ animation: fadeIn 0.6s ease-out; }}
-        @keyframes fadeIn {{ from {{ opacity: 0; transform: translateY(20px); }} to {{ opacity: 1; transform: translateY(0); }} }}
-        .hover-scale {{ transition: transform 0.2s ease; }}
-        .hover-scale:hover {{ transform: scale(1.05); }}
-        .gradient-bg {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); }}
-        .glass {{ background: rgba(255, 255, 255, 0.1); backdrop-filter: blur(10px); border: 1px solid rgba(255, 255, 255, 0.2); }}
-    </style>
-</head>
-<body>
-{html_content}
-<script>
-    // Add smooth scrolling and fade-in animations
-    document.addEventListener('DOMContentLoaded', function() {{
-        // Add fade-in class to elements
-        const elements = document.querySelectorAll('section, .card, .feature');
-        elements.forEach((el, index) => {{
-            setTimeout(() => {{
-                el.classList.add('fade-in');
-            }}, index * 100);
-        }});
-        
-        // Smooth scrolling for navigation links
-        document.querySelectorAll('a[href^="#"]').forEach(anchor => {{
-            anchor.addEventListener('click', function (e) {{
-                e.preventDefault();
-                const target = document.querySelector(this.getAttribute('href'));
-                if (target) {{
-                    target.scrollIntoView({{ behavior: 'smooth', block: 'start' }});
-                }}
-            }});
-        }});
-    }});
-</script>
-</body>
-</html>"""
-            
-            result = {
-                "html": complete_html,
-                "prompt": prompt,
-                "timestamp": datetime.now().isoformat(),
-                "model": "gemini-2.5-flash",
-                "success": True
-            }
-            
-            logger.info("Website generation completed successfully")
-            return result
-            
-        except Exception as e:
-            logger.error(f"Error generating website: {e}")
-            raise Exception(f"Failed to generate website: {str(e)}")
+def website_payload(prompt: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """The JSON response: a generation wrapped in a complete HTML document"""
+    return dict(summarize(prompt, result), html=wrap_document(result["html_code"], stylesheet=result["stylesheet"]))
 
 class handler(BaseHTTPRequestHandler):
+    def end_headers(self):
+        # CORS headers must follow the status line, so they are added here
+        # rather than before send_response
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Expose-Headers', FALLBACK_HEADER)
+        super().end_headers()
+
     def do_POST(self):
         try:
-            # Handle CORS
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            
             # Parse request body
             content_length = int(self.headers['Content-Length'])
             post_data = self.rfile.read(content_length)
@@ -170,17 +75,37 @@ class handler(BaseHTTPRequestHandler):
                 return
             
             prompt = data["prompt"]
+            query = parse_qs(urlparse(self.path).query)
+            output = response_format(query.get("format", [None])[0], self.headers.get('Accept'))
+            if output is None:
+                self.send_response(400)
+                self.send_header('Content-type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps({"error": "format must be json, html or multipart"}).encode())
+                return
+
+            if output != "json":
+                self.send_document(prompt, output)
+                return
             
             # Generate website
-            generator = WebsiteGenerator()
-            import asyncio
-            result = asyncio.run(generator.generate_website(prompt))
+            result = generate_result(prompt)
             
-            # Send response
+            # Send response, compressed if the client accepts it. Only a cache
+            # hit repeats an earlier body byte for byte, so only those are kept
+            body, encoding = _artifacts.encode(
+                json.dumps(website_payload(prompt, result)).encode(),
+                self.headers.get('Accept-Encoding'),
+                cache=result["metadata"].get("cache") == "hit",
+            )
             self.send_response(200)
             self.send_header('Content-type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Vary', 'Accept-Encoding')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
             self.end_headers()
-            self.wfile.write(json.dumps(result).encode())
+            self.wfile.write(body)
             
         except Exception as e:
             logger.error(f"Error in handler: {e}")
@@ -189,10 +114,33 @@ class handler(BaseHTTPRequestHandler):
             self.end_headers()
             self.wfile.write(json.dumps({"error": str(e)}).encode())
     
+    def send_document(self, prompt: str, output: str):
+        """Write the page as raw text/html, or multipart after a small JSON header.
+
+        The wrapper and the body go out as separate chunks: the document is
+        never joined into one string or escaped into JSON. A fallback page is
+        sent too, marked the same way as by the backend server.
+        """
+        result = generate_result(prompt, allow_fallback=True)
+        chunks = document_chunks(result["html_code"], stylesheet=result["stylesheet"])
+        content_type = 'text/html; charset=utf-8'
+        if output == "multipart":
+            content_type, chunks = multipart_document(summarize(prompt, result), chunks)
+        # Compressed piece by piece, like the JSON response but never cached
+        chunks, encoding = _artifacts.encode_chunks(chunks, self.headers.get('Accept-Encoding'))
+        self.send_response(FALLBACK_STATUS if result["errors"] else 200)
+        self.send_header('Content-type', content_type)
+        self.send_header('Content-Length', str(sum(len(chunk) for chunk in chunks)))
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        if result["errors"]:
+            self.send_header(FALLBACK_HEADER, '1')
+        self.end_headers()
+        for chunk in chunks:
+            self.wfile.write(chunk)
+
     def do_OPTIONS(self):
         # Handle preflight CORS request
         self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
@@ -1,12 +1,26 @@
 import json
 import os
-from google import genai
+import sys
 import logging
+import threading
+
+# The generation core lives in backend/; this handler only adapts it to Vercel
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def warm_up():
+    """Load the generation core and model SDK ahead of the first request"""
+    from website_generator import warm_up as warm_up_core
+    warm_up_core()
+
+# Off by default: preflights and validation errors never need the SDK, and a
+# background warm-up competes with them for the interpreter
+if os.getenv("GENERATION_WARM_UP", "false").lower() == "true":
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
 def handler(request):
     """Vercel serverless handler for website generation"""
     
@@ -36,7 +50,7 @@ def handler(request):
     try:
         # Get the API key
         api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+        if not api_key and os.getenv("MODEL_BACKEND", "gemini") == "gemini":
             return {
                 'statusCode': 500,
                 'headers': headers,
@@ -69,52 +83,13 @@ def handler(request):
         prompt = data["prompt"]
         logger.info(f"Generating website for prompt: {prompt[:100]}...")
         
-        # Initialize Gemini client
-        client = genai.Client(api_key=api_key)
-        
-        # Create enhanced prompt
-        enhanced_prompt = f"""
-Create a complete, modern, and visually stunning HTML website based on this description: "{prompt}"
-
-Requirements:
-1. Use modern HTML5 semantic elements
-2. Include Tailwind CSS classes for beautiful styling (use CDN)
-3. Make it fully responsive for all devices
-4. Add smooth animations and hover effects
-5. Include proper structure with header, main content, and footer
-6. Use modern typography and professional color schemes
-7. Add interactive elements where appropriate
-8. Include placeholder content that fits the theme
-9. Make sure all elements are properly styled and functional
-10. Add some JavaScript for basic interactivity
-
-IMPORTANT: Return ONLY the HTML content that goes inside the <body> tag. Do not include <!DOCTYPE html>, <html>, <head>, or <body> tags.
-
-The HTML should be production-ready and look professional with:
-- Beautiful design with modern UI/UX principles
-- Smooth animations using CSS transitions and JavaScript
-- Proper spacing and typography
-- Consistent color scheme
-- Professional layout and structure
-"""
-        
-        # Generate content using Gemini
-        response = client.models.generate_content(
-            model='gemini-2.0-flash-exp',
-            contents=[{
-                'parts': [{'text': enhanced_prompt}]
-            }]
-        )
-        
-        html_content = response.candidates[0].content.parts[0].text
-        
-        # Clean up the response
-        html_content = html_content.strip()
-        if html_content.startswith('```html'):
-            html_content = html_content[7:]
-        if html_content.endswith('```'):
-            html_content = html_content[:-3]
-        html_content = html_content.strip()
+        # Generate with the shared core on the warm generator and event loop;
+        # imported here so preflights and bad requests never load the model SDK
+        from website_generator import shared_generator, shared_runner
+        result = shared_runner().run(shared_generator().generate_website(prompt))
+        if result["errors"]:
+            raise Exception(result["errors"][0])
+        html_content = result["html_code"]
         
         logger.info("Website generated successfully")
         
@@ -123,6 +98,7 @@ The HTML should be production-ready and look professional with:
             'headers': headers,
             'body': json.dumps({
                 'html': html_content,
+                'stylesheet': result['stylesheet'],
                 'message': 'Website generated successfully'
             })
         }
@@ -2,20 +2,22 @@ from http.server import BaseHTTPRequestHandler
 import json
 import os
 import logging
-from google import genai
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class handler(BaseHTTPRequestHandler):
+    def end_headers(self):
+        # CORS headers must follow the status line, so they are added here
+        # rather than before send_response
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        super().end_headers()
+
     def do_GET(self):
         try:
-            # Handle CORS
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-            self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-            
             logger.info('=== TESTING GEMINI API (Python Serverless) ===')
             
             api_key = os.getenv('GEMINI_API_KEY')
@@ -33,7 +35,9 @@ class handler(BaseHTTPRequestHandler):
                 }).encode())
                 return
             
-            # Test simple API call using Gemini 2.5 Flash
+            # Test simple API call using Gemini 2.5 Flash; the SDK is imported
+            # only here so preflights don't pay for it on a cold start
+            from google import genai
             client = genai.Client(api_key=api_key)
             
             import asyncio
@@ -75,7 +79,4 @@ class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         # Handle preflight CORS request
         self.send_response(200)
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
@@ -1,6 +1,5 @@
 import json
 import os
-from google import genai
 
 def handler(request):
     """Test Gemini API connection"""
@@ -34,7 +33,9 @@ def handler(request):
                 })
             }
         
-        # Test simple API call using Gemini
+        # Test simple API call using Gemini; the SDK is imported only here so
+        # preflights don't pay for it on a cold start
+        from google import genai
         client = genai.Client(api_key=api_key)
         
         response = client.models.generate_content(
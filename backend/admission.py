@@ -0,0 +1,188 @@
+from typing import Dict, Any, List, Optional, Union
+from collections import OrderedDict
+import asyncio
+import ipaddress
+import logging
+import math
+import time
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request should be answered with 429 instead of queued"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class AdmissionTooCostly(AdmissionRejected):
+    """Raised when a request costs more than a bucket can ever hold, so retrying can't help"""
+
+
+def parse_networks(value: str) -> List[Network]:
+    """Comma-separated addresses or CIDR ranges, e.g. ``10.0.0.0/8, 127.0.0.1``"""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip()]
+
+
+def _trusted(address: str, trusted: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in trusted)
+
+
+def resolve_client_id(remote_addr: Optional[str], forwarded_for: Optional[str], trusted: List[Network]) -> str:
+    """The address a request came from, for per-client rate limiting.
+
+    X-Forwarded-For is only believed when the peer is a trusted proxy, and
+    then read from the right: each trusted hop vouches for the one before it,
+    so the first untrusted address is the client. Anything further left was
+    written by the client and may be forged.
+    """
+    client = remote_addr or "unknown"
+    if not forwarded_for or not _trusted(client, trusted):
+        return client
+    for hop in reversed([part.strip() for part in forwarded_for.split(",") if part.strip()]):
+        client = hop
+        if not _trusted(hop, trusted):
+            break
+    return client
+
+
+class TokenBucket:
+    """Token bucket that allows reservations past zero.
+
+    ``reserve`` always takes tokens and returns how long the caller must wait
+    until the bucket is back at zero, which gives FIFO queueing for free.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, cost: float = 1.0) -> float:
+        """Seconds until ``cost`` tokens would be available, without taking them"""
+        self._refill(time.monotonic())
+        return max(0.0, (cost - self.tokens) / self.rate)
+
+    def reserve(self, cost: float = 1.0) -> float:
+        self._refill(time.monotonic())
+        self.tokens -= cost
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, cost: float = 1.0) -> None:
+        self.tokens = min(self.capacity, self.tokens + cost)
+
+
+class AdmissionController:
+    """Admission control in front of generation.
+
+    Each client has its own token bucket and is rejected immediately when it
+    runs dry. Requests that pass are metered by a global bucket; when that is
+    empty they wait in a bounded FIFO queue, and are rejected with a retry hint
+    if the queue is full or the wait would exceed ``max_wait``.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        global_rate: float,
+        global_burst: float,
+        client_rate: float,
+        client_burst: float,
+        max_queue: int,
+        max_wait: float,
+        max_clients: int = 10000,
+    ):
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_clients = max_clients
+        self._clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+        self.queue_depth = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.max_observed_wait = 0.0
+
+    def _client_bucket(self, client_id: str) -> TokenBucket:
+        bucket = self._clients.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.client_rate, self.client_burst)
+            self._clients[client_id] = bucket
+            if len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client_id)
+        return bucket
+
+    async def admit(self, client_id: str, cost: float = 1.0) -> float:
+        """Wait for admission and return the seconds spent queued"""
+        capacity = min(self.client_burst, self.global_bucket.capacity)
+        if cost > capacity:
+            self.rejected += 1
+            raise AdmissionTooCostly(f"request costs {cost:g} but at most {capacity:g} can be admitted at once", 0.0)
+
+        client_bucket = self._client_bucket(client_id)
+        client_delay = client_bucket.delay(cost)
+        if client_delay > 0:
+            self._reject("client rate limit exceeded", client_delay)
+
+        if self.queue_depth >= self.max_queue:
+            self._reject("generation queue is full", self.global_bucket.delay(cost) or 1.0)
+
+        wait = self.global_bucket.reserve(cost)
+        if wait > self.max_wait:
+            self.global_bucket.refund(cost)
+            self._reject("generation queue delay too long", wait)
+        client_bucket.reserve(cost)
+
+        if wait > 0:
+            self.queue_depth += 1
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self.global_bucket.refund(cost)
+                raise
+            finally:
+                self.queue_depth -= 1
+
+        self.admitted += 1
+        self.total_wait += wait
+        self.max_observed_wait = max(self.max_observed_wait, wait)
+        return wait
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        self.rejected += 1
+        logger.warning(f"Admission rejected: {reason} (retry after {retry_after:.1f}s)")
+        raise AdmissionRejected(reason, retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "average_wait_seconds": self.total_wait / self.admitted if self.admitted else 0.0,
+            "max_wait_seconds": self.max_observed_wait,
+        }
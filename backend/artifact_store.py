@@ -0,0 +1,117 @@
+from typing import Dict, Optional, Tuple
+import hashlib
+import logging
+import os
+import re
+import tempfile
+
+from output_compression import CompressedArtifact, brotli
+
+logger = logging.getLogger(__name__)
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+# Precompressed sidecars written next to each blob, by content coding
+SIDECAR_SUFFIXES = {"gzip": ".gz", "br": ".br"}
+
+
+class ArtifactStore:
+    """Content-addressed blob store on the local filesystem.
+
+    Blobs live at ``root/ab/cd/<sha256>`` so identical content is stored once
+    and repeated puts only hash and stat. Writes go to a temporary file in the
+    target directory and are renamed into place, so readers never see a
+    partial blob. Gzip (and brotli, when installed) sidecars are written once
+    at put time so serving never compresses. ``put_blob`` stores the blob
+    alone so it can be served at once; until ``precompress`` writes its
+    sidecars it is served uncompressed.
+    """
+
+    def __init__(self, root: str, gzip_level: int = 9, brotli_quality: int = 11):
+        self.root = root
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def path(self, digest: str, coding: Optional[str] = None) -> str:
+        if not _DIGEST.match(digest):
+            raise ValueError(f"Invalid artifact digest: {digest}")
+        path = os.path.join(self.root, digest[:2], digest[2:4], digest)
+        return path + SIDECAR_SUFFIXES[coding] if coding else path
+
+    def exists(self, digest: str) -> bool:
+        try:
+            return os.path.exists(self.path(digest))
+        except ValueError:
+            return False
+
+    def put(self, data: bytes) -> Tuple[str, bool]:
+        """Store ``data`` and return its digest and whether it was already stored"""
+        digest = self.digest(data)
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest, True
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.precompress(digest, data)
+        # The blob goes last: once it exists its sidecars do too
+        self._write_atomic(path, data)
+        logger.info(f"Stored artifact {digest} ({len(data)} bytes)")
+        return digest, False
+
+    def put_blob(self, data: bytes) -> Tuple[str, bool]:
+        """Store ``data`` without its sidecars, like ``put`` but without compressing"""
+        digest = self.digest(data)
+        path = self.path(digest)
+        if os.path.exists(path):
+            return digest, True
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._write_atomic(path, data)
+        logger.info(f"Stored artifact {digest} ({len(data)} bytes, sidecars pending)")
+        return digest, False
+
+    def precompress(self, digest: str, data: bytes) -> None:
+        """Write whichever sidecars of a blob are missing"""
+        missing = [coding for coding in SIDECAR_SUFFIXES if not os.path.exists(self.path(digest, coding))]
+        if not missing:
+            return
+        os.makedirs(os.path.dirname(self.path(digest)), exist_ok=True)
+        artifact = CompressedArtifact(data, self.gzip_level, self.brotli_quality, etag=digest).precompress()
+        for coding, encoded in artifact.variants.items():
+            if coding in missing:
+                self._write_atomic(self.path(digest, coding), encoded)
+
+    def get(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self.path(digest), "rb") as f:
+                return f.read()
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def sidecars(self, digest: str) -> Dict[str, str]:
+        """Paths of the precompressed variants available for a blob"""
+        available = {}
+        for coding in SIDECAR_SUFFIXES:
+            if coding == "br" and brotli is None:
+                continue
+            path = self.path(digest, coding)
+            if os.path.exists(path):
+                available[coding] = path
+        return available
+
+    def _write_atomic(self, path: str, data: bytes) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
@@ -0,0 +1,220 @@
+"""ASGI serving mode for the website generator backend.
+
+Run with:
+    uvicorn asgi:app --port 8000
+
+Generation, health and metrics endpoints are served natively: requests await their
+generation on the shared event loop, so in-flight generations are bounded by
+GENERATION_CONCURRENCY rather than by the number of server threads. All other
+routes (cache invalidation, deploy, ...) fall through to the Flask app.
+"""
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+import metrics
+from a2wsgi import WSGIMiddleware
+
+from admission import resolve_client_id
+from documents import FALLBACK_HEADER, response_format
+from main import (
+    ALLOWED_ORIGINS,
+    SSE_HEADERS,
+    TRUSTED_PROXIES,
+    admit,
+    encode_body,
+    app as flask_app,
+    health_status,
+    profile_requested,
+    raw_result,
+    run_generation,
+    runner,
+    serialize_result,
+    stream_generation,
+    stream_variants,
+    validate_generation_request,
+    validate_variants_request,
+)
+
+logger = logging.getLogger(__name__)
+
+flask_fallback = WSGIMiddleware(flask_app)
+
+
+async def read_json(receive):
+    body = bytearray()
+    while True:
+        message = await receive()
+        body.extend(message.get("body", b""))
+        if not message.get("more_body"):
+            break
+    try:
+        return json.loads(body) if body else None
+    except ValueError:
+        return None
+
+
+def response_headers(scope, content_type, extra=None):
+    headers = [(b"content-type", content_type.encode())]
+    origin = dict(scope["headers"]).get(b"origin", b"").decode()
+    if origin in ALLOWED_ORIGINS:
+        headers.append((b"access-control-allow-origin", origin.encode()))
+        headers.append((b"access-control-expose-headers", FALLBACK_HEADER.encode()))
+        headers.append((b"vary", b"Origin"))
+    for name, value in (extra or {}).items():
+        headers.append((name.lower().encode(), value.encode()))
+    return headers
+
+
+def client_id(scope):
+    forwarded = dict(scope["headers"]).get(b"x-forwarded-for")
+    client = scope.get("client")
+    return resolve_client_id(client[0] if client else None, forwarded.decode() if forwarded else None, TRUSTED_PROXIES)
+
+
+async def send_json(scope, send, payload, status, headers=None):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": response_headers(scope, "application/json", headers),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def on_loop(coro):
+    """Await a coroutine on the shared generation loop from the server's loop"""
+    return await asyncio.wrap_future(runner.submit(coro))
+
+
+async def next_event(events):
+    return await events.__anext__()
+
+
+async def close_events(events):
+    await events.aclose()
+
+
+async def generate(scope, receive, send):
+    data = await read_json(receive)
+    query = parse_qs(scope.get("query_string", b"").decode())
+    output = response_format(query.get("format", [None])[0], (dict(scope["headers"]).get(b"accept") or b"").decode())
+    if output is None:
+        await send_json(scope, send, {"error": "format must be json, html or multipart"}, 400)
+        return
+    flag = query.get("profile", [None])[0]
+    flag = flag or (dict(scope["headers"]).get(b"x-profile") or b"").decode() or None
+    payload, status, headers = await on_loop(run_generation(data, client_id(scope), profile_requested(flag)))
+    if output != "json" and status == 200:
+        status, content_type, chunks, headers = raw_result(
+            payload, output, headers, dict(scope["headers"]).get(b"accept-encoding", b"").decode()
+        )
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": response_headers(scope, content_type, headers),
+        })
+        for chunk in chunks:
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+        return
+    body, headers = serialize_result(payload, headers)
+    body, encoding = encode_body(body.encode(), dict(scope["headers"]).get(b"accept-encoding", b"").decode())
+    headers = dict(headers, Vary="Accept-Encoding")
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": response_headers(scope, "application/json", headers),
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def send_events(scope, send, events):
+    """Relay an SSE async generator running on the generation loop"""
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": response_headers(scope, "text/event-stream", SSE_HEADERS),
+    })
+    try:
+        while True:
+            try:
+                event = await on_loop(next_event(events))
+            except StopAsyncIteration:
+                break
+            await send({"type": "http.response.body", "body": event.encode(), "more_body": True})
+    finally:
+        await on_loop(close_events(events))
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def generate_stream(scope, receive, send):
+    data = await read_json(receive)
+    error = validate_generation_request(data)
+    if error:
+        payload, status = error
+        await send_json(scope, send, payload, status)
+        return
+    rejection = await on_loop(admit(client_id(scope)))
+    if rejection:
+        await send_json(scope, send, *rejection)
+        return
+    await send_events(scope, send, stream_generation(data["prompt"]))
+
+
+async def generate_variants(scope, receive, send):
+    data = await read_json(receive)
+    error = validate_variants_request(data)
+    if error:
+        payload, status = error
+        await send_json(scope, send, payload, status)
+        return
+    rejection = await on_loop(admit(client_id(scope), data.get("variants", 3)))
+    if rejection:
+        await send_json(scope, send, *rejection)
+        return
+    await send_events(scope, send, stream_variants(data))
+
+
+async def health(scope, receive, send):
+    payload, status = health_status()
+    await send_json(scope, send, payload, status)
+
+
+async def metrics_endpoint(scope, receive, send):
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": response_headers(scope, metrics.CONTENT_TYPE),
+    })
+    await send({"type": "http.response.body", "body": metrics.render().encode()})
+
+
+ROUTES = {
+    ("GET", "/health"): health,
+    ("GET", "/metrics"): metrics_endpoint,
+    ("POST", "/generate-website"): generate,
+    ("POST", "/generate-website/stream"): generate_stream,
+    ("POST", "/generate-website/variants"): generate_variants,
+}
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                runner.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    route = ROUTES.get((scope.get("method"), scope.get("path")))
+    if route is None:
+        await flask_fallback(scope, receive, send)
+        return
+    await route(scope, receive, send)
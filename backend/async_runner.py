@@ -0,0 +1,73 @@
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+import asyncio
+import concurrent.futures
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class AsyncRunner:
+    """A single long-lived event loop running on a background thread.
+
+    Every generation coroutine is scheduled on this loop, so model calls from
+    all request threads share one loop and one set of HTTP connections instead
+    of each request creating and tearing down its own with ``asyncio.run``.
+    """
+
+    def __init__(self, name: str = "generation-loop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        logger.info(f"Async runner '{name}' started")
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Awaitable[Any]) -> concurrent.futures.Future:
+        """Schedule a coroutine on the loop and return a thread-safe future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the loop and block the calling thread for its result"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    def iterate(self, agen: AsyncIterator[Any]) -> Iterator[Any]:
+        """Drive an async iterator on the loop and yield its items to a sync caller"""
+        items: "queue.Queue[Any]" = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in agen:
+                    items.put(item)
+            except Exception as e:
+                items.put(e)
+            finally:
+                items.put(_DONE)
+
+        future = self.submit(pump())
+        try:
+            while True:
+                item = items.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # The consumer went away (e.g. client disconnected): stop the producer
+            if not future.done():
+                future.cancel()
+
+    def shutdown(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
@@ -0,0 +1,93 @@
+"""Micro-benchmark: single-pass HtmlCleaner vs the old replace-chain cleaner.
+
+Usage (from backend/):
+    python benchmarks/bench_html_cleaner.py [--size-kb 50 200] [--number 200]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_cleaner import HtmlCleaner, clean_html
+
+
+def legacy_clean(html: str) -> str:
+    """The previous WebsiteGeneratorGraph._clean_html_response implementation"""
+    html = html.replace("```html", "").replace("```", "")
+    html = html.replace("<!DOCTYPE html>", "")
+    html = html.replace("<html>", "").replace("</html>", "")
+    html = html.replace("<body>", "").replace("</body>", "")
+    import re
+    html = re.sub(r'<head[^>]*>.*?</head>', '', html, flags=re.DOTALL | re.IGNORECASE)
+    return html.strip()
+
+
+SECTION = """
+    <section id="features" class="py-20 px-4 bg-white">
+        <div class="max-w-6xl mx-auto grid grid-cols-1 md:grid-cols-3 gap-8">
+            <div class="text-center p-6 rounded-lg shadow hover:shadow-lg transition-shadow">
+                <h3 class="text-xl font-semibold mb-2">Feature</h3>
+                <p class="text-gray-600">Placeholder copy for a generated feature card.</p>
+            </div>
+        </div>
+    </section>
+"""
+
+# Inputs both cleaners must agree on, whole and fed in small chunks: a head
+# that is never closed, and a "<head>" that is only text inside a script
+EDGE_CASES = [
+    "<head><title>x</title><div>hi</div>",
+    '<div>a</div><script>const s="<head>";</script><p>rest</p>',
+]
+
+
+def make_document(size_kb: int) -> str:
+    """Build a model-style response of roughly the requested size"""
+    body = SECTION * max(1, (size_kb * 1024) // len(SECTION))
+    return (
+        "```html\n<!DOCTYPE html>\n<html>\n<head>\n<title>Generated</title>\n</head>\n<body>\n"
+        + body
+        + "\n<script>document.querySelectorAll('a').forEach(a => a.classList.add('x'));</script>\n"
+        + "</body>\n</html>\n```"
+    )
+
+
+def chunked_clean(html: str, chunk_size: int = 256) -> str:
+    cleaner = HtmlCleaner()
+    parts = [cleaner.feed(html[i:i + chunk_size]) for i in range(0, len(html), chunk_size)]
+    parts.append(cleaner.close())
+    return "".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-kb", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    for document in EDGE_CASES:
+        expected = legacy_clean(document)
+        assert clean_html(document) == expected, document
+        for chunk_size in (1, 3, 7):
+            assert chunked_clean(document, chunk_size) == expected, (document, chunk_size)
+
+    print(f"{'size':>8} {'legacy ms':>10} {'single-pass ms':>15} {'chunked ms':>11} {'speedup':>8}")
+    for size_kb in args.size_kb:
+        document = make_document(size_kb)
+        assert clean_html(document) == legacy_clean(document) == chunked_clean(document)
+
+        timings = {}
+        for name, func in (("legacy", legacy_clean), ("single", clean_html), ("chunked", chunked_clean)):
+            best = min(timeit.repeat(lambda: func(document), number=args.number, repeat=5))
+            timings[name] = best / args.number * 1000
+
+        print(
+            f"{size_kb:>6}KB {timings['legacy']:>10.3f} {timings['single']:>15.3f} "
+            f"{timings['chunked']:>11.3f} {timings['legacy'] / timings['single']:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
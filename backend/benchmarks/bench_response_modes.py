@@ -0,0 +1,76 @@
+"""Micro-benchmark: CPU time and peak memory of building a generation response.
+
+Compares the JSON response (the page wrapped into one string, escaped by
+json.dumps and encoded) with the raw text/html and multipart modes, which
+hand the server the page as separate byte chunks. Uses a synthetic page of
+--kb kilobytes with the quotes and newlines that make JSON escaping costly.
+
+Usage (from backend/):
+    python benchmarks/bench_response_modes.py [--kb 300] [--iterations 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from documents import document_chunks, multipart_document, wrap_document
+
+SECTION = (
+    '<section class="py-16 px-6 bg-white">\n'
+    '  <h2 class="text-3xl font-bold text-gray-900">Fresh bread, every "single" morning</h2>\n'
+    '  <p class="mt-4 text-lg text-gray-600">Sourdough, rye &amp; brioche baked before dawn.</p>\n'
+    '  <img src="https://picsum.photos/800/600" alt="Loaves on a rack" class="rounded-xl shadow-lg">\n'
+    '</section>\n'
+)
+HEADER = {"prompt": "a bakery", "timestamp": "2025-01-01T00:00:00", "model": "stub", "success": True}
+
+
+def json_mode(body, stylesheet):
+    result = dict(HEADER, html=wrap_document(body, stylesheet=stylesheet))
+    return [json.dumps(result).encode()]
+
+
+def html_mode(body, stylesheet):
+    return document_chunks(body, stylesheet=stylesheet)
+
+
+def multipart_mode(body, stylesheet):
+    return multipart_document(HEADER, document_chunks(body, stylesheet=stylesheet))[1]
+
+
+def measure(build, body, stylesheet, iterations):
+    build(body, stylesheet)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        chunks = build(body, stylesheet)
+    elapsed_ms = (time.perf_counter() - started) * 1000 / iterations
+    size = sum(len(chunk) for chunk in chunks)
+    del chunks
+
+    tracemalloc.start()
+    chunks = build(body, stylesheet)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed_ms, peak, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kb", type=int, default=300)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    body = SECTION * (args.kb * 1024 // len(SECTION))
+    stylesheet = ".py-16{padding-top:4rem;padding-bottom:4rem}\n" * 200
+    print(f"page body {len(body) / 1024:.0f} KB, stylesheet {len(stylesheet) / 1024:.0f} KB")
+    for name, build in (("json", json_mode), ("html", html_mode), ("multipart", multipart_mode)):
+        elapsed_ms, peak, size = measure(build, body, stylesheet, args.iterations)
+        print(f"{name:10} {elapsed_ms:7.3f} ms/response  peak {peak / 1024:8.0f} KB  body {size / 1024:6.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Micro-benchmark: SimilarityIndex lookup latency and memory as the index grows.
+
+The index is filled with random signatures (as many as --entries) plus a set
+of real prompts, then timed on lookups of near-duplicate and unrelated
+prompts. Signatures are random so building a million entries takes seconds
+rather than hashing a million prompts.
+
+Usage (from backend/):
+    python benchmarks/bench_similarity_index.py [--entries 1000000] [--lookups 2000]
+"""
+import argparse
+import hashlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similarity_index import SimilarityIndex
+
+PROMPTS = [
+    "A landing page for a coffee shop",
+    "Portfolio website for a wedding photographer",
+    "SaaS pricing page for a project management tool",
+    "Online store for handmade ceramics",
+    "Blog for a travel writer exploring Japan",
+    "Restaurant site with menu and reservations",
+]
+NEAR_DUPLICATES = [
+    "landing page for coffee shop!",
+    "portfolio website for a wedding photographer.",
+    "SaaS pricing page for project management tool",
+    "online store for handmade ceramics",
+    "A blog for a travel writer exploring Japan",
+    "restaurant site with a menu and reservations",
+]
+UNRELATED = ["Dashboard for a solar farm", "Fan page for a chess club", "Agency site for a law firm"]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    args = parser.parse_args()
+
+    index = SimilarityIndex()
+    rng = random.Random(1)
+    started = time.perf_counter()
+    index.extend((rng.randbytes(index.num_bins), rng.randbytes(32)) for _ in range(args.entries))
+    for prompt in PROMPTS:
+        index.add(prompt, hashlib.sha256(prompt.encode()).hexdigest())
+    print(f"built {len(index):,} entries in {time.perf_counter() - started:.1f}s, "
+          f"{index.stats()['bytes'] / len(index):.0f} bytes/entry ({index.stats()['bytes'] / 2**20:.0f} MiB)")
+
+    for label, queries in (("near-duplicate", NEAR_DUPLICATES), ("unrelated", UNRELATED)):
+        timings = []
+        found = 0
+        for i in range(args.lookups):
+            query = queries[i % len(queries)]
+            t = time.perf_counter()
+            match = index.lookup(query)
+            timings.append((time.perf_counter() - t) * 1e6)
+            found += bool(match)
+        print(f"{label:15} p50 {percentile(timings, 0.5):6.0f}us  p99 {percentile(timings, 0.99):6.0f}us  "
+              f"matched {found / args.lookups:.0%}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "similarity.idx")
+        t = time.perf_counter()
+        index.save(path)
+        saved = time.perf_counter() - t
+        t = time.perf_counter()
+        loaded = SimilarityIndex(path=path)
+        print(f"save {saved:.2f}s, load {time.perf_counter() - t:.2f}s, "
+              f"{os.path.getsize(path) / 2**20:.0f} MiB on disk, {len(loaded):,} entries")
+
+
+if __name__ == "__main__":
+    main()
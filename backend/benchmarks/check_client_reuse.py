@@ -0,0 +1,111 @@
+"""Check that warm serverless handlers reuse one Gemini client.
+
+Both generation handlers in api/ are loaded once and called repeatedly, the
+way a warm container serves them, with the SDK replaced by a fake that
+counts ``genai.Client`` constructions and answers instantly. Expects exactly
+one construction across every call to both handlers, and exactly one more
+after GEMINI_API_KEY changes.
+
+Exits non-zero on failure, so it can run as a CI check; no network access or
+SDK install is needed.
+
+Usage (from backend/):
+    python benchmarks/check_client_reuse.py [--calls 20]
+"""
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import threading
+import types
+from http.client import HTTPConnection
+from http.server import HTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "api")
+sys.path.insert(0, BACKEND_DIR)
+
+import model_backends
+
+PAGE = '<section id="hero" class="py-20"><h1 class="text-4xl">Hello</h1></section>'
+
+
+class FakeClient:
+    """Stands in for genai.Client and counts how often one is built"""
+
+    constructions = 0
+
+    def __init__(self, api_key=None):
+        FakeClient.constructions += 1
+        self.api_key = api_key
+        self.aio = types.SimpleNamespace(models=types.SimpleNamespace(generate_content=self._generate))
+
+    async def _generate(self, model, contents, config=None):
+        return types.SimpleNamespace(text=PAGE)
+
+
+def load_handler(name):
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_").replace(".py", ""), os.path.join(API_DIR, name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+
+def call_http_handler(server):
+    connection = HTTPConnection(*server.server_address)
+    connection.request("POST", "/", body=json.dumps({"prompt": "A bakery landing page"}),
+                       headers={"Content-Type": "application/json"})
+    status = connection.getresponse().status
+    connection.close()
+    return status
+
+
+def call_function_handler(handler):
+    request = types.SimpleNamespace(method="POST", json={"prompt": "A bakery landing page"}, body=b"")
+    return handler(request)["statusCode"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["MODEL_BACKEND"] = "gemini"
+    os.environ["GEMINI_API_KEY"] = "test-key-1"
+    model_backends.load_genai = lambda: types.SimpleNamespace(Client=FakeClient, types=types.SimpleNamespace())
+
+    http_handler = load_handler("generate-website-py.py")
+    http_handler.log_message = lambda *a: None
+    server = HTTPServer(("127.0.0.1", 0), http_handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    function_handler = load_handler("generate-website.py")
+
+    failures = []
+    statuses = set()
+    for _ in range(args.calls):
+        statuses.add(call_http_handler(server))
+        statuses.add(call_function_handler(function_handler))
+    print(f"{2 * args.calls} calls, statuses {sorted(statuses)}, {FakeClient.constructions} client constructions")
+    if statuses != {200}:
+        failures.append(f"expected every call to succeed, got statuses {sorted(statuses)}")
+    if FakeClient.constructions != 1:
+        failures.append(f"expected 1 client construction, got {FakeClient.constructions}")
+
+    os.environ["GEMINI_API_KEY"] = "test-key-2"
+    for _ in range(args.calls):
+        call_http_handler(server)
+        call_function_handler(function_handler)
+    print(f"after key rotation: {FakeClient.constructions} client constructions")
+    if FakeClient.constructions != 2:
+        failures.append(f"expected 2 client constructions after key rotation, got {FakeClient.constructions}")
+    server.shutdown()
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
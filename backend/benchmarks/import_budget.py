@@ -0,0 +1,132 @@
+"""Cold-start import budget for the serverless handlers in api/.
+
+Each handler is loaded in a fresh interpreter under ``-X importtime``, then
+answers an OPTIONS preflight and a request that fails validation. The report
+shows the import time the handler adds on top of a bare interpreter, its
+heaviest imports, and whether the model SDK was loaded along the way.
+
+Exits non-zero if a handler goes over --budget-ms or loads google.genai
+before a request needs it, so it can run as a CI check.
+
+Usage (from backend/):
+    python benchmarks/import_budget.py [--budget-ms 100] [--top 5] [--handler generate-website-py.py]
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "api")
+
+SDK_MODULE = "google.genai"
+LOADED_MARKER = "import-budget: loaded"
+
+# Runs in the child interpreter: load the handler, mark the end of its
+# imports on stderr, then exercise the paths that must not need the SDK
+CHILD = r"""
+import importlib.util, json, sys, threading, time
+path = sys.argv[1]
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location("handler_under_test", path)
+module = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(module)
+load_ms = (time.perf_counter() - started) * 1000
+print("import-budget: loaded", file=sys.stderr, flush=True)
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+handler = module.handler
+statuses = []
+if isinstance(handler, type) and issubclass(handler, BaseHTTPRequestHandler):
+    import http.client
+    handler.log_message = lambda *args: None
+    server = HTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    for method, body in (("OPTIONS", None), ("POST", b"{}")):
+        connection = http.client.HTTPConnection(*server.server_address)
+        connection.request(method, "/", body=body, headers={"Content-Type": "application/json"})
+        statuses.append(connection.getresponse().status)
+        connection.close()
+    server.shutdown()
+else:
+    class Request:
+        def __init__(self, method, json):
+            self.method, self.json, self.body = method, json, b"{}"
+    for method in ("OPTIONS", "POST"):
+        statuses.append(handler(Request(method, {}))["statusCode"])
+
+print(json.dumps({"load_ms": load_ms, "statuses": statuses, "sdk_loaded": "google.genai" in sys.modules}))
+"""
+
+
+def parse_importtime(stderr):
+    """(module, self_us, cumulative_us, depth) for each import before the marker"""
+    entries = []
+    for line in stderr.splitlines():
+        if line.startswith(LOADED_MARKER):
+            break
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return entries
+
+
+def baseline_modules(python):
+    """Modules a bare interpreter imports at startup (site, encodings, ...)"""
+    result = subprocess.run([python, "-X", "importtime", "-c", "pass"], capture_output=True, text=True)
+    return {name for name, *_ in parse_importtime(result.stderr)}
+
+
+def measure(python, path, baseline):
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", CHILD, path],
+        capture_output=True, text=True, cwd=BACKEND_DIR,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{os.path.basename(path)} failed to load:\n{result.stderr[-2000:]}")
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    entries = [entry for entry in parse_importtime(result.stderr) if entry[0] not in baseline]
+    top_level = [entry for entry in entries if entry[3] == 0]
+    report["import_ms"] = sum(entry[2] for entry in top_level) / 1000
+    report["heaviest"] = sorted(top_level, key=lambda entry: -entry[2])
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_MS", "100")))
+    parser.add_argument("--top", type=int, default=5)
+    parser.add_argument("--handler", action="append", help="api/ file name; defaults to every handler")
+    args = parser.parse_args()
+
+    paths = [os.path.join(API_DIR, name) for name in args.handler] if args.handler else sorted(glob.glob(os.path.join(API_DIR, "*.py")))
+    baseline = baseline_modules(sys.executable)
+    failures = []
+    for path in paths:
+        name = os.path.basename(path)
+        report = measure(sys.executable, path, baseline)
+        over_budget = report["import_ms"] > args.budget_ms
+        verdict = "OK" if not over_budget and not report["sdk_loaded"] else "FAIL"
+        print(
+            f"{verdict:4} {name:26} imports {report['import_ms']:7.1f}ms  "
+            f"load {report['load_ms']:7.1f}ms  statuses {report['statuses']}  sdk loaded: {report['sdk_loaded']}"
+        )
+        for module, _, cumulative_us, _ in report["heaviest"][:args.top]:
+            print(f"       {cumulative_us / 1000:7.1f}ms  {module}")
+        if over_budget:
+            failures.append(f"{name} imports take {report['import_ms']:.1f}ms (budget {args.budget_ms:.0f}ms)")
+        if report["sdk_loaded"]:
+            failures.append(f"{name} loads {SDK_MODULE} for a preflight or invalid request")
+
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,324 @@
+"""Load test for the generation service, driven offline against the stub model.
+
+Starts the chosen server in-process with MODEL_BACKEND=stub, drives it over
+real HTTP and reports latency percentiles, throughput, error rate and peak RSS.
+
+Usage (from backend/):
+    python benchmarks/load_test.py --target flask --concurrency 32 --requests 500
+    python benchmarks/load_test.py --target asgi --rate 50 --duration 30 --mix generate=8,health=1,deploy=1
+    python benchmarks/load_test.py --target api --output results/api.json
+
+Targets: flask (backend/main.py), asgi (backend/asgi.py) and api (the
+api/*-py.py serverless handlers on http.server). Without --rate the test is
+closed-loop (each worker sends back to back); with --rate arrivals follow a
+Poisson process and latency is measured from the scheduled send time, so a
+saturated server shows up as queueing delay instead of being hidden.
+"""
+import argparse
+import http.client
+import importlib.util
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(os.path.dirname(BACKEND_DIR), "api")
+
+ENDPOINTS = {
+    "generate": ("POST", "/generate-website"),
+    "deploy": ("POST", "/deploy-website"),
+    "health": ("GET", "/health"),
+}
+
+
+def configure_environment(args):
+    """Point every entry point at the stub model before anything imports it"""
+    os.environ["MODEL_BACKEND"] = "stub"
+    os.environ["STUB_LATENCY_MEDIAN_SECONDS"] = str(args.model_latency)
+    os.environ["STUB_LATENCY_SIGMA"] = str(args.model_latency_sigma)
+    os.environ["STUB_HTML_BYTES"] = str(args.html_bytes)
+    os.environ["STUB_ERROR_RATE"] = str(args.model_error_rate)
+    os.environ["STUB_SEED"] = str(args.seed)
+    os.environ.setdefault("GENERATION_CACHE_ENABLED", "true" if args.cache else "false")
+    os.environ.setdefault("ADMISSION_ENABLED", "true" if args.admission else "false")
+    os.environ.setdefault("GENERATION_CONCURRENCY", str(max(64, args.concurrency)))
+    os.environ.setdefault("JOBS_WORKERS", "0")
+
+
+def serve_in_thread(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server.server_address[1]
+
+
+def start_flask():
+    sys.path.insert(0, BACKEND_DIR)
+    from werkzeug.serving import make_server
+    import main
+
+    server = make_server("127.0.0.1", 0, main.app, threaded=True)
+    port = serve_in_thread(server)
+    return {name: ("127.0.0.1", port) for name in ENDPOINTS}
+
+
+def start_asgi():
+    sys.path.insert(0, BACKEND_DIR)
+    import socket
+    import uvicorn
+    import asgi
+
+    sock = socket.socket()
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(asgi.app, log_level="warning"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return {name: ("127.0.0.1", port) for name in ENDPOINTS}
+
+
+def load_api_handler(filename):
+    spec = importlib.util.spec_from_file_location(filename.replace("-", "_")[:-3], os.path.join(API_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.handler
+
+
+def start_api():
+    addresses = {}
+    for name, filename in (("generate", "generate-website-py.py"), ("deploy", "deploy-website-py.py")):
+        # The serverless handlers register their routes at the function root
+        handler = load_api_handler(filename)
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        server.daemon_threads = True
+        addresses[name] = ("127.0.0.1", serve_in_thread(server))
+    return addresses
+
+
+TARGETS = {"flask": start_flask, "asgi": start_asgi, "api": start_api}
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint in --mix: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class LoadTest:
+    def __init__(self, args, addresses):
+        self.args = args
+        self.addresses = addresses
+        self.weights = parse_mix(args.mix)
+        if args.target == "api":
+            self.weights.pop("health", None)
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.samples = {name: [] for name in self.weights}
+        self.errors = {name: 0 for name in self.weights}
+        self.status_counts = {}
+        self.local = threading.local()
+        self.deploy_code = "<div>" + "x" * args.html_bytes + "</div>"
+
+    def pick(self):
+        with self.lock:
+            names = list(self.weights)
+            return self.random.choices(names, [self.weights[n] for n in names])[0], self.random.randrange(self.args.prompt_pool)
+
+    def connection(self, name):
+        connections = getattr(self.local, "connections", None)
+        if connections is None:
+            connections = self.local.connections = {}
+        address = self.addresses[name]
+        if address not in connections:
+            connections[address] = http.client.HTTPConnection(*address, timeout=self.args.timeout)
+        return connections[address]
+
+    def request(self, name, prompt_index, scheduled_at=None):
+        method, path = ENDPOINTS[name]
+        if self.args.target == "api":
+            path = "/"
+        body = None
+        headers = {"Content-Type": "application/json", "X-Forwarded-For": f"10.0.{prompt_index % 256}.1"}
+        prompt = f"Load test website number {prompt_index}"
+        if name == "generate":
+            body = json.dumps({"prompt": prompt})
+        elif name == "deploy":
+            body = json.dumps({"code": self.deploy_code, "prompt": prompt})
+
+        started = scheduled_at or time.perf_counter()
+        status = None
+        try:
+            connection = self.connection(name)
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+            if response.getheader("Connection", "").lower() == "close" or response.version == 10:
+                connection.close()
+        except Exception:
+            self.local.connections.pop(self.addresses[name], None)
+        elapsed = time.perf_counter() - started
+
+        with self.lock:
+            self.samples[name].append(elapsed)
+            self.status_counts[str(status)] = self.status_counts.get(str(status), 0) + 1
+            if status is None or status >= 400:
+                self.errors[name] += 1
+
+    def run(self):
+        args = self.args
+        deadline = time.perf_counter() + args.duration if args.duration else None
+        total = args.requests if not args.duration else None
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            if args.rate:
+                # Open loop: Poisson arrivals at --rate, independent of response times
+                sent = 0
+                next_at = time.perf_counter()
+                while (total is None or sent < total) and (deadline is None or next_at < deadline):
+                    delay = next_at - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    name, prompt_index = self.pick()
+                    pool.submit(self.request, name, prompt_index, next_at)
+                    sent += 1
+                    next_at += self.random.expovariate(args.rate)
+            else:
+                # Closed loop: each worker issues requests back to back
+                counter = iter(range(total)) if total is not None else None
+
+                def worker():
+                    while True:
+                        if counter is not None:
+                            with self.lock:
+                                if next(counter, None) is None:
+                                    return
+                        elif time.perf_counter() >= deadline:
+                            return
+                        self.request(*self.pick())
+
+                for _ in range(args.concurrency):
+                    pool.submit(worker)
+
+        return time.perf_counter() - started
+
+    def report(self, wall_time):
+        endpoints = {}
+        all_samples = []
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            all_samples.extend(ordered)
+            endpoints[name] = summarize(ordered, self.errors[name], wall_time)
+        overall = summarize(sorted(all_samples), sum(self.errors.values()), wall_time)
+        return {
+            "target": self.args.target,
+            "config": {key: value for key, value in vars(self.args).items() if key != "output"},
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "wall_time_seconds": round(wall_time, 3),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "status_counts": self.status_counts,
+            "overall": overall,
+            "endpoints": endpoints,
+        }
+
+
+def summarize(ordered, errors, wall_time):
+    count = len(ordered)
+    to_ms = lambda value: round(value * 1000, 2) if value is not None else None
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "requests_per_second": round(count / wall_time, 2) if wall_time else 0.0,
+        "p50_ms": to_ms(percentile(ordered, 0.50)),
+        "p95_ms": to_ms(percentile(ordered, 0.95)),
+        "p99_ms": to_ms(percentile(ordered, 0.99)),
+        "max_ms": to_ms(ordered[-1] if ordered else None),
+    }
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def print_report(report):
+    print(f"target={report['target']} commit={report['commit']} wall={report['wall_time_seconds']}s "
+          f"peak_rss={report['peak_rss_mb']}MB statuses={report['status_counts']}")
+    print(f"{'endpoint':<10} {'reqs':>6} {'rps':>8} {'err%':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = list(report["endpoints"].items()) + [("overall", report["overall"])]
+    for name, stats in rows:
+        print(f"{name:<10} {stats['requests']:>6} {stats['requests_per_second']:>8} "
+              f"{stats['error_rate'] * 100:>5.1f}% {stats['p50_ms'] or 0:>9} {stats['p95_ms'] or 0:>9} {stats['p99_ms'] or 0:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=sorted(TARGETS), default="flask")
+    parser.add_argument("--mix", default="generate=8,deploy=1,health=1", help="endpoint weights, e.g. generate=8,health=1")
+    parser.add_argument("--concurrency", type=int, default=16, help="client worker threads")
+    parser.add_argument("--rate", type=float, default=0.0, help="open-loop arrival rate in req/s (0 = closed loop)")
+    parser.add_argument("--requests", type=int, default=200, help="total requests when --duration is not set")
+    parser.add_argument("--duration", type=float, default=0.0, help="run for this many seconds instead of --requests")
+    parser.add_argument("--prompt-pool", type=int, default=1000, help="distinct prompts to draw from")
+    parser.add_argument("--model-latency", type=float, default=0.5, help="stub model median latency in seconds")
+    parser.add_argument("--model-latency-sigma", type=float, default=0.5)
+    parser.add_argument("--model-error-rate", type=float, default=0.0)
+    parser.add_argument("--html-bytes", type=int, default=20000)
+    parser.add_argument("--cache", action="store_true", help="leave the generation cache enabled")
+    parser.add_argument("--admission", action="store_true", help="leave admission control enabled")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON results here")
+    args = parser.parse_args()
+
+    configure_environment(args)
+    addresses = TARGETS[args.target]()
+
+    test = LoadTest(args, addresses)
+    report = test.report(test.run())
+    print_report(report)
+
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
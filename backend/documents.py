@@ -0,0 +1,147 @@
+from html import escape
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import re
+import uuid
+
+from page_optimizer import font_links
+from tailwind_css import stylesheet_for
+
+_DOCUMENT_START = re.compile(r"^\s*(<!doctype\s+html|<html[\s>])", re.IGNORECASE)
+
+FONT_URL = "https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;600;700&display=swap"
+
+# Base typography and the helper classes generated pages tend to use; the font
+# itself is linked without blocking rendering (see font_links)
+PAGE_STYLES = """body { font-family: 'Inter', sans-serif; }
+.fade-in { animation: fadeIn 0.6s ease-out; }
+@keyframes fadeIn { from { opacity: 0; transform: translateY(20px); } to { opacity: 1; transform: translateY(0); } }
+.hover-scale { transition: transform 0.2s ease; }
+.hover-scale:hover { transform: scale(1.05); }
+.gradient-bg { background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); }
+.glass { background: rgba(255, 255, 255, 0.1); backdrop-filter: blur(10px); border: 1px solid rgba(255, 255, 255, 0.2); }"""
+
+# Fade-in on load and smooth scrolling for in-page links
+PAGE_SCRIPT = """document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('section, .card, .feature').forEach((el, index) => {
+        setTimeout(() => { el.classList.add('fade-in'); }, index * 100);
+    });
+    document.querySelectorAll('a[href^="#"]').forEach(anchor => {
+        anchor.addEventListener('click', function (e) {
+            e.preventDefault();
+            const target = document.querySelector(this.getAttribute('href'));
+            if (target) {
+                target.scrollIntoView({ behavior: 'smooth', block: 'start' });
+            }
+        });
+    });
+});"""
+
+
+# The fixed parts of a page, around its stylesheet and body
+_HEAD_END = f"""</style>
+<style>{PAGE_STYLES}</style>
+</head>
+<body>
+"""
+_DOCUMENT_END = f"""
+<script>{PAGE_SCRIPT}</script>
+</body>
+</html>"""
+_HEAD_END_BYTES = _HEAD_END.encode("utf-8")
+_DOCUMENT_END_BYTES = _DOCUMENT_END.encode("utf-8")
+
+# Response formats for a generation, by name and media type
+RESPONSE_FORMATS = {"json": "application/json", "html": "text/html", "multipart": "multipart/mixed"}
+
+# A raw page has no JSON ``errors`` to check, so a fallback page is sent with
+# this status and header instead of a 200
+FALLBACK_STATUS = 503
+FALLBACK_HEADER = "X-Generation-Fallback"
+
+
+@lru_cache(maxsize=32)
+def _document_head(title: str) -> str:
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>{escape(title)}</title>
+{font_links(FONT_URL)}
+<style>"""
+
+
+@lru_cache(maxsize=32)
+def _document_head_bytes(title: str) -> bytes:
+    return _document_head(title).encode("utf-8")
+
+
+def is_full_document(html: str) -> bool:
+    """Whether ``html`` is already a complete document rather than body content"""
+    return bool(_DOCUMENT_START.match(html))
+
+
+def wrap_document(body_html: str, title: str = "Generated Website", stylesheet: Optional[str] = None) -> str:
+    """Wrap generated body content in a standalone page with its stylesheet inlined.
+
+    Pass ``stylesheet`` when it was already built for ``body_html`` (generation
+    results carry one) to skip rebuilding it.
+    """
+    if is_full_document(body_html):
+        return body_html
+    if stylesheet is None:
+        stylesheet = stylesheet_for(body_html)
+    return _document_head(title) + stylesheet + _HEAD_END + body_html + _DOCUMENT_END
+
+
+def document_chunks(body_html: str, title: str = "Generated Website", stylesheet: Optional[str] = None) -> List[bytes]:
+    """The same page as ``wrap_document``, as byte chunks to write one after another.
+
+    The fixed parts are encoded once per process, and the page is never
+    joined into one string, so writing it costs one copy of the body.
+    """
+    if is_full_document(body_html):
+        return [body_html.encode("utf-8")]
+    if stylesheet is None:
+        stylesheet = stylesheet_for(body_html)
+    return [
+        _document_head_bytes(title),
+        stylesheet.encode("utf-8"),
+        _HEAD_END_BYTES,
+        body_html.encode("utf-8"),
+        _DOCUMENT_END_BYTES,
+    ]
+
+
+def multipart_document(header: Dict[str, Any], chunks: List[bytes]) -> Tuple[str, List[bytes]]:
+    """A ``multipart/mixed`` body: a small JSON part, then the page as is.
+
+    Returns the content type (with its boundary) and the body chunks; the
+    page chunks are passed through rather than copied or escaped.
+    """
+    boundary = f"generation-{uuid.uuid4().hex}"
+    json_part = json.dumps(header).encode("utf-8")
+    return f"multipart/mixed; boundary={boundary}", [
+        f"--{boundary}\r\nContent-Type: application/json\r\n\r\n".encode("ascii"),
+        json_part,
+        f"\r\n--{boundary}\r\nContent-Type: text/html; charset=utf-8\r\n\r\n".encode("ascii"),
+        *chunks,
+        f"\r\n--{boundary}--\r\n".encode("ascii"),
+    ]
+
+
+def response_format(requested: Optional[str], accept: Optional[str]) -> Optional[str]:
+    """The response format for a generation: an explicit ``?format=`` wins, then
+    the first known media type in ``Accept``, then JSON. None if ``requested``
+    is not a known format.
+    """
+    if requested:
+        return requested if requested in RESPONSE_FORMATS else None
+    for media_range in (accept or "").split(","):
+        media_type = media_range.split(";")[0].strip().lower()
+        for name, known in RESPONSE_FORMATS.items():
+            if media_type == known:
+                return name
+    return "json"
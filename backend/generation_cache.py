@@ -0,0 +1,184 @@
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace and case so trivially different prompts share a key"""
+    return " ".join(prompt.split()).casefold()
+
+
+def make_cache_key(prompt: str, model: str, template: str) -> str:
+    """Content address of a generation: normalized prompt + model + template hash"""
+    template_hash = hashlib.sha256(template.encode("utf-8")).hexdigest()
+    material = "\x00".join((normalize_prompt(prompt), model, template_hash))
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """Two-tier generation cache: a size-bounded in-memory LRU in front of SQLite.
+
+    Values are stored as JSON so the memory tier can be bounded by bytes and
+    every hit hands out a fresh copy that callers are free to mutate. Expired
+    rows are deleted by ``set`` in batches, at most every ``expire_interval``
+    seconds; reads already ignore them.
+    """
+
+    EXPIRE_BATCH = 1000
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_memory_bytes: int = 32 * 1024 * 1024,
+        ttl_seconds: float = 24 * 60 * 60,
+        expire_interval: float = 60.0,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.ttl_seconds = ttl_seconds
+        self.expire_interval = expire_interval
+        self._last_expired = 0.0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+        self._db = None
+        if db_path:
+            directory = os.path.dirname(db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS generations_expires_at ON generations (expires_at)")
+            self._db.commit()
+
+        logger.info(f"Generation cache ready (memory={max_memory_bytes} bytes, disk={db_path or 'off'})")
+
+    @property
+    def persistent(self) -> bool:
+        """Whether misses in memory go on to read SQLite"""
+        return self._db is not None
+
+    def get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a value from the memory tier only, without touching SQLite.
+
+        For callers on an event loop: on None, ``get`` (run in a thread) still
+        checks the disk tier, and counts the miss if there isn't one.
+        """
+        with self._lock:
+            return self._get_memory(key, time.time())
+
+    def _get_memory(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return json.loads(value)
+            self._evict(key)
+        return None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached value, promoting disk hits into memory"""
+        now = time.time()
+        with self._lock:
+            cached = self._get_memory(key, now)
+            if cached is not None:
+                return cached
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM generations WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at > now:
+                        self._remember(key, value, expires_at)
+                        self._hits += 1
+                        return json.loads(value)
+                    self._db.execute("DELETE FROM generations WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._misses += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        """Store a value in both tiers"""
+        serialized = json.dumps(value)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, serialized, expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO generations (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, serialized, expires_at),
+                )
+                now = time.time()
+                if now - self._last_expired >= self.expire_interval:
+                    self._last_expired = now
+                    self._db.execute(
+                        "DELETE FROM generations WHERE key IN "
+                        "(SELECT key FROM generations WHERE expires_at <= ? LIMIT ?)",
+                        (now, self.EXPIRE_BATCH),
+                    )
+                self._db.commit()
+
+    def invalidate(self, key: str) -> bool:
+        """Drop a single key from both tiers, returning whether it was present"""
+        with self._lock:
+            found = self._evict(key)
+            if self._db is not None:
+                cursor = self._db.execute("DELETE FROM generations WHERE key = ?", (key,))
+                self._db.commit()
+                found = found or cursor.rowcount > 0
+            return found
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM generations")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
+
+    def _remember(self, key: str, value: str, expires_at: float) -> None:
+        size = len(value)
+        if size > self.max_memory_bytes:
+            return
+        self._evict(key)
+        self._memory[key] = (value, expires_at)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            oldest = next(iter(self._memory))
+            self._evict(oldest)
+
+    def _evict(self, key: str) -> bool:
+        entry = self._memory.pop(key, None)
+        if entry is None:
+            return False
+        self._memory_bytes -= len(entry[0])
+        return True
@@ -0,0 +1,105 @@
+from typing import Dict, Any, Optional, Tuple
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from artifact_store import ArtifactStore
+from documents import wrap_document
+
+logger = logging.getLogger(__name__)
+
+# Per-request details that don't belong in the stored record
+_TRANSIENT_METADATA = ("timings", "cache", "similarity", "similar_prompt")
+
+
+class GenerationStore:
+    """Finished generations kept by a stable id so they can be fetched again later.
+
+    The id is the SHA-256 of the standalone page, which is stored in the
+    artifact store exactly as ``/deploy-website`` would store it: the same
+    content always gets the same id, and deploying a stored generation is a
+    lookup rather than an upload. The JSON record (body, stylesheet, metadata)
+    sits in SQLite next to it; the first record stored for an id is kept.
+
+    ``prepare`` gives the id straight away and writes the page itself, so it
+    can be served and deployed at once; ``put`` does the compression and the
+    SQLite write and can run later, off the request path. Records waiting for
+    ``put`` are already visible to ``get`` and ``exists``.
+    """
+
+    def __init__(self, artifacts: ArtifactStore, db_path: str):
+        self.artifacts = artifacts
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS generations ("
+                "id TEXT PRIMARY KEY, record TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def prepare(self, result: Dict[str, Any]) -> Tuple[str, bytes, Dict[str, Any]]:
+        """Store the standalone page of a successful result and return its id, page and record for ``put``"""
+        document = wrap_document(result["html_code"], stylesheet=result.get("stylesheet")).encode("utf-8")
+        generation_id, _ = self.artifacts.put_blob(document)
+        metadata = {
+            key: value for key, value in result.get("metadata", {}).items() if key not in _TRANSIENT_METADATA
+        }
+        metadata["generation_id"] = generation_id
+        record = {
+            "html_code": result["html_code"],
+            "stylesheet": result.get("stylesheet"),
+            "metadata": metadata,
+            "requirements": result.get("requirements", {}),
+        }
+        with self._lock:
+            self._pending.setdefault(generation_id, record)
+        return generation_id, document, record
+
+    def put(self, generation_id: str, document: bytes, record: Dict[str, Any]) -> None:
+        """Write a prepared generation's compressed sidecars and its record in SQLite"""
+        try:
+            self.artifacts.precompress(generation_id, document)
+            serialized = json.dumps(record)
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO generations (id, record, created_at) VALUES (?, ?, ?)",
+                    (generation_id, serialized, time.time()),
+                )
+                self._db.commit()
+        finally:
+            with self._lock:
+                self._pending.pop(generation_id, None)
+
+    def get(self, generation_id: str) -> Optional[Dict[str, Any]]:
+        record = self.get_json(generation_id)
+        return json.loads(record) if record is not None else None
+
+    def get_json(self, generation_id: str) -> Optional[str]:
+        """The stored record as serialized, ready to send as is"""
+        with self._lock:
+            pending = self._pending.get(generation_id)
+            if pending is not None:
+                return json.dumps(pending)
+            row = self._db.execute("SELECT record FROM generations WHERE id = ?", (generation_id,)).fetchone()
+        return row[0] if row else None
+
+    def exists(self, generation_id: str) -> bool:
+        with self._lock:
+            if generation_id in self._pending:
+                return True
+            row = self._db.execute("SELECT 1 FROM generations WHERE id = ?", (generation_id,)).fetchone()
+        return row is not None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM generations").fetchone()
+        return {"generations": count}
@@ -0,0 +1,133 @@
+from typing import List, Optional
+import re
+
+# Wrapper tags the cleaner removes: doctype, <html>/<body> and the start of a
+# <head> block. Markdown fences are located with str.find; keeping the tag
+# pattern anchored on '<' lets the regex engine skip ahead with a literal prefix.
+_WRAPPER_TAG = re.compile(
+    r"<(?:!doctype[^>]*>|/?(?:html|body)(?:\s[^>]*)?>|head(?:\s[^>]*)?>)",
+    re.IGNORECASE,
+)
+_HEAD_END = re.compile(r"</head\s*>", re.IGNORECASE)
+_FENCE = "```"
+
+# A '<' without its closing '>' is held back at a chunk boundary only while it
+# could still become a wrapper tag; longer runs are ordinary text.
+_MAX_PENDING_TAG = 512
+_FENCE_LENGTH = len("```html")
+
+
+class HtmlCleaner:
+    """Incremental cleaner for model HTML output.
+
+    Strips markdown code fences, document wrappers and ``<head>`` blocks in one
+    pass. Input can be fed chunk by chunk; a partial token at the end of a chunk
+    is held back until the next one arrives, so the concatenated output equals
+    cleaning the whole document at once. Leading and trailing whitespace of the
+    document is dropped, matching ``str.strip``.
+
+    Text after a ``<head>`` tag is held until its ``</head>`` arrives. A head
+    that is never closed (or a ``<head>`` inside a script string) is not a head
+    block, so it is emitted as is at ``close``.
+    """
+
+    def __init__(self):
+        self._pending = ""
+        # The open <head> tag and the raw text after it, while inside a head block
+        self._head: Optional[List[str]] = None
+        self._started = False
+        self._trailing_ws = ""
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk and return the cleaned text that is safe to emit"""
+        buffer = self._pending + chunk
+        hold = self._hold_index(buffer)
+        self._pending = buffer[hold:]
+        return self._emit(self._scan(buffer[:hold]))
+
+    def close(self) -> str:
+        """Flush any held-back text; trailing whitespace is discarded"""
+        buffer, self._pending = self._pending, ""
+        text = self._scan(buffer)
+        if self._head is not None:
+            head, self._head = self._head, None
+            text += head[0] + self._scan("".join(head[1:]), keep_head=True)
+        text = self._emit(text)
+        self._trailing_ws = ""
+        return text
+
+    def _hold_index(self, buffer: str) -> int:
+        hold = len(buffer)
+
+        tag_start = buffer.rfind("<")
+        if tag_start != -1 and len(buffer) - tag_start <= _MAX_PENDING_TAG and buffer.find(">", tag_start) == -1:
+            hold = tag_start
+
+        fence_end = buffer.rfind("`")
+        if fence_end != -1 and len(buffer) - fence_end <= _FENCE_LENGTH:
+            fence_start = fence_end
+            while fence_start > 0 and buffer[fence_start - 1] == "`":
+                fence_start -= 1
+            hold = min(hold, fence_start)
+
+        return hold
+
+    def _scan(self, text: str, keep_head: bool = False) -> str:
+        out: List[str] = []
+        pos = 0
+        end = len(text)
+        fence = tag = None
+        while pos < end:
+            if self._head is not None:
+                match = _HEAD_END.search(text, pos)
+                if match is None:
+                    self._head.append(text[pos:])
+                    break
+                self._head = None
+                pos = match.end()
+                fence = tag = None
+                continue
+
+            # Next fence and next wrapper tag are found independently and only
+            # re-searched once the scan has moved past them
+            if fence is None or (fence != -1 and fence < pos):
+                fence = text.find(_FENCE, pos)
+            if tag is None or (tag is not False and tag.start() < pos):
+                tag = _WRAPPER_TAG.search(text, pos) or False
+
+            if fence == -1 and tag is False:
+                out.append(text[pos:])
+                break
+
+            if tag is False or (fence != -1 and fence < tag.start()):
+                out.append(text[pos:fence])
+                pos = fence + len(_FENCE)
+                if text[pos:pos + 4].lower() == "html":
+                    pos += 4
+            else:
+                out.append(text[pos:tag.start()])
+                if tag.group()[:5].lower() == "<head":
+                    if keep_head:
+                        out.append(tag.group())
+                    else:
+                        self._head = [tag.group()]
+                pos = tag.end()
+        return "".join(out)
+
+    def _emit(self, text: str) -> str:
+        if not self._started:
+            text = text.lstrip()
+            if not text:
+                return ""
+            self._started = True
+
+        text = self._trailing_ws + text
+        stripped = text.rstrip()
+        self._trailing_ws = text[len(stripped):]
+        return stripped
+
+
+def clean_html(html: str) -> str:
+    """Clean a complete model response in one pass"""
+    cleaner = HtmlCleaner()
+    return cleaner.feed(html) + cleaner.close()
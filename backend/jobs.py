@@ -0,0 +1,222 @@
+from typing import Dict, Any, Optional
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class JobStore:
+    """Generation jobs persisted in SQLite so queued and finished work survive restarts.
+
+    Finished jobs (and their results) are kept for ``retention_seconds``, then
+    pruned in batches by ``finish``. Counts per status are kept in memory so
+    health checks and metrics scrapes don't query the table.
+    """
+
+    PRUNE_BATCH = 1000
+
+    def __init__(self, db_path: str, retention_seconds: float = 7 * 24 * 60 * 60, prune_interval: float = 60.0):
+        self.retention_seconds = retention_seconds
+        self.prune_interval = prune_interval
+        self._last_pruned = 0.0
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, prompt TEXT NOT NULL, "
+                "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+            self._db.execute("CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at)")
+            self._db.commit()
+            self._counts = self._count_rows()
+
+    def create(self, prompt: str) -> Dict[str, Any]:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, status, prompt, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, QUEUED, prompt, time.time()),
+            )
+            self._db.commit()
+            self._adjust(QUEUED, 1)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and return it"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, time.time(), row["id"]),
+            )
+            self._db.commit()
+            self._adjust(QUEUED, -1)
+            self._adjust(RUNNING, 1)
+        return self.get(row["id"])
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            try:
+                cursor = self._db.execute(
+                    "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?",
+                    (status, json.dumps(result) if result is not None else None, error, time.time(), job_id, RUNNING),
+                )
+                if cursor.rowcount:
+                    self._adjust(RUNNING, -1)
+                    self._adjust(status, 1)
+                self._prune()
+                self._db.commit()
+            except Exception:
+                # Leave nothing half-written for the next commit to pick up
+                self._db.rollback()
+                self._counts = self._count_rows()
+                raise
+
+    def _prune(self) -> None:
+        """Delete a batch of finished jobs past retention; call with the lock held"""
+        now = time.time()
+        if now - self._last_pruned < self.prune_interval:
+            return
+        self._last_pruned = now
+        for status in (SUCCEEDED, FAILED):
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE id IN (SELECT id FROM jobs WHERE status = ? AND finished_at <= ? LIMIT ?)",
+                (status, now - self.retention_seconds, self.PRUNE_BATCH),
+            )
+            self._adjust(status, -cursor.rowcount)
+
+    def recover(self, max_attempts: int) -> int:
+        """Requeue jobs left running by a previous process, failing those out of attempts"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE status = ? AND attempts >= ?",
+                (FAILED, "Job interrupted too many times", time.time(), RUNNING, max_attempts),
+            )
+            cursor = self._db.execute("UPDATE jobs SET status = ? WHERE status = ?", (QUEUED, RUNNING))
+            self._db.commit()
+            self._counts = self._count_rows()
+            return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {status: count for status, count in self._counts.items() if count}
+
+    def _count_rows(self) -> Dict[str, int]:
+        rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+    def _adjust(self, status: str, delta: int) -> None:
+        self._counts[status] = self._counts.get(status, 0) + delta
+
+
+class JobManager:
+    """Pool of background workers running queued generation jobs on the shared event loop"""
+
+    def __init__(
+        self,
+        store: JobStore,
+        generator,
+        workers: int = 4,
+        job_timeout: float = 120.0,
+        max_pending: int = 1000,
+        max_attempts: int = 3,
+    ):
+        self.store = store
+        self.generator = generator
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks = []
+
+    async def start(self) -> None:
+        """Recover interrupted jobs and start the workers; call on the event loop"""
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        recovered = await asyncio.to_thread(self.store.recover, self.max_attempts)
+        if recovered:
+            logger.info(f"Requeued {recovered} interrupted generation jobs")
+        self._tasks = [asyncio.ensure_future(self._work(index)) for index in range(self.workers)]
+        logger.info(f"Started {self.workers} generation job workers")
+
+    def submit(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Queue a job from any thread; returns None when the queue is full"""
+        if self.store.counts().get(QUEUED, 0) >= self.max_pending:
+            return None
+        job = self.store.create(prompt)
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return job
+
+    async def _work(self, index: int) -> None:
+        while True:
+            # Clear before claiming so a submit landing in between still wakes us
+            self._wakeup.clear()
+            try:
+                # SQLite commits run in a thread so the shared loop keeps serving
+                job = await asyncio.to_thread(self.store.claim_next)
+            except Exception as e:
+                logger.error(f"Worker {index} failed to claim a job: {e}")
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=5.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            logger.info(f"Worker {index} running job {job['id']}")
+            outcome = {"status": SUCCEEDED}
+            try:
+                outcome["result"] = await asyncio.wait_for(
+                    self.generator.generate_website(job["prompt"]), timeout=self.job_timeout
+                )
+            except asyncio.TimeoutError:
+                logger.error(f"Job {job['id']} timed out after {self.job_timeout}s")
+                outcome = {"status": FAILED, "error": f"Job timed out after {self.job_timeout}s"}
+            except Exception as e:
+                logger.error(f"Job {job['id']} failed: {e}")
+                outcome = {"status": FAILED, "error": str(e)}
+
+            try:
+                await asyncio.to_thread(self.store.finish, job["id"], **outcome)
+            except Exception as e:
+                # The worker keeps going; the job stays running until recover() requeues it on restart
+                logger.error(f"Failed to record the outcome of job {job['id']}: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"workers": self.workers, "jobs": self.store.counts()}
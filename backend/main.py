@@ -1,10 +1,24 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
+import atexit
+import hmac
 import os
 from dotenv import load_dotenv
 import logging
-from website_generator import WebsiteGeneratorGraph
-import asyncio
+import json
+import time
+import metrics
+from website_generator import MAX_VARIANTS, create_generator
+from generation_cache import GenerationCache
+from async_runner import AsyncRunner
+from admission import AdmissionController, AdmissionRejected, AdmissionTooCostly, parse_networks, resolve_client_id
+from jobs import QUEUED, JobManager, JobStore
+from profiling import ProfilerBusy, profile_coroutine, server_timing
+from output_compression import ArtifactCache, negotiate
+from artifact_store import ArtifactStore
+from generation_store import GenerationStore
+from documents import FALLBACK_HEADER, FALLBACK_STATUS, document_chunks, multipart_document, response_format, wrap_document
+from section_editor import SectionNotFound
 
 # Load environment variables
 load_dotenv()
@@ -13,57 +27,532 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+ALLOWED_ORIGINS = ["http://localhost:3000", "http://localhost:3001"]
+
 app = Flask(__name__)
-CORS(app, resources={r"/*": {"origins": ["http://localhost:3000", "http://localhost:3001"]}})
+CORS(app, resources={r"/*": {"origins": ALLOWED_ORIGINS}}, expose_headers=[FALLBACK_HEADER])
+
+# Result cache shared by every generation: in-memory LRU backed by SQLite
+generation_cache = None
+if os.getenv("GENERATION_CACHE_ENABLED", "true").lower() != "false":
+    generation_cache = GenerationCache(
+        db_path=os.getenv(
+            "GENERATION_CACHE_PATH",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "generations.sqlite3"),
+        ),
+        max_memory_bytes=int(os.getenv("GENERATION_CACHE_MEMORY_MB", "32")) * 1024 * 1024,
+        ttl_seconds=float(os.getenv("GENERATION_CACHE_TTL_SECONDS", str(24 * 60 * 60))),
+    )
+
+# Deployed sites: content-addressed blobs served from /sites/<digest>
+artifact_store = ArtifactStore(os.getenv(
+    "ARTIFACT_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "artifacts"),
+))
+
+# Finished generations by stable id, served from /generations/<id>; the id is
+# the digest of the page in the artifact store, so deploying one is a lookup
+generation_store = GenerationStore(artifact_store, os.getenv(
+    "GENERATION_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "generation_store.sqlite3"),
+))
 
 # Initialize the website generator graph
 try:
-    website_generator = WebsiteGeneratorGraph()
+    website_generator = create_generator(cache=generation_cache, store=generation_store)
+    if website_generator.similar is not None:
+        atexit.register(website_generator.similar.save)
     logger.info("Website generator initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize website generator: {e}")
     website_generator = None
 
+# One long-lived event loop shared by every request; see asgi.py for the
+# native async serving mode that awaits generations on it directly
+runner = AsyncRunner()
+
+# When set, /cache/invalidate requires "Authorization: Bearer <token>"
+CACHE_ADMIN_TOKEN = os.getenv("CACHE_ADMIN_TOKEN")
+
+# Proxies whose X-Forwarded-For is believed (addresses or CIDR ranges); with
+# none, clients are identified by the connecting address alone
+TRUSTED_PROXIES = parse_networks(os.getenv("TRUSTED_PROXIES", ""))
+
+# Admission control in front of generation: per-client and global token
+# buckets plus a bounded wait queue; overload is answered with a fast 429
+admission = None
+if os.getenv("ADMISSION_ENABLED", "true").lower() != "false":
+    admission = AdmissionController(
+        global_rate=float(os.getenv("ADMISSION_GLOBAL_RATE", "10")),
+        global_burst=float(os.getenv("ADMISSION_GLOBAL_BURST", "50")),
+        client_rate=float(os.getenv("ADMISSION_CLIENT_RATE", "1")),
+        client_burst=float(os.getenv("ADMISSION_CLIENT_BURST", "10")),
+        max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", "200")),
+        max_wait=float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "20")),
+    )
+
+# Asynchronous job API: POST /jobs returns at once, background workers on the
+# shared loop run the generation and persist state in SQLite
+job_manager = None
+if website_generator:
+    job_manager = JobManager(
+        JobStore(os.getenv(
+            "JOBS_DB_PATH",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "jobs.sqlite3"),
+        ), retention_seconds=float(os.getenv("JOBS_RETENTION_SECONDS", str(7 * 24 * 60 * 60)))),
+        website_generator,
+        workers=int(os.getenv("JOBS_WORKERS", "4")),
+        job_timeout=float(os.getenv("JOBS_TIMEOUT_SECONDS", "120")),
+        max_pending=int(os.getenv("JOBS_MAX_PENDING", "1000")),
+    )
+    runner.run(job_manager.start())
+
+if admission:
+    metrics.gauge("admission_queue_depth", "Requests waiting for admission", lambda: admission.queue_depth)
+if website_generator:
+    metrics.gauge(
+        "circuit_breaker_state",
+        "Model circuit breaker state: 0 closed, 1 half-open, 2 open",
+        lambda: {"closed": 0, "half_open": 1, "open": 2}[website_generator.breaker.state],
+    )
+if job_manager:
+    metrics.gauge("jobs_queued", "Generation jobs waiting for a worker", lambda: job_manager.store.counts().get(QUEUED, 0))
+
+# Opt-in request profiling (?profile=1 or X-Profile: 1); off unless enabled here
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "profiles")
+)
+
+# Compressed bodies that are served repeatedly (stored generation records),
+# each coding computed once per distinct body
+artifact_cache = ArtifactCache(
+    max_bytes=int(os.getenv("COMPRESSION_CACHE_MB", "64")) * 1024 * 1024,
+    gzip_level=int(os.getenv("COMPRESSION_GZIP_LEVEL", "6")),
+    brotli_quality=int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5")),
+)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+SITES_BASE_URL = os.getenv("SITES_BASE_URL")
+SITE_MAX_AGE = int(os.getenv("SITE_MAX_AGE_SECONDS", str(365 * 24 * 60 * 60)))
+
+VARIANT_PARALLELISM = int(os.getenv("GENERATION_VARIANT_PARALLELISM", "4"))
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def health_status():
+    """Health payload and status code, shared by the Flask and ASGI servers"""
+    if website_generator:
+        breaker = website_generator.breaker.stats()
+        # Still 200 while degraded: the server answers, from cache or fallback
+        degraded = breaker["state"] != "closed"
+        return {
+            "status": "degraded" if degraded else "healthy",
+            "message": "Model calls are paused by the circuit breaker" if degraded else "Website generator is ready",
+            "circuit_breaker": breaker,
+            "single_flight": website_generator.single_flight.stats(),
+            "similarity_index": website_generator.similar.stats() if website_generator.similar is not None else None,
+            "admission": admission.stats() if admission else None,
+            "jobs": job_manager.stats() if job_manager else None,
+        }, 200
+    return {"status": "unhealthy", "message": "Website generator failed to initialize"}, 503
+
+def validate_generation_request(data):
+    """Return an (error payload, status) pair if the request can't be served"""
+    if not website_generator:
+        return {"error": "Website generator not initialized"}, 503
+    if not data or "prompt" not in data:
+        return {"error": "Prompt is required"}, 400
+    return None
+
+async def admit(client_id, cost=1):
+    """Wait for admission; returns a (payload, status, headers) 429 if rejected"""
+    if not admission:
+        return None
+    try:
+        await admission.admit(client_id, cost)
+        return None
+    except AdmissionTooCostly as e:
+        # Retrying can't help, so this is the client's error rather than a 429
+        return {"error": f"Request too large: {e.reason}"}, 400, {}
+    except AdmissionRejected as e:
+        return (
+            {"error": f"Server busy: {e.reason}", "retry_after": e.retry_after_header},
+            429,
+            {"Retry-After": e.retry_after_header},
+        )
+
+async def run_generation(data, client_id, profile=False):
+    """Generate a website for a request body, returning (payload, status, headers)"""
+    error = validate_generation_request(data)
+    if error:
+        return error + ({},)
+
+    rejection = await admit(client_id)
+    if rejection:
+        return rejection
+
+    try:
+        generation = website_generator.generate_website(data["prompt"])
+        if profile and PROFILING_ENABLED:
+            result, path = await profile_coroutine(generation, PROFILE_DIR)
+            result["metadata"]["profile"] = path
+        else:
+            result = await generation
+        return result, 200, {}
+    except ProfilerBusy as e:
+        return {"error": str(e)}, 409, {}
+    except Exception as e:
+        logger.error(f"Error generating website: {e}")
+        return {"error": str(e)}, 500, {}
+
+def profile_requested(flag):
+    return flag is not None and flag.lower() in ("1", "true", "yes")
+
+def serialize_result(payload, headers):
+    """JSON-encode a generation payload, reporting stage timings in Server-Timing"""
+    started = time.perf_counter()
+    body = json.dumps(payload)
+    timings = payload.get("metadata", {}).get("timings") if isinstance(payload, dict) else None
+    if timings:
+        serialize_ms = (time.perf_counter() - started) * 1000
+        headers = dict(headers, **{"Server-Timing": server_timing(timings, serialize=serialize_ms)})
+    return body, headers
+
+def raw_result(payload, output, headers, accept_encoding=None):
+    """Status, content type, body chunks and headers for an html or multipart generation response.
+
+    The page is written as separate chunks around the body, with no JSON
+    escaping, so the whole document is never built as one string; it is
+    compressed chunk by chunk when the client accepts it. A fallback page is
+    still sent, but marked as one by its status and a header.
+    """
+    chunks = document_chunks(payload["html_code"], stylesheet=payload["stylesheet"])
+    if output == "multipart":
+        header = {key: value for key, value in payload.items() if key not in ("html_code", "stylesheet")}
+        content_type, chunks = multipart_document(header, chunks)
+    else:
+        content_type = "text/html; charset=utf-8"
+    headers = dict(headers, Vary="Accept-Encoding")
+    if sum(len(chunk) for chunk in chunks) >= COMPRESSION_MIN_BYTES:
+        chunks, encoding = artifact_cache.encode_chunks(chunks, accept_encoding)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+    headers["Content-Length"] = str(sum(len(chunk) for chunk in chunks))
+    timings = payload["metadata"].get("timings")
+    if timings:
+        headers["Server-Timing"] = server_timing(timings)
+    if payload["errors"]:
+        headers[FALLBACK_HEADER] = "1"
+        return FALLBACK_STATUS, content_type, chunks, headers
+    return 200, content_type, chunks, headers
+
+def encode_body(body, accept_encoding, cache=False):
+    """Compressed body and Content-Encoding (None for identity) for a response.
+
+    Only bodies served again byte for byte (``cache=True``) go through the
+    artifact cache; per-request bodies are compressed once and not kept.
+    """
+    if len(body) < COMPRESSION_MIN_BYTES:
+        return body, None
+    return artifact_cache.encode(body, accept_encoding, cache=cache)
+
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def stream_generation(prompt):
+    """Server-Sent Events for a streamed generation"""
+    async for event in website_generator.stream_website(prompt):
+        yield format_sse(event["event"], event["data"])
+
+def validate_variants_request(data):
+    """Return an (error payload, status) pair if a variants request can't be served"""
+    error = validate_generation_request(data)
+    if error:
+        return error
+    count = data.get("variants", 3)
+    if not isinstance(count, int) or not 1 <= count <= MAX_VARIANTS:
+        return {"error": f"variants must be an integer between 1 and {MAX_VARIANTS}"}, 400
+    return None
+
+async def stream_variants(data):
+    """Server-Sent Events delivering each design variant as soon as it finishes"""
+    count = data.get("variants", 3)
+    delivered = 0
+    async for result in website_generator.generate_variants(data["prompt"], count, VARIANT_PARALLELISM):
+        delivered += 1
+        yield format_sse("variant", result)
+    yield format_sse("done", {"variants": delivered})
+
+def resolve_edit_source(data):
+    """The page a section edit applies to, from inline HTML, a stored generation or a finished job, or an (error, status) pair"""
+    if "html" in data:
+        return data["html"], None
+    if "generation_id" in data:
+        record = generation_store.get(data["generation_id"])
+        if record is None:
+            return None, ({"error": "Generation not found"}, 404)
+        return record["html_code"], None
+    if not job_manager:
+        return None, ({"error": "Jobs are disabled"}, 404)
+    job = job_manager.store.get(data["job_id"])
+    if job is None or not job.get("result"):
+        return None, ({"error": "Job not found or not finished"}, 404)
+    return job["result"]["html_code"], None
+
+async def run_section_edit(data, client_id):
+    """Regenerate one section of a page, returning (payload, status, headers)"""
+    if not website_generator:
+        return {"error": "Website generator not initialized"}, 503, {}
+    sources = ("html", "generation_id", "job_id")
+    if not data or "target" not in data or "instruction" not in data or not any(key in data for key in sources):
+        return {"error": "target, instruction and one of html, generation_id or job_id are required"}, 400, {}
+
+    html, error = resolve_edit_source(data)
+    if error:
+        return error + ({},)
+
+    rejection = await admit(client_id)
+    if rejection:
+        return rejection
+
+    try:
+        return await website_generator.edit_section(html, data["target"], data["instruction"]), 200, {}
+    except SectionNotFound as e:
+        return {"error": str(e)}, 404, {}
+    except Exception as e:
+        logger.error(f"Error editing section: {e}")
+        return {"error": str(e)}, 500, {}
+
+def generation_format():
+    """"html" or "json" for a stored generation, from ?format= or the Accept header (None if invalid)"""
+    requested = request.args.get("format")
+    if requested is not None:
+        return requested if requested in ("html", "json") else None
+    best = request.accept_mimetypes.best_match(["text/html", "application/json"], default="text/html")
+    return "json" if best == "application/json" else "html"
+
+def send_artifact(digest):
+    """Serve a stored page as an immutable, precompressed, conditional response"""
+    # Precompressed sidecars can't serve byte ranges of the identity body
+    path, encoding = artifact_store.path(digest), None
+    if "Range" not in request.headers:
+        encoding = negotiate(request.headers.get("Accept-Encoding"))
+        path = artifact_store.sidecars(digest).get(encoding)
+        if path is None:
+            path, encoding = artifact_store.path(digest), None
+
+    # send_file handles If-None-Match, Range and hands the file to the
+    # server's sendfile support through wsgi.file_wrapper
+    response = send_file(
+        path,
+        mimetype="text/html",
+        conditional=True,
+        etag=f"{digest}-{encoding}" if encoding else digest,
+        max_age=SITE_MAX_AGE,
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    return response
+
+def request_client_id():
+    return resolve_client_id(request.remote_addr, request.headers.get("X-Forwarded-For"), TRUSTED_PROXIES)
+
+@app.after_request
+def compress_response(response):
+    # Streams (SSE) and files are left alone; everything else is negotiated
+    if response.is_streamed or response.direct_passthrough or "Content-Encoding" in response.headers:
+        return response
+    body, encoding = encode_body(response.get_data(), request.headers.get("Accept-Encoding"))
+    response.vary.add("Accept-Encoding")
+    if encoding:
+        response.set_data(body)
+        response.headers["Content-Encoding"] = encoding
+    return response
+
 @app.route("/", methods=["GET"])
 def root():
     return jsonify({"message": "Website Generator API is running!"})
 
 @app.route("/health", methods=["GET"])
 def health():
-    if website_generator:
-        return jsonify({"status": "healthy", "message": "Website generator is ready"})
-    return jsonify({"status": "unhealthy", "message": "Website generator failed to initialize"}), 503
+    payload, status = health_status()
+    return jsonify(payload), status
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
 
 @app.route("/generate-website", methods=["POST"])
 def generate_website():
-    if not website_generator:
-        return jsonify({"error": "Website generator not initialized"}), 503
-    
+    output = response_format(request.args.get("format"), request.headers.get("Accept"))
+    if output is None:
+        return jsonify({"error": "format must be json, html or multipart"}), 400
+
+    profile = profile_requested(request.args.get("profile") or request.headers.get("X-Profile"))
+    payload, status, headers = runner.run(run_generation(request.get_json(), request_client_id(), profile))
+    if output != "json" and status == 200:
+        status, content_type, chunks, headers = raw_result(
+            payload, output, headers, request.headers.get("Accept-Encoding")
+        )
+        # An iterator, so each chunk is written as is rather than joined first
+        return Response(iter(chunks), status=status, headers=headers, content_type=content_type)
+    body, headers = serialize_result(payload, headers)
+    return Response(body, status=status, headers=headers, mimetype="application/json")
+
+@app.route("/generate-website/stream", methods=["POST"])
+def generate_website_stream():
     data = request.get_json()
-    if not data or "prompt" not in data:
-        return jsonify({"error": "Prompt is required"}), 400
-        
-    prompt = data["prompt"]
-    try:
-        # Run async method in sync context
-        result = asyncio.run(website_generator.generate_website(prompt))
-        return jsonify(result)
-    except Exception as e:
-        logger.error(f"Error generating website: {e}")
-        return jsonify({"error": str(e)}), 500
+    error = validate_generation_request(data)
+    if error:
+        payload, status = error
+        return jsonify(payload), status
+
+    rejection = runner.run(admit(request_client_id()))
+    if rejection:
+        payload, status, headers = rejection
+        return jsonify(payload), status, headers
+
+    return Response(
+        stream_with_context(runner.iterate(stream_generation(data["prompt"]))),
+        mimetype="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+@app.route("/generate-website/variants", methods=["POST"])
+def generate_website_variants():
+    data = request.get_json()
+    error = validate_variants_request(data)
+    if error:
+        payload, status = error
+        return jsonify(payload), status
+
+    rejection = runner.run(admit(request_client_id(), data.get("variants", 3)))
+    if rejection:
+        payload, status, headers = rejection
+        return jsonify(payload), status, headers
+
+    return Response(
+        stream_with_context(runner.iterate(stream_variants(data))),
+        mimetype="text/event-stream",
+        headers=SSE_HEADERS,
+    )
+
+@app.route("/edit-section", methods=["POST"])
+def edit_section():
+    payload, status, headers = runner.run(run_section_edit(request.get_json(), request_client_id()))
+    body, headers = serialize_result(payload, headers)
+    return Response(body, status=status, headers=headers, mimetype="application/json")
+
+@app.route("/jobs", methods=["POST"])
+def create_job():
+    data = request.get_json()
+    error = validate_generation_request(data)
+    if error:
+        payload, status = error
+        return jsonify(payload), status
+
+    job = job_manager.submit(data["prompt"])
+    if job is None:
+        return jsonify({"error": "Job queue is full"}), 429, {"Retry-After": "30"}
+
+    status_url = f"/jobs/{job['id']}"
+    return jsonify({"job_id": job["id"], "status": job["status"], "status_url": status_url}), 202, {"Location": status_url}
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    if not job_manager:
+        return jsonify({"error": "Website generator not initialized"}), 503
+
+    job = job_manager.store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job)
+
+@app.route("/cache/invalidate", methods=["POST"])
+def invalidate_cache():
+    if not generation_cache:
+        return jsonify({"error": "Generation cache is disabled"}), 404
+    if CACHE_ADMIN_TOKEN and not hmac.compare_digest(
+        request.headers.get("Authorization", ""), f"Bearer {CACHE_ADMIN_TOKEN}"
+    ):
+        return jsonify({"error": "Unauthorized"}), 401
+
+    data = request.get_json(silent=True) or {}
+    if "prompt" in data:
+        if not website_generator:
+            return jsonify({"error": "Website generator not initialized"}), 503
+        key = website_generator.cache_key(data["prompt"])
+        invalidated = generation_cache.invalidate(key)
+        if website_generator.similar is not None:
+            website_generator.similar.discard(key)
+        return jsonify({"invalidated": invalidated})
+
+    # Wiping everything has to be asked for; an empty body is a mistake
+    if data.get("all") is not True:
+        return jsonify({"error": "Pass a prompt, or \"all\": true to clear the whole cache"}), 400
+
+    generation_cache.clear()
+    if website_generator and website_generator.similar is not None:
+        website_generator.similar.clear()
+    return jsonify({"invalidated": True, "cleared": True})
+
+@app.route("/generations/<generation_id>", methods=["GET"])
+def get_generation(generation_id):
+    output = generation_format()
+    if output is None:
+        return jsonify({"error": "format must be html or json"}), 400
+
+    record = generation_store.get_json(generation_id)
+    if record is None:
+        return jsonify({"error": "Generation not found"}), 404
+
+    if output == "html":
+        response = send_artifact(generation_id)
+    else:
+        # A stored record never changes, so it is as cacheable as the page
+        body, encoding = encode_body(record.encode("utf-8"), request.headers.get("Accept-Encoding"), cache=True)
+        response = Response(body, mimetype="application/json")
+        response.set_etag(f"{generation_id}-json-{encoding}" if encoding else f"{generation_id}-json")
+        response.cache_control.max_age = SITE_MAX_AGE
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.vary.add("Accept-Encoding")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.make_conditional(request)
+    response.vary.add("Accept")
+    return response
 
 @app.route("/deploy-website", methods=["POST"])
 def deploy_website():
     data = request.get_json()
-    if not data or "code" not in data or "prompt" not in data:
-        return jsonify({"error": "Code and prompt are required"}), 400
-        
-    # In a real app, this would deploy to Vercel or similar
-    # For now, we'll just return a success message
+    if data and "generation_id" in data:
+        # Already stored when it was generated: nothing to upload
+        if not generation_store.exists(data["generation_id"]):
+            return jsonify({"error": "Generation not found"}), 404
+        digest, deduplicated = data["generation_id"], True
+    elif not data or "code" not in data or "prompt" not in data:
+        return jsonify({"error": "Code and prompt, or a generation_id, are required"}), 400
+    else:
+        # Keyed by content alone, so redeploying the same site reuses its blob
+        digest, deduplicated = artifact_store.put(wrap_document(data["code"]).encode("utf-8"))
+    base_url = SITES_BASE_URL or request.host_url
     return jsonify({
-        "url": "https://example.com/preview",
-        "message": "Website deployed successfully (simulation)"
+        "url": f"{base_url.rstrip('/')}/sites/{digest}",
+        "deployment_id": digest,
+        "deduplicated": deduplicated,
+        "message": "Website deployed successfully"
     })
 
+@app.route("/sites/<digest>", methods=["GET"])
+def serve_site(digest):
+    if not artifact_store.exists(digest):
+        return jsonify({"error": "Site not found"}), 404
+    return send_artifact(digest)
+
 if __name__ == "__main__":
     app.run(port=8000, debug=True)
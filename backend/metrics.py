@@ -0,0 +1,189 @@
+from typing import Callable, Dict, List, Optional, Sequence
+from bisect import bisect_left
+from contextlib import contextmanager
+import abc
+import threading
+import time
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (1024, 4096, 16384, 32768, 65536, 131072, 262144, 524288, 1048576)
+
+
+class _Sharded(abc.ABC):
+    """Per-thread shards so updates never take a lock.
+
+    Each thread writes only to its own shard, keyed by thread ident (idents are
+    reused once a thread exits, so the shard count is bounded by peak thread
+    concurrency). Scrapes sum all shards; a scrape racing an update may miss
+    that one update, which is fine for monitoring.
+    """
+
+    def __init__(self):
+        self._shards: Dict[int, list] = {}
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _new_shard(self) -> list:
+        """A zeroed shard for a thread that hasn't written yet"""
+
+    def _shard(self) -> list:
+        ident = threading.get_ident()
+        shard = self._shards.get(ident)
+        if shard is None:
+            with self._lock:
+                shard = self._shards.setdefault(ident, self._new_shard())
+        return shard
+
+    def _all_shards(self) -> List[list]:
+        with self._lock:
+            return list(self._shards.values())
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str):
+        super().__init__()
+        self.name = name
+        self.help = help
+
+    def _new_shard(self) -> list:
+        return [0.0]
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._shard()[0] += amount
+
+    def value(self) -> float:
+        return sum(shard[0] for shard in self._all_shards())
+
+    def samples(self):
+        yield self.name, self.value()
+
+
+class Gauge(_Sharded):
+    """Gauge updated with inc/dec, or read from ``fn`` at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Optional[Callable[[], float]] = None):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.fn = fn
+
+    def _new_shard(self) -> list:
+        return [0.0]
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._shard()[0] += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._shard()[0] -= amount
+
+    def value(self) -> float:
+        if self.fn is not None:
+            return float(self.fn())
+        return sum(shard[0] for shard in self._all_shards())
+
+    def samples(self):
+        yield self.name, self.value()
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_shard(self) -> list:
+        # One slot per bucket plus +Inf, then sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value: float) -> None:
+        shard = self._shard()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    @contextmanager
+    def time(self):
+        """Observe the wall-clock seconds spent in the block"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def samples(self):
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for shard in self._all_shards():
+            for index in range(len(counts)):
+                counts[index] += shard[index]
+            total += shard[-1]
+
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{le="{_format_value(bound)}"}}', cumulative
+        cumulative += counts[-1]
+        yield f'{self.name}_bucket{{le="+Inf"}}', cumulative
+        yield f"{self.name}_sum", total
+        yield f"{self.name}_count", cumulative
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Registering a name twice returns the metric already registered
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str) -> Counter:
+        return self.register(Counter(name, help))
+
+    def gauge(self, name: str, help: str, fn: Optional[Callable[[], float]] = None) -> Gauge:
+        gauge = self.register(Gauge(name, help, fn))
+        if fn is not None:
+            gauge.fn = fn
+        return gauge
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, value in metric.samples():
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+render = REGISTRY.render
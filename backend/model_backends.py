@@ -0,0 +1,211 @@
+from typing import AsyncIterator, Optional, Protocol
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import time
+from html import escape
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+
+
+def load_genai():
+    """Import the Gemini SDK on first use; it dominates cold-start import time"""
+    from google import genai
+    return genai
+
+
+class ModelBackend(Protocol):
+    """What the generators need from a model: blocking, async and streaming text generation"""
+
+    model: str
+
+    def generate(self, contents: str, temperature: Optional[float] = None, seed: Optional[int] = None) -> str:
+        ...
+
+    async def agenerate(self, contents: str, temperature: Optional[float] = None, seed: Optional[int] = None) -> str:
+        ...
+
+    def astream(self, contents: str, temperature: Optional[float] = None, seed: Optional[int] = None) -> AsyncIterator[str]:
+        ...
+
+
+class GeminiBackend:
+    """Google Gemini through the google.genai SDK"""
+
+    def __init__(self, api_key: Optional[str] = None, model: str = DEFAULT_MODEL):
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if not self.api_key:
+            raise ValueError("GEMINI_API_KEY environment variable is required")
+        self.model = model
+        genai = load_genai()
+        self.types = genai.types
+        self.client = genai.Client(api_key=self.api_key)
+
+    def _config(self, temperature: Optional[float], seed: Optional[int]):
+        if temperature is None and seed is None:
+            return None
+        return self.types.GenerateContentConfig(temperature=temperature, seed=seed)
+
+    def generate(self, contents: str, temperature: Optional[float] = None, seed: Optional[int] = None) -> str:
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=contents,
+            config=self._config(temperature, seed),
+        )
+        return response.text or ""
+
+    async def agenerate(self, contents: str, temperature: Optional[float] = None, seed: Optional[int] = None) -> str:
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=contents,
+            config=self._config(temperature, seed),
+        )
+        return response.text or ""
+
+    async def astream(self, contents: str, temperature: Optional[float] = None, seed: Optional[int] = None) -> AsyncIterator[str]:
+        stream = await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=contents,
+            config=self._config(temperature, seed),
+        )
+        async for chunk in stream:
+            text = getattr(chunk, "text", None)
+            if text:
+                yield text
+
+
+class StubBackendError(Exception):
+    """Injected failure from the stub backend"""
+
+    # Stands in for a transient upstream failure, so it is retried like one
+    code = 503
+
+
+_STUB_SECTION = """
+<section id="{anchor}" class="py-20 px-4 {background}">
+    <div class="max-w-6xl mx-auto">
+        <h2 class="text-3xl font-bold text-center text-gray-800 mb-12">{title}</h2>
+        <div class="grid grid-cols-1 md:grid-cols-3 gap-8">
+            <div class="p-6 rounded-lg shadow hover:shadow-lg transition-shadow">
+                <h3 class="text-xl font-semibold mb-2">{title} one</h3>
+                <p class="text-gray-600">Placeholder copy about {topic} that fits the theme of the page.</p>
+            </div>
+            <div class="p-6 rounded-lg shadow hover:shadow-lg transition-shadow">
+                <h3 class="text-xl font-semibold mb-2">{title} two</h3>
+                <p class="text-gray-600">More placeholder copy about {topic} with a call to action.</p>
+            </div>
+            <div class="p-6 rounded-lg shadow hover:shadow-lg transition-shadow">
+                <h3 class="text-xl font-semibold mb-2">{title} three</h3>
+                <p class="text-gray-600">A closing note about {topic} and why visitors should care.</p>
+            </div>
+        </div>
+    </div>
+</section>
+"""
+_STUB_TITLES = ["Features", "Services", "Portfolio", "Testimonials", "Pricing", "About", "Team", "FAQ"]
+_STUB_BACKGROUNDS = ["bg-white", "bg-gray-50", "bg-blue-50", "bg-indigo-50"]
+
+
+class StubBackend:
+    """Offline deterministic model for load tests and benchmarks.
+
+    Returns realistic fenced HTML of roughly ``html_bytes`` bytes. Latency is
+    log-normally distributed around ``latency_median`` seconds, streams emit
+    ``chunk_bytes`` chunks every ``chunk_interval`` seconds after the first byte,
+    and ``error_rate`` of calls fail with StubBackendError. A fixed ``seed`` makes
+    latency and error draws reproducible; output depends only on the prompt.
+    """
+
+    def __init__(
+        self,
+        model: str = "stub",
+        html_bytes: int = 20000,
+        latency_median: float = 2.0,
+        latency_sigma: float = 0.5,
+        first_byte_fraction: float = 0.2,
+        chunk_bytes: int = 512,
+        chunk_interval: float = 0.02,
+        error_rate: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        self.model = model
+        self.html_bytes = html_bytes
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.first_byte_fraction = first_byte_fraction
+        self.chunk_bytes = chunk_bytes
+        self.chunk_interval = chunk_interval
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+
+    def _latency(self) -> float:
+        if self.latency_median <= 0:
+            return 0.0
+        return self._random.lognormvariate(0.0, self.latency_sigma) * self.latency_median
+
+    def _maybe_fail(self) -> None:
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise StubBackendError("Injected stub backend failure")
+
+    def render(self, contents: str) -> str:
+        """Deterministic model-style output for a prompt"""
+        digest = int(hashlib.sha256(contents.encode("utf-8")).hexdigest(), 16)
+        topic = escape(contents.strip().splitlines()[0][:60]) if contents.strip() else "your website"
+        parts = ["```html\n<nav class=\"bg-white shadow-lg\"><div class=\"max-w-7xl mx-auto px-4\">Stub Site</div></nav>\n"]
+        size = len(parts[0])
+        index = 0
+        while size < self.html_bytes:
+            section = _STUB_SECTION.format(
+                anchor=f"section-{index}",
+                background=_STUB_BACKGROUNDS[(digest + index) % len(_STUB_BACKGROUNDS)],
+                title=_STUB_TITLES[(digest + index) % len(_STUB_TITLES)],
+                topic=topic,
+            )
+            parts.append(section)
+            size += len(section)
+            index += 1
+        parts.append("<footer class=\"bg-gray-800 text-white py-8 px-4\"><p>&copy; Stub Site</p></footer>\n```")
+        return "".join(parts)
+
+    def generate(self, contents: str, temperature: Optional[float] = None, seed: Optional[int] = None) -> str:
+        time.sleep(self._latency())
+        self._maybe_fail()
+        return self.render(contents)
+
+    async def agenerate(self, contents: str, temperature: Optional[float] = None, seed: Optional[int] = None) -> str:
+        await asyncio.sleep(self._latency())
+        self._maybe_fail()
+        return self.render(contents)
+
+    async def astream(self, contents: str, temperature: Optional[float] = None, seed: Optional[int] = None) -> AsyncIterator[str]:
+        await asyncio.sleep(self._latency() * self.first_byte_fraction)
+        self._maybe_fail()
+        html = self.render(contents)
+        for start in range(0, len(html), self.chunk_bytes):
+            if start:
+                await asyncio.sleep(self.chunk_interval)
+            yield html[start:start + self.chunk_bytes]
+
+
+def create_backend(name: Optional[str] = None, model: Optional[str] = None, api_key: Optional[str] = None) -> ModelBackend:
+    """Build the backend selected by ``name`` or the MODEL_BACKEND environment variable"""
+    name = (name or os.getenv("MODEL_BACKEND", "gemini")).lower()
+    if name == "gemini":
+        return GeminiBackend(api_key=api_key, model=model or DEFAULT_MODEL)
+    if name == "stub":
+        seed = os.getenv("STUB_SEED")
+        logger.info("Using offline stub model backend")
+        return StubBackend(
+            html_bytes=int(os.getenv("STUB_HTML_BYTES", "20000")),
+            latency_median=float(os.getenv("STUB_LATENCY_MEDIAN_SECONDS", "2.0")),
+            latency_sigma=float(os.getenv("STUB_LATENCY_SIGMA", "0.5")),
+            chunk_bytes=int(os.getenv("STUB_CHUNK_BYTES", "512")),
+            chunk_interval=float(os.getenv("STUB_CHUNK_INTERVAL_SECONDS", "0.02")),
+            error_rate=float(os.getenv("STUB_ERROR_RATE", "0")),
+            seed=int(seed) if seed is not None else None,
+        )
+    raise ValueError(f"Unknown model backend: {name}")
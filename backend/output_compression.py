@@ -0,0 +1,215 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+import gzip
+import hashlib
+import logging
+import re
+import threading
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Elements whose content is whitespace-sensitive or not HTML at all
+_PROTECTED = re.compile(r"<(pre|script|textarea|style)\b[^>]*>.*?</\1\s*>", re.IGNORECASE | re.DOTALL)
+# Comments, but not IE conditional comments
+_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def minify_html(html: str) -> str:
+    """Collapse whitespace and drop comments outside <pre>, <script>, <textarea> and <style>.
+
+    Runs of whitespace become a single space rather than being removed, so
+    spacing between inline elements renders the same.
+    """
+    parts = []
+    position = 0
+    for match in _PROTECTED.finditer(html):
+        parts.append(_minify_markup(html[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_minify_markup(html[position:]))
+    return "".join(parts).strip()
+
+
+def _minify_markup(markup: str) -> str:
+    return _WHITESPACE.sub(" ", _COMMENT.sub("", markup))
+
+
+def parse_accept_encoding(header: Optional[str]) -> Dict[str, float]:
+    """Map each coding in an Accept-Encoding header to its q-value"""
+    accepted = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def negotiate(header: Optional[str]) -> Optional[str]:
+    """Best supported content coding for an Accept-Encoding header, or None for identity"""
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get("*", 0.0)
+    best, best_quality = None, 0.0
+    # Listed in preference order, so ties go to brotli
+    for coding in ("br", "gzip"):
+        if coding == "br" and brotli is None:
+            continue
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(body: bytes, coding: str, gzip_level: int = 6, brotli_quality: int = 5) -> bytes:
+    if coding == "gzip":
+        # mtime=0 keeps the output byte-identical for identical bodies
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    if coding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    raise ValueError(f"Unsupported content coding: {coding}")
+
+
+def compress_chunks(chunks: Iterable[bytes], coding: str, gzip_level: int = 6, brotli_quality: int = 5) -> List[bytes]:
+    """``compress`` for a body given as chunks, without joining them first"""
+    if coding == "gzip":
+        # wbits 31: a gzip container (mtime 0) around the deflate stream
+        compressor = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+        out = [compressor.compress(chunk) for chunk in chunks]
+        out.append(compressor.flush())
+    elif coding == "br":
+        compressor = brotli.Compressor(quality=brotli_quality)
+        out = [compressor.process(chunk) for chunk in chunks]
+        out.append(compressor.finish())
+    else:
+        raise ValueError(f"Unsupported content coding: {coding}")
+    return [chunk for chunk in out if chunk]
+
+
+class CompressedArtifact:
+    """A response body and its compressed variants, each computed at most once"""
+
+    __slots__ = ("identity", "etag", "variants", "_lock", "_gzip_level", "_brotli_quality")
+
+    def __init__(self, body: bytes, gzip_level: int = 6, brotli_quality: int = 5, etag: Optional[str] = None):
+        self.identity = body
+        self.etag = etag or hashlib.sha256(body).hexdigest()
+        self.variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        self._gzip_level = gzip_level
+        self._brotli_quality = brotli_quality
+
+    def variant(self, coding: Optional[str]) -> bytes:
+        if coding is None:
+            return self.identity
+        encoded = self.variants.get(coding)
+        if encoded is None:
+            with self._lock:
+                encoded = self.variants.get(coding)
+                if encoded is None:
+                    encoded = self._compress(coding)
+                    self.variants[coding] = encoded
+        return encoded
+
+    def _compress(self, coding: str) -> bytes:
+        return compress(self.identity, coding, self._gzip_level, self._brotli_quality)
+
+    def precompress(self) -> "CompressedArtifact":
+        """Build every supported variant up front"""
+        self.variant("gzip")
+        if brotli is not None:
+            self.variant("br")
+        return self
+
+    def size(self) -> int:
+        return len(self.identity) + sum(len(encoded) for encoded in self.variants.values())
+
+
+class ArtifactCache:
+    """LRU of compressed artifacts keyed by body digest, bounded by total bytes.
+
+    Identical bodies (the same generated page served again, a deployed
+    document) are compressed once per coding and then served from memory.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.max_bytes = max_bytes
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._artifacts: "OrderedDict[str, CompressedArtifact]" = OrderedDict()
+        # Size each artifact was accounted at; variants may be added after storing
+        self._sizes: Dict[str, int] = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def artifact(self, body: bytes) -> CompressedArtifact:
+        digest = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            artifact = self._artifacts.get(digest)
+            if artifact is not None:
+                self._artifacts.move_to_end(digest)
+                self.hits += 1
+                return artifact
+            self.misses += 1
+        return CompressedArtifact(body, self.gzip_level, self.brotli_quality, etag=digest)
+
+    def encode_chunks(self, chunks: List[bytes], accept_encoding: Optional[str]) -> Tuple[List[bytes], Optional[str]]:
+        """Compressed chunks and Content-Encoding (None for identity) for a
+        per-request body written in pieces; never cached"""
+        coding = negotiate(accept_encoding)
+        if coding is None:
+            return chunks, None
+        return compress_chunks(chunks, coding, self.gzip_level, self.brotli_quality), coding
+
+    def encode(self, body: bytes, accept_encoding: Optional[str], cache: bool = True) -> Tuple[bytes, Optional[str]]:
+        """Body encoded for the client's Accept-Encoding, and the coding used (None for identity).
+
+        Pass ``cache=False`` for bodies that won't be sent again (per-request
+        envelopes with timings, flags...): they are compressed once and not
+        hashed or kept, so they don't push reusable artifacts out.
+        """
+        coding = negotiate(accept_encoding)
+        if coding is None:
+            return body, None
+        if cache:
+            artifact = self.artifact(body)
+            encoded = artifact.variant(coding)
+            self._store(artifact)
+        else:
+            encoded = compress(body, coding, self.gzip_level, self.brotli_quality)
+        if coding is not None and len(encoded) >= len(body):
+            return body, None
+        return encoded, coding
+
+    def _store(self, artifact: CompressedArtifact) -> None:
+        with self._lock:
+            if self._artifacts.pop(artifact.etag, None) is not None:
+                self._bytes -= self._sizes.pop(artifact.etag)
+            size = artifact.size()
+            if size > self.max_bytes:
+                return
+            self._artifacts[artifact.etag] = artifact
+            self._sizes[artifact.etag] = size
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                etag, _ = self._artifacts.popitem(last=False)
+                self._bytes -= self._sizes.pop(etag)
+
+    def stats(self) -> Dict[str, int]:
+        return {"artifacts": len(self._artifacts), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,283 @@
+from typing import Any, Dict, List, Optional, Tuple
+from html import escape
+from html.parser import HTMLParser
+from urllib.parse import parse_qs, urlsplit
+import gzip
+import re
+
+# Attributes whose absence makes a script classic (parser-blocking) JavaScript
+_CLASSIC_SCRIPT_TYPES = {"", "text/javascript", "application/javascript", "application/ecmascript", "text/ecmascript"}
+_FONT_IMPORT = re.compile(
+    r"""@import\s+url\(\s*['"]?(https://fonts\.googleapis\.com/[^'")\s]+)['"]?\s*\)\s*;?""",
+    re.IGNORECASE,
+)
+# Sizes written into image URLs: an explicit 600x400, ?w=600&h=400, or the
+# trailing /800/600 of placeholder services that use that form. Other digit
+# pairs in a path (/2024/05/) are not sizes
+_URL_SIZE = re.compile(r"(?<![\dx])([1-9]\d{1,3})x([1-9]\d{1,3})(?![\dx])")
+_PATH_SIZE = re.compile(r"/([1-9]\d{1,3})/([1-9]\d{1,3})/?$")
+_PATH_SIZE_HOSTS = {"picsum.photos", "placekitten.com", "placebear.com", "loremflickr.com", "baconmockup.com"}
+_SIZE_PARAMS = (("w", "h"), ("width", "height"))
+
+# Rough transfer sizes used for the weight estimate
+BYTES_PER_PIXEL = 0.2
+DEFAULT_IMAGE_BYTES = 80 * 1024
+DEFAULT_SCRIPT_BYTES = 30 * 1024
+FONT_WEIGHT_BYTES = 25 * 1024
+
+
+def font_links(url: str) -> str:
+    """Non-blocking Google Fonts: preconnect to both origins, preload the CSS and
+    apply it once loaded, with a <noscript> fallback"""
+    href = escape(url)
+    return (
+        '<link rel="preconnect" href="https://fonts.googleapis.com">'
+        '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>'
+        f'<link rel="preload" as="style" href="{href}">'
+        f'<link rel="stylesheet" href="{href}" media="print" onload="this.media=\'all\'">'
+        f'<noscript><link rel="stylesheet" href="{href}"></noscript>'
+    )
+
+
+def _font_weights(url: str) -> int:
+    match = re.search(r"wght@([\d;.,]+)", url)
+    return len(re.split(r"[;,]", match.group(1))) if match else 1
+
+
+def _add_attributes(tag_text: str, attributes: List[Tuple[str, str]]) -> str:
+    """Append attributes to the source text of a start tag"""
+    if not attributes:
+        return tag_text
+    added = "".join(f' {name}="{escape(value)}"' if value else f" {name}" for name, value in attributes)
+    cut = len(tag_text) - 2 if tag_text.endswith("/>") else len(tag_text) - 1
+    return tag_text[:cut].rstrip() + added + tag_text[cut:]
+
+
+class _PageRewriter(HTMLParser):
+    """Collects source edits for one page; the source itself is never re-serialized"""
+
+    def __init__(self, html: str, eager_images: int):
+        super().__init__(convert_charrefs=False)
+        self.html = html
+        self.eager_images = eager_images
+        self.line_starts = [0]
+        for match in re.finditer("\n", html):
+            self.line_starts.append(match.end())
+        self.edits: List[Tuple[int, int, str]] = []
+        self.scripts: List[Dict[str, Any]] = []
+        self.images: List[Optional[Tuple[int, int]]] = []
+        self.font_urls: List[str] = []
+        self.lazy_images = 0
+        self.head_end: Optional[int] = None
+        self.body_end: Optional[int] = None
+        self.inline_style_bytes = 0
+        self.inline_script_bytes = 0
+        self.blocking_before = 0
+        self._script: Optional[Dict[str, Any]] = None
+        self._style_start: Optional[int] = None
+
+    def source_offset(self) -> int:
+        line, column = self.getpos()
+        return self.line_starts[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        attributes = {name.lower(): (value or "") for name, value in attrs}
+        start = self.source_offset()
+        tag_text = self.get_starttag_text()
+        if tag == "img":
+            self._image(start, tag_text, attributes)
+        elif tag == "iframe" and "loading" not in attributes:
+            self.edits.append((start, start + len(tag_text), _add_attributes(tag_text, [("loading", "lazy")])))
+        elif tag == "script":
+            self._script = {"start": start, "tag_text": tag_text, "attributes": attributes}
+        elif tag == "style":
+            self._style_start = start
+        elif tag == "link":
+            rel = attributes.get("rel", "").lower()
+            href = attributes.get("href", "")
+            if rel == "stylesheet" and "media" not in attributes:
+                self.blocking_before += 1
+                if href.startswith("https://fonts.googleapis.com/"):
+                    self.font_urls.append(href)
+                    self.edits.append((start, start + len(tag_text), font_links(href)))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        position = self.source_offset()
+        if tag == "script" and self._script is not None:
+            script = self._script
+            self._script = None
+            script["end"] = self.html.index(">", position) + 1
+            self._classify_script(script)
+        elif tag == "style":
+            self._style_start = None
+        elif tag == "head":
+            self.head_end = position
+        elif tag == "body":
+            self.body_end = position
+
+    def handle_data(self, data):
+        if self._script is not None:
+            self._script["text"] = self._script.get("text", "") + data
+        elif self._style_start is not None:
+            self.inline_style_bytes += len(data.encode("utf-8"))
+            offset = self.source_offset()
+            for match in _FONT_IMPORT.finditer(data):
+                self.font_urls.append(match.group(1))
+                self.edits.append((offset + match.start(), offset + match.end(), ""))
+                # The links go in <head> when there is one, else where the style was
+                self.edits.append((self._style_start, self._style_start, font_links(match.group(1))))
+            if _FONT_IMPORT.search(data):
+                self.blocking_before += 1
+
+    def _image(self, start: int, tag_text: str, attributes: Dict[str, str]) -> None:
+        index = len(self.images)
+        dimensions = None
+        if attributes.get("width", "").isdigit() and attributes.get("height", "").isdigit():
+            dimensions = (int(attributes["width"]), int(attributes["height"]))
+        added = []
+        if dimensions is None:
+            dimensions = _url_dimensions(attributes.get("src", ""))
+            if dimensions:
+                # Reserves the box before the image arrives, so nothing shifts
+                if "width" not in attributes and "height" not in attributes:
+                    added += [("width", str(dimensions[0])), ("height", str(dimensions[1]))]
+        self.images.append(dimensions)
+        if "decoding" not in attributes:
+            added.append(("decoding", "async"))
+        if "loading" not in attributes:
+            # The first images are likely above the fold: fetch them early instead
+            if index < self.eager_images:
+                if "fetchpriority" not in attributes:
+                    added.append(("fetchpriority", "high"))
+            else:
+                added.append(("loading", "lazy"))
+                self.lazy_images += 1
+        if added:
+            self.edits.append((start, start + len(tag_text), _add_attributes(tag_text, added)))
+
+    def _classify_script(self, script: Dict[str, Any]) -> None:
+        attributes = script["attributes"]
+        if attributes.get("type", "").lower() not in _CLASSIC_SCRIPT_TYPES:
+            return
+        if "async" in attributes or "defer" in attributes:
+            return
+        script["inline"] = "src" not in attributes
+        if script["inline"]:
+            self.inline_script_bytes += len(script.get("text", "").encode("utf-8"))
+        self.blocking_before += 1
+        self.scripts.append(script)
+
+
+def _url_dimensions(src: str) -> Optional[Tuple[int, int]]:
+    """The image size ``src`` states, if it states one unambiguously"""
+    try:
+        parts = urlsplit(src)
+        hostname = parts.hostname
+    except ValueError:
+        return None
+    query = parse_qs(parts.query)
+    for width, height in _SIZE_PARAMS:
+        if query.get(width, [""])[0].isdigit() and query.get(height, [""])[0].isdigit():
+            return int(query[width][0]), int(query[height][0])
+    match = _URL_SIZE.search(parts.path)
+    if match is None and hostname in _PATH_SIZE_HOSTS:
+        match = _PATH_SIZE.search(parts.path)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+
+def _apply_edits(html: str, edits: List[Tuple[int, int, str]]) -> str:
+    parts = []
+    position = 0
+    # Insertions at an offset come before a replacement starting there
+    for start, end, replacement in sorted(edits, key=lambda edit: (edit[0], edit[1] != edit[0])):
+        if start < position:
+            continue
+        parts.append(html[position:start])
+        parts.append(replacement)
+        position = end
+    parts.append(html[position:])
+    return "".join(parts)
+
+
+def optimize_page(html: str, stylesheet: str = "", eager_images: int = 1) -> Tuple[str, Dict[str, Any]]:
+    """Rewrite generated HTML for faster loading and estimate what it weighs.
+
+    - Images get ``decoding="async"``; all but the first ``eager_images`` get
+      ``loading="lazy"`` (those get ``fetchpriority="high"``), and sizes found
+      in placeholder URLs become ``width``/``height``. Iframes load lazily.
+    - Classic scripts stop blocking the parser: external ones get ``defer``
+      when the page has no inline scripts; otherwise every classic script is
+      moved, in order, to the end of the body so they still run in sequence.
+    - Google Fonts ``@import`` rules and stylesheet links become preconnect
+      and preload links that don't block rendering.
+
+    Works on full documents and on body fragments. Returns the rewritten HTML
+    and the weight report.
+    """
+    rewriter = _PageRewriter(html, eager_images)
+    rewriter.feed(html)
+    rewriter.close()
+    edits = rewriter.edits
+
+    if rewriter.head_end is not None:
+        # Font links collected inside <style> blocks move up into <head>
+        edits = [
+            (rewriter.head_end, rewriter.head_end, replacement)
+            if start == end and replacement.startswith('<link rel="preconnect"') else (start, end, replacement)
+            for start, end, replacement in edits
+        ]
+
+    deferred = moved = 0
+    scripts = rewriter.scripts
+    if scripts and not any(script["inline"] for script in scripts):
+        for script in scripts:
+            tag_text = script["tag_text"]
+            edits.append((script["start"], script["start"] + len(tag_text), _add_attributes(tag_text, [("defer", "")])))
+            deferred += 1
+    elif scripts:
+        tail = "".join(rewriter.html[script["start"]:script["end"]] for script in scripts)
+        for script in scripts:
+            edits.append((script["start"], script["end"], ""))
+        insert_at = rewriter.body_end if rewriter.body_end is not None else len(html)
+        edits.append((insert_at, insert_at, tail))
+        moved = len(scripts)
+
+    optimized = _apply_edits(html, edits)
+    report = estimate_weight(optimized, stylesheet, rewriter)
+    report["optimizations"] = {
+        "lazy_images": rewriter.lazy_images,
+        "scripts_deferred": deferred,
+        "scripts_moved_to_end": moved,
+        "font_imports_replaced": len(rewriter.font_urls),
+    }
+    # Scripts moved to the end still block, but only after the content has rendered
+    unblocked = deferred + moved + len(rewriter.font_urls)
+    report["render_blocking"] = {"before": rewriter.blocking_before, "after": max(0, rewriter.blocking_before - unblocked)}
+    return optimized, report
+
+
+def estimate_weight(html: str, stylesheet: str, rewriter: _PageRewriter) -> Dict[str, Any]:
+    """Estimated transfer size of a page: compressed HTML and CSS plus its subresources"""
+    html_bytes = html.encode("utf-8")
+    css_bytes = stylesheet.encode("utf-8")
+    image_bytes = 0
+    for dimensions in rewriter.images:
+        image_bytes += int(dimensions[0] * dimensions[1] * BYTES_PER_PIXEL) if dimensions else DEFAULT_IMAGE_BYTES
+    external_scripts = sum(1 for script in rewriter.scripts if not script["inline"])
+    font_bytes = sum(_font_weights(url) * FONT_WEIGHT_BYTES for url in rewriter.font_urls)
+    html_gzip = len(gzip.compress(html_bytes, 6))
+    css_gzip = len(gzip.compress(css_bytes, 6)) if css_bytes else 0
+    return {
+        "html_bytes": len(html_bytes),
+        "html_gzip_bytes": html_gzip,
+        "stylesheet_gzip_bytes": css_gzip,
+        "images": len(rewriter.images),
+        "estimated_image_bytes": image_bytes,
+        "external_scripts": external_scripts,
+        "estimated_script_bytes": external_scripts * DEFAULT_SCRIPT_BYTES,
+        "estimated_font_bytes": font_bytes,
+        "estimated_total_bytes": html_gzip + css_gzip + image_bytes + external_scripts * DEFAULT_SCRIPT_BYTES + font_bytes,
+    }
@@ -0,0 +1,106 @@
+from typing import Any, Awaitable, Dict, Optional, Tuple
+from contextlib import contextmanager
+import cProfile
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Profilers hook the thread they start on, and every request shares the loop
+# thread, so only one profile can run at a time
+_profiling = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when a profile is requested while another one is running"""
+
+
+class StageTimings:
+    """Monotonic wall-clock timings for the stages of one request, in milliseconds"""
+
+    __slots__ = ("started", "stages")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds * 1000
+
+    def as_dict(self, total: bool = True) -> Dict[str, float]:
+        timings = {name: round(ms, 3) for name, ms in self.stages.items()}
+        if total:
+            timings["total"] = round((time.perf_counter() - self.started) * 1000, 3)
+        return timings
+
+
+def server_timing(timings: Dict[str, float], **extra: float) -> str:
+    """Format stage timings (milliseconds) as a Server-Timing header value"""
+    entries = dict(timings, **extra)
+    return ", ".join(f"{name};dur={duration:.3f}" for name, duration in entries.items())
+
+
+async def profile_coroutine(coro: Awaitable[Any], directory: str) -> Tuple[Any, Optional[str]]:
+    """Await ``coro`` under a profiler and save the profile to ``directory``.
+
+    Uses pyinstrument's sampling profiler when it is installed, which follows
+    the coroutine across awaits; otherwise falls back to cProfile. Both run on
+    the shared event loop thread, so concurrent requests show up in the
+    profile too. Returns the result and the path of the saved profile.
+
+    Raises ProfilerBusy, without running ``coro``, if another profile is in
+    progress: two profilers on one thread would stop each other.
+    """
+    if not _profiling.acquire(blocking=False):
+        close = getattr(coro, "close", None)
+        if close is not None:
+            close()
+        raise ProfilerBusy("Another request is being profiled; try again when it finishes")
+    try:
+        return await _profile(coro, directory)
+    finally:
+        _profiling.release()
+
+
+async def _profile(coro: Awaitable[Any], directory: str) -> Tuple[Any, Optional[str]]:
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        Profiler = None
+
+    if Profiler is not None:
+        profiler = Profiler(async_mode="enabled")
+        profiler.start()
+        try:
+            result = await coro
+        finally:
+            profiler.stop()
+        path = os.path.join(directory, f"{name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(profiler.output_html())
+    else:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            result = await coro
+        finally:
+            profiler.disable()
+        path = os.path.join(directory, f"{name}.prof")
+        profiler.dump_stats(path)
+
+    logger.info(f"Saved request profile to {path}")
+    return result, path
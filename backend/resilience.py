@@ -0,0 +1,324 @@
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, Optional, TypeVar
+from collections import deque
+from contextlib import contextmanager
+import asyncio
+import logging
+import random
+import threading
+import time
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRIES = metrics.counter("model_retries_total", "Model calls retried after a transient failure")
+HEDGES = metrics.counter("model_hedges_total", "Hedged second model calls started")
+HEDGE_WINS = metrics.counter("model_hedge_wins_total", "Hedged calls that finished before the original")
+DEADLINES_EXCEEDED = metrics.counter("model_deadline_exceeded_total", "Model calls abandoned at the request deadline")
+CIRCUIT_REJECTIONS = metrics.counter("circuit_breaker_rejections_total", "Model calls refused while the circuit breaker was open")
+CIRCUIT_OPENED = metrics.counter("circuit_breaker_opened_total", "Times the circuit breaker opened")
+
+# HTTP statuses worth retrying: timeouts, rate limits and server-side failures
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(TimeoutError):
+    """The request's time budget ran out"""
+
+
+class CircuitOpen(Exception):
+    """The circuit breaker is refusing calls"""
+
+
+class Deadline:
+    """A point in time by which a request must finish"""
+
+    __slots__ = ("expires_at", "charged")
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+        # Set once running out has counted as a breaker failure, so hedged
+        # copies cancelled together count once
+        self.charged = False
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Whether a model call failure is likely transient"""
+    status = getattr(error, "code", None)
+    if not isinstance(status, int):
+        status = getattr(error, "status_code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS
+    if isinstance(error, (ConnectionError, asyncio.TimeoutError)):
+        return True
+    # httpx (under the Gemini SDK) raises TransportError subclasses for
+    # connection resets and read timeouts; matched by name to avoid importing it
+    return any(cls.__name__ == "TransportError" for cls in type(error).__mro__)
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter: attempt n sleeps uniform(0, min(cap, base * 2**n))"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5, max_delay: float = 8.0, rng: Optional[random.Random] = None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._random = rng or random.Random()
+
+    def backoff(self, attempt: int) -> float:
+        return self._random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies, used to pick the hedging delay"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """The latency at ``fraction`` (0-1), or None until enough samples exist"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def hedged(call: Callable[[], Awaitable[T]], hedge_after: Optional[float]) -> T:
+    """Run ``call``; if it hasn't finished after ``hedge_after`` seconds, start a
+    second copy and return whichever finishes first, cancelling the other.
+
+    A copy that fails while the other is still running is ignored; the call
+    only fails when both do.
+    """
+    first = asyncio.ensure_future(call())
+    if hedge_after is None:
+        return await first
+
+    done, _ = await asyncio.wait({first}, timeout=hedge_after)
+    if done:
+        return first.result()
+
+    HEDGES.inc()
+    second = asyncio.ensure_future(call())
+    pending = {first, second}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is second:
+                        HEDGE_WINS.inc()
+                    return task.result()
+                if not pending:
+                    raise task.exception()
+    finally:
+        for task in (first, second):
+            task.cancel()
+    raise RuntimeError("unreachable")
+
+
+async def call_with_retries(
+    call: Callable[[], Awaitable[T]],
+    deadline: Deadline,
+    policy: RetryPolicy,
+    hedge_after: Optional[Callable[[], Optional[float]]] = None,
+) -> T:
+    """Call until it succeeds, a failure isn't retryable, attempts run out or the deadline passes.
+
+    Each attempt is bounded by the time left on ``deadline``, and a backoff
+    that would sleep past it ends the retries early. ``hedge_after`` returns
+    the hedging delay for an attempt, or None not to hedge.
+    """
+    for attempt in range(policy.max_attempts):
+        remaining = deadline.remaining()
+        if remaining <= 0:
+            DEADLINES_EXCEEDED.inc()
+            raise DeadlineExceeded("Deadline exceeded before the model call")
+        delay = hedge_after() if hedge_after else None
+        if delay is not None and delay >= remaining:
+            delay = None
+        try:
+            return await asyncio.wait_for(hedged(call, delay), remaining)
+        except Exception as e:
+            if isinstance(e, asyncio.TimeoutError) and deadline.expired:
+                DEADLINES_EXCEEDED.inc()
+                raise DeadlineExceeded(f"Model call did not finish within the deadline ({attempt + 1} attempts)") from e
+            if not is_retryable(e) or attempt + 1 >= policy.max_attempts:
+                raise
+            backoff = policy.backoff(attempt)
+            if backoff >= deadline.remaining():
+                raise
+            RETRIES.inc()
+            logger.warning(f"Model call failed ({e}); retrying in {backoff:.2f}s")
+        await asyncio.sleep(backoff)
+    raise RuntimeError("unreachable")
+
+
+async def within_deadline(stream: AsyncIterator[T], deadline: Deadline) -> AsyncIterator[T]:
+    """Yield from ``stream``, raising DeadlineExceeded if it stalls past ``deadline``.
+
+    Streams are not retried: by the time one fails its chunks have been sent.
+    """
+    iterator = stream.__aiter__()
+    while True:
+        try:
+            item = await asyncio.wait_for(iterator.__anext__(), deadline.remaining())
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            DEADLINES_EXCEEDED.inc()
+            raise DeadlineExceeded("Model stream did not finish within the deadline")
+        yield item
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops calling a failing dependency and probes it until it recovers.
+
+    Closed: calls go through; ``failure_threshold`` consecutive failures open
+    the breaker. Open: calls are refused with CircuitOpen until
+    ``recovery_seconds`` have passed. Half-open: up to ``half_open_probes``
+    calls go through at a time; ``success_threshold`` successes close the
+    breaker and any failure reopens it.
+
+    Only upstream trouble is a failure: transient errors (``is_retryable``)
+    and calls cut off by their deadline. Client errors such as a rejected
+    prompt, and calls cancelled for other reasons (a hedge that lost, a
+    disconnected client), count as neither.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        recovery_seconds: float = 30.0,
+        half_open_probes: int = 1,
+        success_threshold: int = 1,
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_seconds = recovery_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.success_threshold = max(1, success_threshold)
+        self._state = CLOSED
+        self._failures = 0
+        self._successes = 0
+        self._probes = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.recovery_seconds:
+            self._state = HALF_OPEN
+            self._successes = 0
+            self._probes = 0
+            logger.info("Circuit breaker half-open; probing")
+        return self._state
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        CIRCUIT_OPENED.inc()
+        logger.warning(f"Circuit breaker opened after {self._failures} failures")
+
+    def allow(self) -> bool:
+        """Reserve a call, or return False if it must be refused"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+                self._successes += 1
+                if self._successes >= self.success_threshold:
+                    self._state = CLOSED
+                    logger.info("Circuit breaker closed")
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN:
+                self._open()
+            elif self._state == CLOSED and self._failures >= self.failure_threshold:
+                self._open()
+
+    def release(self) -> None:
+        """Give back a reservation without an outcome (the call was cancelled)"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes = max(0, self._probes - 1)
+
+    @contextmanager
+    def guard(self, deadline: Optional[Deadline] = None) -> Iterator[None]:
+        """Run the body as one call: refused while open, recorded by outcome.
+
+        Pass the call's ``deadline`` so that a cancellation once it has
+        passed (``asyncio.wait_for`` timing the call out) counts as a failure,
+        once per deadline however many calls it cancelled.
+        """
+        if not self.allow():
+            CIRCUIT_REJECTIONS.inc()
+            raise CircuitOpen("Circuit breaker is open; model calls are paused")
+        try:
+            yield
+        except Exception as e:
+            if is_retryable(e) or isinstance(e, DeadlineExceeded):
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        except BaseException:
+            if deadline is not None and deadline.expired and not deadline.charged:
+                deadline.charged = True
+                self.record_failure()
+            else:
+                self.release()
+            raise
+        self.record_success()
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker next lets a probe through (0 unless open)"""
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(0.0, self.recovery_seconds - (time.monotonic() - self._opened_at))
+
+    def stats(self) -> Dict[str, Any]:
+        retry_after = self.retry_after()
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutive_failures": self._failures,
+                "retry_after": round(retry_after, 3),
+            }
@@ -0,0 +1,144 @@
+from typing import Optional, Tuple
+from collections import Counter
+from html.parser import HTMLParser
+import re
+
+SECTION_EDIT_TEMPLATE = """
+You are editing one part of an existing website built with HTML and Tailwind CSS.
+
+Change requested: "{instruction}"
+
+Style context (the classes used most across the page; keep the edited part consistent with them):
+{style_context}
+
+Current HTML of the part to change:
+{fragment}
+
+IMPORTANT: Return ONLY the updated HTML for this one element. Keep the same root tag{root_hint}, keep
+Tailwind CSS classes for styling, and do not return the rest of the page or any <html>, <head> or <body> tags.
+"""
+
+# Targets that name an element rather than an id
+LANDMARK_TAGS = {"nav", "header", "footer", "main", "aside"}
+# Elements that never have an end tag: the start tag is the whole element
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+}
+
+_CLASS_ATTRIBUTE = re.compile(r"""\bclass\s*=\s*(?:"([^"]*)"|'([^']*)')""", re.IGNORECASE)
+
+
+class SectionNotFound(ValueError):
+    """The requested section does not exist in the document"""
+
+
+def parse_target(target: str) -> Tuple[Optional[str], Optional[str]]:
+    """Split a target like ``section#hero``, ``#hero``, ``hero`` or ``footer`` into (tag, id)"""
+    target = target.strip()
+    tag, _, element_id = target.partition("#")
+    tag = tag.lower() or None
+    if not element_id:
+        if tag in LANDMARK_TAGS:
+            return tag, None
+        # A bare name is an id
+        return None, target
+    return tag, element_id
+
+
+class _SectionLocator(HTMLParser):
+    """Finds the source offsets of the first element matching a tag and/or id"""
+
+    def __init__(self, html: str, tag: Optional[str], element_id: Optional[str]):
+        super().__init__(convert_charrefs=False)
+        self.html = html
+        self.tag = tag
+        self.element_id = element_id
+        self.line_starts = [0]
+        for match in re.finditer("\n", html):
+            self.line_starts.append(match.end())
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self.matched_tag: Optional[str] = None
+        self.depth = 0
+
+    def source_offset(self) -> int:
+        line, column = self.getpos()
+        return self.line_starts[line - 1] + column
+
+    def handle_starttag(self, tag, attrs):
+        if self.end is not None:
+            return
+        if self.start is None:
+            if self._matches(tag, attrs):
+                self.start = self.source_offset()
+                if tag in VOID_TAGS:
+                    self.end = self.start + len(self.get_starttag_text())
+                    return
+                self.matched_tag = tag
+                self.depth = 1
+        elif tag == self.matched_tag:
+            self.depth += 1
+
+    def handle_startendtag(self, tag, attrs):
+        if self.start is None and self.end is None and self._matches(tag, attrs):
+            self.start = self.source_offset()
+            self.end = self.start + len(self.get_starttag_text())
+
+    def handle_endtag(self, tag):
+        if self.start is None or self.end is not None or tag != self.matched_tag:
+            return
+        self.depth -= 1
+        if self.depth == 0:
+            position = self.source_offset()
+            self.end = self.html.index(">", position) + 1
+
+    def _matches(self, tag, attrs) -> bool:
+        if self.tag and tag != self.tag:
+            return False
+        if self.element_id is None:
+            return True
+        return dict(attrs).get("id") == self.element_id
+
+
+def locate_section(html: str, target: str) -> Tuple[int, int]:
+    """Source offsets ``(start, end)`` of the element a target names"""
+    tag, element_id = parse_target(target)
+    locator = _SectionLocator(html, tag, element_id)
+    locator.feed(html)
+    locator.close()
+    if locator.start is None:
+        raise SectionNotFound(f"Section not found: {target}")
+    if locator.end is None:
+        # An omitted end tag (<p>, <li>, ...) or broken markup: the element's
+        # extent is a guess, and a wrong one would replace the rest of the page
+        raise SectionNotFound(f"Section {target} has no end tag; target an element that encloses it")
+    return locator.start, locator.end
+
+
+def style_context(html: str, limit: int = 40) -> str:
+    """The most used classes in a page, as a compact hint of its visual language"""
+    counts: Counter = Counter()
+    for match in _CLASS_ATTRIBUTE.finditer(html):
+        counts.update((match.group(1) or match.group(2) or "").split())
+    return " ".join(name for name, _ in counts.most_common(limit)) or "(no classes)"
+
+
+def build_edit_prompt(html: str, start: int, end: int, instruction: str) -> str:
+    fragment = html[start:end]
+    root = re.match(r"<([a-zA-Z][\w-]*)", fragment)
+    element_id = re.search(r"""\bid\s*=\s*["']([^"']+)["']""", fragment[:fragment.find(">") + 1])
+    root_hint = ""
+    if root:
+        root_hint = f" (<{root.group(1)}>"
+        root_hint += f" with id=\"{element_id.group(1)}\")" if element_id else ")"
+    return SECTION_EDIT_TEMPLATE.format(
+        instruction=instruction,
+        style_context=style_context(html),
+        fragment=fragment,
+        root_hint=root_hint,
+    )
+
+
+def splice(html: str, start: int, end: int, fragment: str) -> str:
+    """``html`` with the source between ``start`` and ``end`` replaced by ``fragment``"""
+    return html[:start] + fragment + html[end:]
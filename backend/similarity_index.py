@@ -0,0 +1,457 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from array import array
+from bisect import bisect_left
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+_MAGIC = b"SIMIDX"
+
+# Words that don't change what page is being asked for
+STOPWORDS = frozenset("a an the for of with and to my our your me please i want need make create build".split())
+_NON_WORD = re.compile(r"[^\w]+")
+SHINGLE_SIZE = 4
+# Odd 64-bit constant that distinguishes densified bins from real ones
+_ROTATION = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase words without punctuation or stopwords, single-spaced"""
+    words = _NON_WORD.sub(" ", text.casefold()).split()
+    return " ".join(word for word in words if word not in STOPWORDS)
+
+
+def shingle_hashes(text: str) -> List[int]:
+    """64-bit hashes of the character shingles of the normalized text"""
+    normalized = normalize_text(text)
+    if len(normalized) <= SHINGLE_SIZE:
+        shingles = {normalized}
+    else:
+        shingles = {normalized[i:i + SHINGLE_SIZE] for i in range(len(normalized) - SHINGLE_SIZE + 1)}
+    return [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles]
+
+
+def signature(text: str, num_bins: int) -> bytes:
+    """One-permutation MinHash with densification, kept to 8 bits per bin.
+
+    Each shingle is hashed once and only the minimum per bin is kept, so the
+    cost is one hash per shingle rather than one per shingle per permutation.
+    Empty bins borrow the next non-empty bin's value, offset by the distance,
+    which keeps the collision probability of each bin equal to the Jaccard
+    similarity.
+    """
+    bins: List[Optional[int]] = [None] * num_bins
+    for h in shingle_hashes(text):
+        index = h % num_bins
+        value = h // num_bins
+        current = bins[index]
+        if current is None or value < current:
+            bins[index] = value
+
+    result = bytearray(num_bins)
+    for i in range(num_bins):
+        steps = 0
+        value = bins[i]
+        while value is None:
+            steps += 1
+            value = bins[(i + steps) % num_bins]
+        result[i] = ((value + steps * _ROTATION) & _MASK64) & 0xFF
+    return bytes(result)
+
+
+def jaccard(a: str, b: str) -> float:
+    """Exact shingle Jaccard similarity of two texts"""
+    x, y = set(shingle_hashes(a)), set(shingle_hashes(b))
+    return len(x & y) / len(x | y) if x or y else 1.0
+
+
+def estimate_similarity(a: bytes, b: bytes) -> float:
+    """Jaccard estimate from two 8-bit signatures, corrected for chance byte collisions"""
+    matches = sum(x == y for x, y in zip(a, b))
+    chance = 1 / 256
+    return max(0.0, (matches / len(a) - chance) / (1 - chance))
+
+
+def _prefix(key_bytes: bytes) -> int:
+    return int.from_bytes(key_bytes[:8], "little")
+
+
+def _link(entries: Dict[int, Union[int, List[int]]], key_bytes: bytes, entry: int) -> None:
+    """Add ``entry`` under its key prefix"""
+    prefix = _prefix(key_bytes)
+    found = entries.get(prefix)
+    if found is None:
+        entries[prefix] = entry
+    elif isinstance(found, int):
+        entries[prefix] = [found, entry]
+    else:
+        found.append(entry)
+
+
+class SimilarityIndex:
+    """Near-duplicate lookup from prompt text to the cache key of an earlier generation.
+
+    Signatures are 8-bit one-permutation MinHashes split into LSH bands; two
+    prompts land in the same bucket of some band with high probability once
+    their shingle Jaccard similarity is near ``threshold``, and each candidate
+    is then checked against the full signature.
+
+    Storage is flat: signatures and SHA-256 keys are packed into bytearrays and
+    each band is a sorted ``array('Q')`` of ``band_value << 32 | entry`` looked
+    up by bisection, about 128 bytes per entry with the defaults, plus about
+    100 for the dict from key prefix to entries that ``discard`` uses. Inserting shifts each band array,
+    which is fine at one insert per model call but should run off the event
+    loop, as should ``discard`` and ``save``.
+
+    Estimates from 8-bit bins are noisy (about +/-0.06 at 32 bins), so lookups
+    return every candidate within ``margin`` of the threshold, best first, for
+    the caller to confirm with ``jaccard`` on the stored text. Entries are
+    dropped with ``discard`` (when their key expires) or oldest first past
+    ``max_entries``; dropped entries are skipped until the next save compacts
+    them away. Compaction works on a snapshot outside the lock, so lookups
+    carry on while it runs.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        num_bins: int = 32,
+        bands: int = 8,
+        namespace: str = "",
+        path: Optional[str] = None,
+        autosave_seconds: float = 60.0,
+        max_candidates: int = 64,
+        max_entries: int = 1_000_000,
+        margin: float = 0.15,
+    ):
+        if num_bins % bands:
+            raise ValueError("num_bins must be a multiple of bands")
+        self.threshold = threshold
+        self.num_bins = num_bins
+        self.bands = bands
+        self.rows = num_bins // bands
+        self.namespace = namespace
+        self.path = path
+        self.autosave_seconds = autosave_seconds
+        self.max_candidates = max_candidates
+        self.max_entries = max_entries
+        self.margin = margin
+        self._signatures = bytearray()
+        self._keys = bytearray()
+        self._buckets = [array("Q") for _ in range(bands)]
+        # Entries by the first 8 bytes of their key (a list only when several
+        # share it), so discard doesn't scan the key array
+        self._entries: Dict[int, Union[int, List[int]]] = {}
+        # Dropped entries, and the first entry that may still be live
+        self._dead = set()
+        self._oldest = 0
+        # Bumped whenever entries are added or renumbered; a compaction built
+        # from a snapshot is only swapped in if it hasn't moved
+        self._layout = 0
+        self._lock = threading.Lock()
+        self._last_saved = time.monotonic()
+        self._dirty = False
+        self._saving = False
+        self._hits = 0
+        self._misses = 0
+        if path and os.path.exists(path):
+            self._load(path)
+
+    def __len__(self) -> int:
+        return len(self._keys) // 32 - len(self._dead)
+
+    def _slots(self) -> int:
+        return len(self._keys) // 32
+
+    def _band_values(self, sig: bytes) -> List[int]:
+        rows = self.rows
+        return [int.from_bytes(sig[band * rows:(band + 1) * rows], "little") for band in range(self.bands)]
+
+    def add(self, text: str, key: str) -> None:
+        """Index ``text`` as an alias for ``key`` (a SHA-256 hex digest)"""
+        sig = signature(text, self.num_bins)
+        key_bytes = bytes.fromhex(key)
+        with self._lock:
+            if any(similarity >= 1.0 and self._key(entry) == key_bytes for entry, similarity in self._matches(sig, 1.0)):
+                return
+            entry = self._slots()
+            if entry >= 1 << 32:
+                return
+            self._signatures += sig
+            self._keys += key_bytes
+            _link(self._entries, key_bytes, entry)
+            self._layout += 1
+            for band, value in enumerate(self._band_values(sig)):
+                bucket = self._buckets[band]
+                item = value << 32 | entry
+                bucket.insert(bisect_left(bucket, item), item)
+            while len(self) > self.max_entries:
+                if self._oldest not in self._dead:
+                    self._dead.add(self._oldest)
+                self._oldest += 1
+            self._dirty = True
+        self._maybe_autosave()
+
+    def extend(self, entries: Iterable[Tuple[bytes, bytes]]) -> None:
+        """Bulk-insert precomputed (signature, 32-byte key digest) pairs, sorting each band once"""
+        if self._dead:
+            self._compact()
+        with self._lock:
+            first = self._slots()
+            added = []
+            for sig, key_bytes in entries:
+                _link(self._entries, key_bytes, first + len(added))
+                self._signatures += sig
+                self._keys += key_bytes
+                added.append(sig)
+            self._layout += 1
+            for band in range(self.bands):
+                rows = self.rows
+                items = [
+                    int.from_bytes(sig[band * rows:(band + 1) * rows], "little") << 32 | (first + offset)
+                    for offset, sig in enumerate(added)
+                ]
+                bucket = self._buckets[band]
+                bucket.extend(items)
+                self._buckets[band] = array("Q", sorted(bucket))
+            self._dirty = True
+
+    def lookup(self, text: str) -> List[Tuple[str, float]]:
+        """Keys of indexed prompts whose estimated similarity is within ``margin``
+        of the threshold, with the estimate, most similar first"""
+        sig = signature(text, self.num_bins)
+        with self._lock:
+            matches = self._matches(sig, self.threshold - self.margin)
+            if matches:
+                self._hits += 1
+            else:
+                self._misses += 1
+            return [(self._key(entry).hex(), similarity) for entry, similarity in matches]
+
+    def discard(self, key: str) -> int:
+        """Drop every entry for ``key`` (a SHA-256 hex digest), returning how many there were"""
+        key_bytes = bytes.fromhex(key)
+        with self._lock:
+            found = self._entries.get(_prefix(key_bytes), ())
+            # Dropped entries stay in the dict until the next compaction
+            dropped = [
+                entry for entry in ((found,) if isinstance(found, int) else found)
+                if entry not in self._dead and self._key(entry) == key_bytes
+            ]
+            self._dead.update(dropped)
+            if dropped:
+                self._dirty = True
+        return len(dropped)
+
+    def _key(self, entry: int) -> bytes:
+        return bytes(self._keys[entry * 32:(entry + 1) * 32])
+
+    def _matches(self, sig: bytes, minimum: float) -> List[Tuple[int, float]]:
+        found = {}
+        width = self.num_bins
+        for band, value in enumerate(self._band_values(sig)):
+            bucket = self._buckets[band]
+            low = value << 32
+            i = bisect_left(bucket, low)
+            scanned = 0
+            while i < len(bucket) and bucket[i] >> 32 == value and scanned < self.max_candidates:
+                entry = bucket[i] & 0xFFFFFFFF
+                i += 1
+                # Dropped entries don't use up the candidate budget
+                if entry in found or entry in self._dead:
+                    continue
+                scanned += 1
+                found[entry] = estimate_similarity(sig, self._signatures[entry * width:(entry + 1) * width])
+        return sorted(
+            ((entry, similarity) for entry, similarity in found.items() if similarity >= minimum),
+            key=lambda match: -match[1],
+        )
+
+    def _snapshot(self) -> Tuple[int, int, bytes, bytes, List[bytes], frozenset]:
+        """Copies of the arrays to compact or save outside the lock; call with the lock held"""
+        return (
+            self._layout,
+            self._slots(),
+            bytes(self._signatures),
+            bytes(self._keys),
+            [bucket.tobytes() for bucket in self._buckets],
+            frozenset(self._dead),
+        )
+
+    def _compacted(self, slots: int, signatures: bytes, keys: bytes, buckets: List[bytes], dead: frozenset):
+        """The arrays of a snapshot without its dropped entries, and the old-to-new entry map"""
+        width = self.num_bins
+        remap = array("q")
+        live_signatures = bytearray()
+        live_keys = bytearray()
+        for entry in range(slots):
+            if entry in dead:
+                remap.append(-1)
+                continue
+            remap.append(len(live_keys) // 32)
+            live_signatures += signatures[entry * width:(entry + 1) * width]
+            live_keys += keys[entry * 32:(entry + 1) * 32]
+        # Renumbering keeps entry order, so each band stays sorted
+        high = ~0xFFFFFFFF
+        live_buckets = []
+        for data in buckets:
+            bucket = array("Q")
+            bucket.frombytes(data)
+            live_buckets.append(array("Q", [
+                (item & high) | remap[item & 0xFFFFFFFF] for item in bucket if remap[item & 0xFFFFFFFF] >= 0
+            ]))
+        return live_signatures, live_keys, live_buckets, remap
+
+    def _compact(self) -> Optional[Tuple[bytes, bytes, List[bytes]]]:
+        """Drop dead entries from a snapshot built outside the lock, swapping it in
+        unless entries were added meanwhile. Returns the compacted arrays as bytes,
+        ready to save, or None if there was nothing to drop."""
+        with self._lock:
+            if not self._dead:
+                return None
+            layout, slots, signatures, keys, buckets, dead = self._snapshot()
+        live_signatures, live_keys, live_buckets, remap = self._compacted(slots, signatures, keys, buckets, dead)
+        entries: Dict[int, Union[int, List[int]]] = {}
+        for entry in range(len(live_keys) // 32):
+            _link(entries, live_keys[entry * 32:entry * 32 + 8], entry)
+        with self._lock:
+            if self._layout == layout:
+                self._signatures = live_signatures
+                self._keys = live_keys
+                self._buckets = live_buckets
+                # Dropped while the copy was being built: still dropped once renumbered
+                self._dead = {remap[entry] for entry in self._dead - dead if remap[entry] >= 0}
+                self._entries = entries
+                self._oldest = 0
+                self._layout += 1
+        return bytes(live_signatures), bytes(live_keys), [bucket.tobytes() for bucket in live_buckets]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._signatures = bytearray()
+            self._keys = bytearray()
+            self._buckets = [array("Q") for _ in range(self.bands)]
+            self._entries = {}
+            self._dead = set()
+            self._oldest = 0
+            self._layout += 1
+            self._dirty = True
+        self._maybe_autosave(force=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self),
+                "bytes": len(self._signatures) + len(self._keys) + sum(b.itemsize * len(b) for b in self._buckets),
+                "threshold": self.threshold,
+                "hits": self._hits,
+                "misses": self._misses,
+            }
+
+    def _maybe_autosave(self, force: bool = False) -> None:
+        if not self.path:
+            return
+        if force:
+            self.save()
+            return
+        with self._lock:
+            if self._saving or time.monotonic() - self._last_saved < self.autosave_seconds:
+                return
+            self._saving = True
+        # add() runs on the event loop; writing a large index takes a while
+        threading.Thread(target=self._autosave, name="similarity-index-save", daemon=True).start()
+
+    def _autosave(self) -> None:
+        try:
+            self.save()
+        except Exception as e:
+            logger.error(f"Failed to save similarity index: {e}")
+        finally:
+            with self._lock:
+                self._saving = False
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the index atomically: a JSON header line followed by the raw arrays"""
+        path = path or self.path
+        if not path:
+            return
+        with self._lock:
+            if not self._dirty and path == self.path:
+                return
+            # Changes from here on are left for the next save
+            self._dirty = False
+            self._last_saved = time.monotonic()
+        compacted = self._compact()
+        if compacted is None:
+            with self._lock:
+                _, _, signatures, keys, buckets, _ = self._snapshot()
+        else:
+            signatures, keys, buckets = compacted
+        header = {
+            "version": FORMAT_VERSION,
+            "namespace": self.namespace,
+            "num_bins": self.num_bins,
+            "bands": self.bands,
+            "entries": len(keys) // 32,
+        }
+
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_MAGIC + json.dumps(header).encode("utf-8") + b"\n")
+                f.write(signatures)
+                f.write(keys)
+                for data in buckets:
+                    f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        logger.info(f"Saved similarity index ({header['entries']} entries) to {path}")
+
+    def _load(self, path: str) -> None:
+        with open(path, "rb") as f:
+            data = f.read()
+        newline = data.find(b"\n")
+        if not data.startswith(_MAGIC) or newline < 0:
+            logger.warning(f"Ignoring unreadable similarity index at {path}")
+            return
+        header = json.loads(data[len(_MAGIC):newline])
+        if (
+            header.get("version") != FORMAT_VERSION
+            or header.get("namespace") != self.namespace
+            or header.get("num_bins") != self.num_bins
+            or header.get("bands") != self.bands
+        ):
+            # Built for another model, prompt template or layout: start over
+            logger.info(f"Similarity index at {path} does not match this configuration; starting empty")
+            return
+
+        entries = header["entries"]
+        position = newline + 1
+        self._signatures = bytearray(data[position:position + entries * self.num_bins])
+        position += entries * self.num_bins
+        self._keys = bytearray(data[position:position + entries * 32])
+        position += entries * 32
+        for band in range(self.bands):
+            bucket = array("Q")
+            bucket.frombytes(data[position:position + entries * bucket.itemsize])
+            position += entries * bucket.itemsize
+            self._buckets[band] = bucket
+        for entry in range(entries):
+            _link(self._entries, self._keys[entry * 32:entry * 32 + 8], entry)
+        logger.info(f"Loaded similarity index with {entries} entries from {path}")
@@ -0,0 +1,76 @@
+from typing import Any, Awaitable, Callable, Dict, Tuple
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters", "shared")
+
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+        self.shared = False
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one in-flight call.
+
+    The first caller for a key starts the call; callers arriving while it is
+    running await the same result. Semantics:
+
+    - Every waiter receives the same result, or the same exception re-raised.
+    - A cancelled waiter only detaches itself. The shared call keeps running
+      while any other waiter remains and is cancelled once the last one leaves.
+    - The key is released as soon as the call finishes, so later callers start
+      a fresh call (results are not memoized here; that is the cache's job).
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Run ``fn`` or join the call already running for ``key``.
+
+        Returns the result and whether it was shared with other callers.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task: self._release(key, flight))
+            self.calls += 1
+        else:
+            flight.shared = True
+            self.coalesced += 1
+            logger.info(f"Coalesced request onto in-flight call ({flight.waiters} already waiting)")
+
+        flight.waiters += 1
+        try:
+            result = await asyncio.shield(flight.task)
+            return result, flight.shared
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _release(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Retrieve the exception so an abandoned failed call isn't logged as unhandled
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+        }
@@ -0,0 +1,875 @@
+"""Static Tailwind CSS for generated pages, without the CDN JIT runtime.
+
+``extract_classes`` scans a page for candidate class names the way Tailwind's
+content scanner does (classes toggled from scripts count too), and
+``build_stylesheet`` emits rules only for the candidates that resolve against
+the bundled utility table below, prefixed with Tailwind's preflight reset.
+Nothing is downloaded; unknown classes are simply ignored.
+
+The table follows Tailwind v3's default theme and covers the utilities and
+variants (responsive, hover/focus/active/..., group-hover, dark, negative
+values, opacity modifiers, arbitrary values) that generated pages use.
+"""
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from functools import lru_cache
+import re
+
+BREAKPOINTS = [("sm", 640), ("md", 768), ("lg", 1024), ("xl", 1280), ("2xl", 1536)]
+
+PSEUDO_VARIANTS = {
+    "hover": ":hover",
+    "focus": ":focus",
+    "focus-within": ":focus-within",
+    "focus-visible": ":focus-visible",
+    "active": ":active",
+    "visited": ":visited",
+    "disabled": ":disabled",
+    "checked": ":checked",
+    "first": ":first-child",
+    "last": ":last-child",
+    "odd": ":nth-child(odd)",
+    "even": ":nth-child(even)",
+}
+GROUP_VARIANTS = {"group-hover": ":hover", "group-focus": ":focus", "group-active": ":active"}
+
+_SHADES = ("50", "100", "200", "300", "400", "500", "600", "700", "800", "900", "950")
+_PALETTE = {
+    "slate": "f8fafc f1f5f9 e2e8f0 cbd5e1 94a3b8 64748b 475569 334155 1e293b 0f172a 020617",
+    "gray": "f9fafb f3f4f6 e5e7eb d1d5db 9ca3af 6b7280 4b5563 374151 1f2937 111827 030712",
+    "zinc": "fafafa f4f4f5 e4e4e7 d4d4d8 a1a1aa 71717a 52525b 3f3f46 27272a 18181b 09090b",
+    "neutral": "fafafa f5f5f5 e5e5e5 d4d4d4 a3a3a3 737373 525252 404040 262626 171717 0a0a0a",
+    "stone": "fafaf9 f5f5f4 e7e5e4 d6d3d1 a8a29e 78716c 57534e 44403c 292524 1c1917 0c0a09",
+    "red": "fef2f2 fee2e2 fecaca fca5a5 f87171 ef4444 dc2626 b91c1c 991b1b 7f1d1d 450a0a",
+    "orange": "fff7ed ffedd5 fed7aa fdba74 fb923c f97316 ea580c c2410c 9a3412 7c2d12 431407",
+    "amber": "fffbeb fef3c7 fde68a fcd34d fbbf24 f59e0b d97706 b45309 92400e 78350f 451a03",
+    "yellow": "fefce8 fef9c3 fef08a fde047 facc15 eab308 ca8a04 a16207 854d0e 713f12 422006",
+    "lime": "f7fee7 ecfccb d9f99d bef264 a3e635 84cc16 65a30d 4d7c0f 3f6212 365314 1a2e05",
+    "green": "f0fdf4 dcfce7 bbf7d0 86efac 4ade80 22c55e 16a34a 15803d 166534 14532d 052e16",
+    "emerald": "ecfdf5 d1fae5 a7f3d0 6ee7b7 34d399 10b981 059669 047857 065f46 064e3b 022c22",
+    "teal": "f0fdfa ccfbf1 99f6e4 5eead4 2dd4bf 14b8a6 0d9488 0f766e 115e59 134e4a 042f2e",
+    "cyan": "ecfeff cffafe a5f3fc 67e8f9 22d3ee 06b6d4 0891b2 0e7490 155e75 164e63 083344",
+    "sky": "f0f9ff e0f2fe bae6fd 7dd3fc 38bdf8 0ea5e9 0284c7 0369a1 075985 0c4a6e 082f49",
+    "blue": "eff6ff dbeafe bfdbfe 93c5fd 60a5fa 3b82f6 2563eb 1d4ed8 1e40af 1e3a8a 172554",
+    "indigo": "eef2ff e0e7ff c7d2fe a5b4fc 818cf8 6366f1 4f46e5 4338ca 3730a3 312e81 1e1b4b",
+    "violet": "f5f3ff ede9fe ddd6fe c4b5fd a78bfa 8b5cf6 7c3aed 6d28d9 5b21b6 4c1d95 2e1065",
+    "purple": "faf5ff f3e8ff e9d5ff d8b4fe c084fc a855f7 9333ea 7e22ce 6b21a8 581c87 3b0764",
+    "fuchsia": "fdf4ff fae8ff f5d0fe f0abfc e879f9 d946ef c026d3 a21caf 86198f 701a75 4a044e",
+    "pink": "fdf2f8 fce7f3 fbcfe8 f9a8d4 f472b6 ec4899 db2777 be185d 9d174d 831843 500724",
+    "rose": "fff1f2 ffe4e6 fecdd3 fda4af fb7185 f43f5e e11d48 be123c 9f1239 881337 4c0519",
+}
+COLORS: Dict[str, str] = {"black": "000000", "white": "ffffff"}
+for _name, _hexes in _PALETTE.items():
+    COLORS.update({f"{_name}-{shade}": value for shade, value in zip(_SHADES, _hexes.split())})
+COLOR_KEYWORDS = {"transparent": "transparent", "current": "currentColor", "inherit": "inherit"}
+
+SPACING: Dict[str, str] = {"0": "0px", "px": "1px"}
+for _step in (0.5, 1, 1.5, 2, 2.5, 3, 3.5, 4, 5, 6, 7, 8, 9, 10, 11, 12, 14, 16, 20, 24, 28,
+              32, 36, 40, 44, 48, 52, 56, 60, 64, 72, 80, 96):
+    SPACING[f"{_step:g}"] = f"{_step / 4:g}rem"
+
+TEXT_SIZES = {
+    "xs": ("0.75rem", "1rem"), "sm": ("0.875rem", "1.25rem"), "base": ("1rem", "1.5rem"),
+    "lg": ("1.125rem", "1.75rem"), "xl": ("1.25rem", "1.75rem"), "2xl": ("1.5rem", "2rem"),
+    "3xl": ("1.875rem", "2.25rem"), "4xl": ("2.25rem", "2.5rem"), "5xl": ("3rem", "1"),
+    "6xl": ("3.75rem", "1"), "7xl": ("4.5rem", "1"), "8xl": ("6rem", "1"), "9xl": ("8rem", "1"),
+}
+FONT_WEIGHTS = {
+    "thin": "100", "extralight": "200", "light": "300", "normal": "400", "medium": "500",
+    "semibold": "600", "bold": "700", "extrabold": "800", "black": "900",
+}
+FONT_FAMILIES = {
+    "sans": 'ui-sans-serif,system-ui,sans-serif,"Apple Color Emoji","Segoe UI Emoji","Segoe UI Symbol","Noto Color Emoji"',
+    "serif": 'ui-serif,Georgia,Cambria,"Times New Roman",Times,serif',
+    "mono": 'ui-monospace,SFMono-Regular,Menlo,Monaco,Consolas,"Liberation Mono","Courier New",monospace',
+}
+LEADING = {"none": "1", "tight": "1.25", "snug": "1.375", "normal": "1.5", "relaxed": "1.625", "loose": "2"}
+TRACKING = {"tighter": "-0.05em", "tight": "-0.025em", "normal": "0em", "wide": "0.025em", "wider": "0.05em", "widest": "0.1em"}
+MAX_WIDTHS = {
+    "0": "0rem", "none": "none", "xs": "20rem", "sm": "24rem", "md": "28rem", "lg": "32rem", "xl": "36rem",
+    "2xl": "42rem", "3xl": "48rem", "4xl": "56rem", "5xl": "64rem", "6xl": "72rem", "7xl": "80rem",
+    "full": "100%", "min": "min-content", "max": "max-content", "fit": "fit-content", "prose": "65ch",
+    **{f"screen-{name}": f"{width}px" for name, width in BREAKPOINTS},
+}
+RADII = {"none": "0px", "sm": "0.125rem", "": "0.25rem", "md": "0.375rem", "lg": "0.5rem",
+         "xl": "0.75rem", "2xl": "1rem", "3xl": "1.5rem", "full": "9999px"}
+RADIUS_SIDES = {
+    "": ("border-radius",),
+    "t": ("border-top-left-radius", "border-top-right-radius"),
+    "r": ("border-top-right-radius", "border-bottom-right-radius"),
+    "b": ("border-bottom-right-radius", "border-bottom-left-radius"),
+    "l": ("border-top-left-radius", "border-bottom-left-radius"),
+    "tl": ("border-top-left-radius",), "tr": ("border-top-right-radius",),
+    "br": ("border-bottom-right-radius",), "bl": ("border-bottom-left-radius",),
+}
+SHADOWS = {
+    "sm": "0 1px 2px 0 rgb(0 0 0 / 0.05)",
+    "": "0 1px 3px 0 rgb(0 0 0 / 0.1), 0 1px 2px -1px rgb(0 0 0 / 0.1)",
+    "md": "0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1)",
+    "lg": "0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)",
+    "xl": "0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1)",
+    "2xl": "0 25px 50px -12px rgb(0 0 0 / 0.25)",
+    "inner": "inset 0 2px 4px 0 rgb(0 0 0 / 0.05)",
+    "none": "0 0 #0000",
+}
+BLURS = {"none": "0", "sm": "4px", "": "8px", "md": "12px", "lg": "16px", "xl": "24px", "2xl": "40px", "3xl": "64px"}
+GRADIENT_DIRECTIONS = {
+    "t": "to top", "tr": "to top right", "r": "to right", "br": "to bottom right",
+    "b": "to bottom", "bl": "to bottom left", "l": "to left", "tl": "to top left",
+}
+BORDER_SIDES = {
+    "border": ("border-width",), "border-x": ("border-left-width", "border-right-width"),
+    "border-y": ("border-top-width", "border-bottom-width"), "border-t": ("border-top-width",),
+    "border-r": ("border-right-width",), "border-b": ("border-bottom-width",), "border-l": ("border-left-width",),
+}
+PADDING = {
+    "p": ("padding",), "px": ("padding-left", "padding-right"), "py": ("padding-top", "padding-bottom"),
+    "pt": ("padding-top",), "pr": ("padding-right",), "pb": ("padding-bottom",), "pl": ("padding-left",),
+}
+MARGIN = {
+    "m": ("margin",), "mx": ("margin-left", "margin-right"), "my": ("margin-top", "margin-bottom"),
+    "mt": ("margin-top",), "mr": ("margin-right",), "mb": ("margin-bottom",), "ml": ("margin-left",),
+}
+INSET = {
+    "inset": ("top", "right", "bottom", "left"), "inset-x": ("left", "right"), "inset-y": ("top", "bottom"),
+    "top": ("top",), "right": ("right",), "bottom": ("bottom",), "left": ("left",),
+}
+TRANSFORM = (
+    "translate(var(--tw-translate-x),var(--tw-translate-y)) rotate(var(--tw-rotate)) "
+    "skewX(var(--tw-skew-x)) skewY(var(--tw-skew-y)) scaleX(var(--tw-scale-x)) scaleY(var(--tw-scale-y))"
+)
+BOX_SHADOW = "box-shadow:var(--tw-ring-offset-shadow),var(--tw-ring-shadow),var(--tw-shadow)"
+TRANSITION_PROPERTIES = {
+    "": "color,background-color,border-color,text-decoration-color,fill,stroke,opacity,box-shadow,transform,filter,backdrop-filter",
+    "all": "all",
+    "colors": "color,background-color,border-color,text-decoration-color,fill,stroke",
+    "opacity": "opacity",
+    "shadow": "box-shadow",
+    "transform": "transform",
+}
+KEYFRAMES = {
+    "spin": "@keyframes spin{to{transform:rotate(360deg)}}",
+    "ping": "@keyframes ping{75%,100%{transform:scale(2);opacity:0}}",
+    "pulse": "@keyframes pulse{50%{opacity:.5}}",
+    "bounce": (
+        "@keyframes bounce{0%,100%{transform:translateY(-25%);animation-timing-function:cubic-bezier(0.8,0,1,1)}"
+        "50%{transform:none;animation-timing-function:cubic-bezier(0,0,0.2,1)}}"
+    ),
+}
+ANIMATIONS = {
+    "spin": "spin 1s linear infinite",
+    "ping": "ping 1s cubic-bezier(0,0,0.2,1) infinite",
+    "pulse": "pulse 2s cubic-bezier(0.4,0,0.6,1) infinite",
+    "bounce": "bounce 1s infinite",
+    "none": "none",
+}
+
+# Emission order, following the order of Tailwind's core plugins so that
+# utilities overriding each other (colour then opacity, ...) cascade the same way
+_ORDER = {name: index for index, name in enumerate((
+    "sr", "pointer-events", "visibility", "position", "inset", "isolation", "z-index", "order",
+    "grid-column", "grid-row", "float", "margin", "box-sizing", "line-clamp", "display", "aspect",
+    "height", "max-height", "min-height", "width", "min-width", "max-width", "flex", "flex-shrink",
+    "flex-grow", "flex-basis", "table", "transform-value", "transform", "animation", "cursor",
+    "select", "resize", "list", "appearance", "grid-cols", "grid-rows", "grid-flow", "flex-direction",
+    "flex-wrap", "place", "align-content", "align-items", "justify-content", "justify-items", "gap",
+    "space", "divide-width", "divide-color", "align-self", "overflow", "scroll", "text-overflow",
+    "whitespace", "word-break", "border-radius", "border-width", "border-style", "border-color",
+    "border-opacity", "background-color", "background-opacity", "background-image", "gradient-from",
+    "gradient-via", "gradient-to", "background-size", "background-attachment", "background-clip",
+    "background-position", "background-repeat", "object-fit", "object-position", "svg", "padding",
+    "text-align", "vertical-align", "font-family", "font-size", "font-weight", "text-transform",
+    "font-style", "line-height", "letter-spacing", "text-color", "text-opacity", "text-decoration",
+    "underline-offset", "font-smoothing", "placeholder-color", "opacity", "box-shadow", "outline",
+    "ring-width", "ring-color", "ring-offset-width", "ring-offset-color", "filter", "backdrop-filter",
+    "transition-property", "transition-delay", "transition-duration", "transition-timing",
+))}
+
+_STATIC_GROUPS = {
+    "sr": {
+        "sr-only": "position:absolute;width:1px;height:1px;padding:0;margin:-1px;overflow:hidden;clip:rect(0,0,0,0);white-space:nowrap;border-width:0",
+        "not-sr-only": "position:static;width:auto;height:auto;padding:0;margin:0;overflow:visible;clip:auto;white-space:normal",
+    },
+    "pointer-events": {"pointer-events-none": "pointer-events:none", "pointer-events-auto": "pointer-events:auto"},
+    "visibility": {"visible": "visibility:visible", "invisible": "visibility:hidden", "collapse": "visibility:collapse"},
+    "position": {name: f"position:{name}" for name in ("static", "fixed", "absolute", "relative", "sticky")},
+    "isolation": {"isolate": "isolation:isolate", "isolation-auto": "isolation:auto"},
+    "float": {"float-left": "float:left", "float-right": "float:right", "float-none": "float:none", "clear-both": "clear:both"},
+    "box-sizing": {"box-border": "box-sizing:border-box", "box-content": "box-sizing:content-box"},
+    "display": {
+        **{name: f"display:{name}" for name in (
+            "block", "inline-block", "inline", "flex", "inline-flex", "table", "inline-table",
+            "table-cell", "table-row", "grid", "inline-grid", "contents", "list-item", "flow-root")},
+        "hidden": "display:none",
+    },
+    "aspect": {"aspect-auto": "aspect-ratio:auto", "aspect-square": "aspect-ratio:1/1", "aspect-video": "aspect-ratio:16/9"},
+    "flex": {
+        "flex-1": "flex:1 1 0%", "flex-auto": "flex:1 1 auto", "flex-initial": "flex:0 1 auto", "flex-none": "flex:none",
+    },
+    "flex-shrink": {"shrink": "flex-shrink:1", "shrink-0": "flex-shrink:0", "flex-shrink": "flex-shrink:1", "flex-shrink-0": "flex-shrink:0"},
+    "flex-grow": {"grow": "flex-grow:1", "grow-0": "flex-grow:0", "flex-grow": "flex-grow:1", "flex-grow-0": "flex-grow:0"},
+    "table": {
+        "table-auto": "table-layout:auto", "table-fixed": "table-layout:fixed",
+        "border-collapse": "border-collapse:collapse", "border-separate": "border-collapse:separate",
+    },
+    "transform": {"transform": f"transform:{TRANSFORM}", "transform-gpu": f"transform:translate3d(var(--tw-translate-x),var(--tw-translate-y),0) rotate(var(--tw-rotate)) skewX(var(--tw-skew-x)) skewY(var(--tw-skew-y)) scaleX(var(--tw-scale-x)) scaleY(var(--tw-scale-y))", "transform-none": "transform:none"},
+    "cursor": {f"cursor-{name}": f"cursor:{name}" for name in (
+        "auto", "default", "pointer", "wait", "text", "move", "help", "not-allowed", "grab", "grabbing")},
+    "select": {f"select-{name}": f"-webkit-user-select:{name};user-select:{name}" for name in ("none", "text", "all", "auto")},
+    "resize": {"resize-none": "resize:none", "resize": "resize:both", "resize-y": "resize:vertical", "resize-x": "resize:horizontal"},
+    "list": {
+        "list-none": "list-style-type:none", "list-disc": "list-style-type:disc", "list-decimal": "list-style-type:decimal",
+        "list-inside": "list-style-position:inside", "list-outside": "list-style-position:outside",
+    },
+    "appearance": {"appearance-none": "-webkit-appearance:none;appearance:none"},
+    "grid-flow": {
+        "grid-flow-row": "grid-auto-flow:row", "grid-flow-col": "grid-auto-flow:column",
+        "grid-flow-dense": "grid-auto-flow:dense", "grid-flow-row-dense": "grid-auto-flow:row dense",
+    },
+    "flex-direction": {
+        "flex-row": "flex-direction:row", "flex-row-reverse": "flex-direction:row-reverse",
+        "flex-col": "flex-direction:column", "flex-col-reverse": "flex-direction:column-reverse",
+    },
+    "flex-wrap": {"flex-wrap": "flex-wrap:wrap", "flex-wrap-reverse": "flex-wrap:wrap-reverse", "flex-nowrap": "flex-wrap:nowrap"},
+    "place": {
+        "place-items-center": "place-items:center", "place-items-start": "place-items:start",
+        "place-items-end": "place-items:end", "place-content-center": "place-content:center",
+        "place-self-center": "place-self:center",
+    },
+    "align-content": {f"content-{name}": f"align-content:{value}" for name, value in (
+        ("center", "center"), ("start", "flex-start"), ("end", "flex-end"),
+        ("between", "space-between"), ("around", "space-around"), ("evenly", "space-evenly"))},
+    "align-items": {f"items-{name}": f"align-items:{value}" for name, value in (
+        ("start", "flex-start"), ("end", "flex-end"), ("center", "center"), ("baseline", "baseline"), ("stretch", "stretch"))},
+    "justify-content": {f"justify-{name}": f"justify-content:{value}" for name, value in (
+        ("normal", "normal"), ("start", "flex-start"), ("end", "flex-end"), ("center", "center"),
+        ("between", "space-between"), ("around", "space-around"), ("evenly", "space-evenly"), ("stretch", "stretch"))},
+    "justify-items": {f"justify-items-{name}": f"justify-items:{name}" for name in ("start", "end", "center", "stretch")},
+    "align-self": {f"self-{name}": f"align-self:{value}" for name, value in (
+        ("auto", "auto"), ("start", "flex-start"), ("end", "flex-end"), ("center", "center"), ("stretch", "stretch"), ("baseline", "baseline"))},
+    "overflow": {
+        **{f"overflow-{name}": f"overflow:{name}" for name in ("auto", "hidden", "clip", "visible", "scroll")},
+        **{f"overflow-x-{name}": f"overflow-x:{name}" for name in ("auto", "hidden", "clip", "visible", "scroll")},
+        **{f"overflow-y-{name}": f"overflow-y:{name}" for name in ("auto", "hidden", "clip", "visible", "scroll")},
+    },
+    "scroll": {"scroll-smooth": "scroll-behavior:smooth", "scroll-auto": "scroll-behavior:auto"},
+    "text-overflow": {
+        "truncate": "overflow:hidden;text-overflow:ellipsis;white-space:nowrap",
+        "text-ellipsis": "text-overflow:ellipsis", "text-clip": "text-overflow:clip",
+    },
+    "whitespace": {f"whitespace-{name}": f"white-space:{name}" for name in ("normal", "nowrap", "pre", "pre-line", "pre-wrap", "break-spaces")},
+    "word-break": {
+        "break-normal": "overflow-wrap:normal;word-break:normal", "break-words": "overflow-wrap:break-word",
+        "break-all": "word-break:break-all", "break-keep": "word-break:keep-all",
+    },
+    "border-style": {f"border-{name}": f"border-style:{name}" for name in ("solid", "dashed", "dotted", "double", "hidden", "none")},
+    "background-image": {"bg-none": "background-image:none"},
+    "background-size": {"bg-auto": "background-size:auto", "bg-cover": "background-size:cover", "bg-contain": "background-size:contain"},
+    "background-attachment": {"bg-fixed": "background-attachment:fixed", "bg-local": "background-attachment:local", "bg-scroll": "background-attachment:scroll"},
+    "background-clip": {
+        "bg-clip-border": "background-clip:border-box", "bg-clip-padding": "background-clip:padding-box",
+        "bg-clip-content": "background-clip:content-box", "bg-clip-text": "-webkit-background-clip:text;background-clip:text",
+    },
+    "background-position": {f"bg-{name}": f"background-position:{name.replace('-', ' ')}" for name in (
+        "bottom", "center", "left", "left-bottom", "left-top", "right", "right-bottom", "right-top", "top")},
+    "background-repeat": {
+        "bg-repeat": "background-repeat:repeat", "bg-no-repeat": "background-repeat:no-repeat",
+        "bg-repeat-x": "background-repeat:repeat-x", "bg-repeat-y": "background-repeat:repeat-y",
+    },
+    "object-fit": {f"object-{name}": f"object-fit:{name}" for name in ("contain", "cover", "fill", "none", "scale-down")},
+    "object-position": {f"object-{name}": f"object-position:{name}" for name in ("bottom", "center", "left", "right", "top")},
+    "svg": {"fill-current": "fill:currentColor", "stroke-current": "stroke:currentColor", "fill-none": "fill:none"},
+    "text-align": {f"text-{name}": f"text-align:{name}" for name in ("left", "center", "right", "justify", "start", "end")},
+    "vertical-align": {f"align-{name}": f"vertical-align:{name}" for name in ("baseline", "top", "middle", "bottom", "text-top", "text-bottom")},
+    "text-transform": {
+        "uppercase": "text-transform:uppercase", "lowercase": "text-transform:lowercase",
+        "capitalize": "text-transform:capitalize", "normal-case": "text-transform:none",
+    },
+    "font-style": {"italic": "font-style:italic", "not-italic": "font-style:normal"},
+    "text-decoration": {
+        "underline": "text-decoration-line:underline", "overline": "text-decoration-line:overline",
+        "line-through": "text-decoration-line:line-through", "no-underline": "text-decoration-line:none",
+    },
+    "font-smoothing": {
+        "antialiased": "-webkit-font-smoothing:antialiased;-moz-osx-font-smoothing:grayscale",
+        "subpixel-antialiased": "-webkit-font-smoothing:auto;-moz-osx-font-smoothing:auto",
+    },
+    "outline": {
+        "outline-none": "outline:2px solid transparent;outline-offset:2px", "outline": "outline-style:solid",
+        "outline-dashed": "outline-style:dashed", "outline-dotted": "outline-style:dotted",
+    },
+    "ring-width": {"ring-inset": "--tw-ring-inset:inset"},
+    "transition-timing": {
+        "ease-linear": "transition-timing-function:linear", "ease-in": "transition-timing-function:cubic-bezier(0.4,0,1,1)",
+        "ease-out": "transition-timing-function:cubic-bezier(0,0,0.2,1)", "ease-in-out": "transition-timing-function:cubic-bezier(0.4,0,0.2,1)",
+    },
+}
+STATIC: Dict[str, Tuple[str, str]] = {}
+for _group, _entries in _STATIC_GROUPS.items():
+    for _name, _css in _entries.items():
+        STATIC[_name] = (_group, _css)
+
+_ARBITRARY = re.compile(r"^\[(.+)\]$")
+_FRACTION = re.compile(r"^(\d+)/(\d+)$")
+_NUMBER = re.compile(r"^\d+(\.\d+)?$")
+_HEX = re.compile(r"^#([0-9a-fA-F]{3}|[0-9a-fA-F]{6})$")
+
+
+def _arbitrary(value: str) -> Optional[str]:
+    match = _ARBITRARY.match(value)
+    return match.group(1).replace("_", " ") if match else None
+
+
+def _fraction(value: str) -> Optional[str]:
+    match = _FRACTION.match(value)
+    if not match or int(match.group(2)) == 0:
+        return None
+    percent = f"{int(match.group(1)) / int(match.group(2)) * 100:.6f}".rstrip("0").rstrip(".")
+    return f"{percent}%"
+
+
+def _length(value: str, extra: Optional[Dict[str, str]] = None, fractions: bool = False) -> Optional[str]:
+    if extra and value in extra:
+        return extra[value]
+    if value in SPACING:
+        return SPACING[value]
+    if fractions:
+        fraction = _fraction(value)
+        if fraction:
+            return fraction
+    return _arbitrary(value)
+
+
+def _negate(value: str) -> Optional[str]:
+    if value in ("auto", "none") or value.endswith(("screen", "content")):
+        return None
+    if value.startswith("-"):
+        return value[1:]
+    return f"calc({value} * -1)" if value.startswith(("calc", "var", "min", "max")) else f"-{value}"
+
+
+def _color(value: str) -> Optional[Tuple[str, Optional[str]]]:
+    """Resolve a colour name with an optional /opacity modifier.
+
+    Returns ``(rgb, alpha)`` where rgb is "r g b" (or a literal CSS colour with
+    alpha None when it can't take an opacity).
+    """
+    name, _, modifier = value.partition("/")
+    alpha = None
+    if modifier:
+        if _NUMBER.match(modifier):
+            alpha = f"{float(modifier) / 100:g}"
+        else:
+            alpha = _arbitrary(modifier)
+        if alpha is None:
+            return None
+
+    if name in COLOR_KEYWORDS:
+        return COLOR_KEYWORDS[name], None
+    hex_value = COLORS.get(name)
+    if hex_value is None:
+        arbitrary = _arbitrary(name)
+        if arbitrary is None:
+            return None
+        if not _HEX.match(arbitrary):
+            if arbitrary.startswith(("rgb", "hsl", "var(")):
+                return arbitrary, None
+            return None
+        hex_value = arbitrary[1:]
+        if len(hex_value) == 3:
+            hex_value = "".join(c * 2 for c in hex_value)
+    rgb = " ".join(str(int(hex_value[i:i + 2], 16)) for i in (0, 2, 4))
+    return rgb, alpha
+
+
+def _color_css(prop: str, value: str, opacity_var: Optional[str] = None) -> Optional[str]:
+    resolved = _color(value)
+    if resolved is None:
+        return None
+    rgb, alpha = resolved
+    if " " not in rgb:
+        return f"{prop}:{rgb}"
+    if alpha is not None:
+        return f"{prop}:rgb({rgb} / {alpha})"
+    if opacity_var:
+        return f"{opacity_var}:1;{prop}:rgb({rgb} / var({opacity_var}))"
+    return f"{prop}:rgb({rgb})"
+
+
+def _props(props: Iterable[str], value: str) -> str:
+    return ";".join(f"{prop}:{value}" for prop in props)
+
+
+def _transparent(value: str) -> str:
+    resolved = _color(value)
+    if resolved is None or " " not in resolved[0]:
+        return "rgb(255 255 255 / 0)"
+    return f"rgb({resolved[0]} / 0)"
+
+
+def _gradient_color(value: str) -> Optional[str]:
+    resolved = _color(value)
+    if resolved is None:
+        return None
+    rgb, alpha = resolved
+    if " " not in rgb:
+        return rgb
+    return f"rgb({rgb} / {alpha})" if alpha is not None else f"rgb({rgb})"
+
+
+def _resolve_functional(key: str, value: str, negative: bool) -> Optional[Tuple[str, str, str]]:
+    """Resolve ``key-value`` utilities; returns (group, css, selector suffix)"""
+
+    def signed(length: Optional[str]) -> Optional[str]:
+        if length is None or not negative:
+            return length
+        return _negate(length)
+
+    if key in PADDING and not negative:
+        length = _length(value)
+        return length and ("padding", _props(PADDING[key], length), "")
+    if key in MARGIN:
+        length = signed(_length(value, {"auto": "auto"}))
+        return length and ("margin", _props(MARGIN[key], length), "")
+    if key in INSET:
+        length = signed(_length(value, {"auto": "auto", "full": "100%"}, fractions=True))
+        return length and ("inset", _props(INSET[key], length), "")
+    if key in ("space-x", "space-y"):
+        length = signed(_length(value))
+        prop = "margin-left" if key == "space-x" else "margin-top"
+        return length and ("space", f"{prop}:{length}", " > :not([hidden]) ~ :not([hidden])")
+    if key in ("gap", "gap-x", "gap-y") and not negative:
+        length = _length(value)
+        prop = {"gap": "gap", "gap-x": "column-gap", "gap-y": "row-gap"}[key]
+        return length and ("gap", f"{prop}:{length}", "")
+
+    if negative and key not in ("z", "order", "translate-x", "translate-y", "rotate", "skew-x", "skew-y"):
+        return None
+
+    if key == "w":
+        length = _length(value, {"auto": "auto", "full": "100%", "screen": "100vw", "min": "min-content",
+                                 "max": "max-content", "fit": "fit-content"}, fractions=True)
+        return length and ("width", f"width:{length}", "")
+    if key == "h":
+        length = _length(value, {"auto": "auto", "full": "100%", "screen": "100vh", "min": "min-content",
+                                 "max": "max-content", "fit": "fit-content", "dvh": "100dvh"}, fractions=True)
+        return length and ("height", f"height:{length}", "")
+    if key == "min-w":
+        length = _length(value, {"full": "100%", "min": "min-content", "max": "max-content", "fit": "fit-content", "screen": "100vw"})
+        return length and ("min-width", f"min-width:{length}", "")
+    if key == "min-h":
+        length = _length(value, {"full": "100%", "screen": "100vh", "min": "min-content", "max": "max-content",
+                                 "fit": "fit-content", "dvh": "100dvh"})
+        return length and ("min-height", f"min-height:{length}", "")
+    if key == "max-w":
+        length = MAX_WIDTHS.get(value) or _arbitrary(value)
+        return length and ("max-width", f"max-width:{length}", "")
+    if key == "max-h":
+        length = _length(value, {"full": "100%", "screen": "100vh", "none": "none", "fit": "fit-content"})
+        return length and ("max-height", f"max-height:{length}", "")
+    if key == "basis":
+        length = _length(value, {"auto": "auto", "full": "100%"}, fractions=True)
+        return length and ("flex-basis", f"flex-basis:{length}", "")
+    if key == "z":
+        z = value if value in ("0", "10", "20", "30", "40", "50") else _arbitrary(value)
+        if value == "auto":
+            z = "auto"
+        return z and ("z-index", f"z-index:{signed(z)}", "")
+    if key == "order":
+        order = {"first": "-9999", "last": "9999", "none": "0"}.get(value, value if value.isdigit() else None)
+        return order and ("order", f"order:{signed(order)}", "")
+
+    if key == "grid-cols":
+        if value.isdigit():
+            return "grid-cols", f"grid-template-columns:repeat({value},minmax(0,1fr))", ""
+        arbitrary = _arbitrary(value) or ("none" if value == "none" else None)
+        return arbitrary and ("grid-cols", f"grid-template-columns:{arbitrary}", "")
+    if key == "grid-rows":
+        if value.isdigit():
+            return "grid-rows", f"grid-template-rows:repeat({value},minmax(0,1fr))", ""
+        return None
+    if key in ("col-span", "row-span"):
+        prop, group = ("grid-column", "grid-column") if key == "col-span" else ("grid-row", "grid-row")
+        if value == "full":
+            return group, f"{prop}:1 / -1", ""
+        return (group, f"{prop}:span {value} / span {value}", "") if value.isdigit() else None
+    if key in ("col-start", "col-end", "row-start", "row-end"):
+        prop = {"col-start": "grid-column-start", "col-end": "grid-column-end",
+                "row-start": "grid-row-start", "row-end": "grid-row-end"}[key]
+        group = "grid-column" if key.startswith("col") else "grid-row"
+        return (group, f"{prop}:{value}", "") if value.isdigit() or value == "auto" else None
+
+    if key == "text":
+        if value in TEXT_SIZES:
+            size, line_height = TEXT_SIZES[value]
+            return "font-size", f"font-size:{size};line-height:{line_height}", ""
+        arbitrary = _arbitrary(value)
+        if arbitrary and arbitrary[:1].isdigit():
+            return "font-size", f"font-size:{arbitrary}", ""
+        css = _color_css("color", value, "--tw-text-opacity")
+        return css and ("text-color", css, "")
+    if key == "font":
+        if value in FONT_WEIGHTS:
+            return "font-weight", f"font-weight:{FONT_WEIGHTS[value]}", ""
+        if value in FONT_FAMILIES:
+            return "font-family", f"font-family:{FONT_FAMILIES[value]}", ""
+        return None
+    if key == "leading":
+        height = LEADING.get(value) or SPACING.get(value) or _arbitrary(value)
+        return height and ("line-height", f"line-height:{height}", "")
+    if key == "tracking":
+        spacing = TRACKING.get(value) or _arbitrary(value)
+        return spacing and ("letter-spacing", f"letter-spacing:{spacing}", "")
+    if key == "line-clamp":
+        if value == "none":
+            return "line-clamp", "overflow:visible;display:block;-webkit-box-orient:horizontal;-webkit-line-clamp:none", ""
+        if value.isdigit():
+            return "line-clamp", f"overflow:hidden;display:-webkit-box;-webkit-box-orient:vertical;-webkit-line-clamp:{value}", ""
+        return None
+    if key == "underline-offset":
+        offset = {"auto": "auto"}.get(value, f"{value}px" if value.isdigit() else None)
+        return offset and ("underline-offset", f"text-underline-offset:{offset}", "")
+    if key == "decoration":
+        if value.isdigit():
+            return "text-decoration", f"text-decoration-thickness:{value}px", ""
+        css = _color_css("text-decoration-color", value)
+        return css and ("text-decoration", css, "")
+    if key == "placeholder":
+        css = _color_css("color", value, "--tw-placeholder-opacity")
+        return css and ("placeholder-color", css, "::placeholder")
+
+    if key == "bg":
+        arbitrary = _arbitrary(value)
+        if arbitrary and arbitrary.startswith(("url(", "linear-gradient", "radial-gradient")):
+            return "background-image", f"background-image:{arbitrary}", ""
+        css = _color_css("background-color", value, "--tw-bg-opacity")
+        return css and ("background-color", css, "")
+    if key == "bg-gradient-to":
+        direction = GRADIENT_DIRECTIONS.get(value)
+        return direction and ("background-image", f"background-image:linear-gradient({direction},var(--tw-gradient-stops))", "")
+    if key == "from":
+        color = _gradient_color(value)
+        return color and (
+            "gradient-from",
+            f"--tw-gradient-from:{color};--tw-gradient-to:{_transparent(value)};"
+            "--tw-gradient-stops:var(--tw-gradient-from),var(--tw-gradient-to)",
+            "",
+        )
+    if key == "via":
+        color = _gradient_color(value)
+        return color and (
+            "gradient-via",
+            f"--tw-gradient-to:{_transparent(value)};"
+            f"--tw-gradient-stops:var(--tw-gradient-from),{color},var(--tw-gradient-to)",
+            "",
+        )
+    if key == "to":
+        color = _gradient_color(value)
+        return color and ("gradient-to", f"--tw-gradient-to:{color}", "")
+
+    if key in ("bg-opacity", "text-opacity", "border-opacity", "placeholder-opacity", "opacity"):
+        if not value.isdigit():
+            return None
+        amount = f"{int(value) / 100:g}"
+        if key == "opacity":
+            return "opacity", f"opacity:{amount}", ""
+        group = {"bg-opacity": "background-opacity", "text-opacity": "text-opacity",
+                 "border-opacity": "border-opacity", "placeholder-opacity": "placeholder-color"}[key]
+        return group, f"--tw-{key}:{amount}", "::placeholder" if key == "placeholder-opacity" else ""
+
+    if key in BORDER_SIDES:
+        if value.isdigit():
+            return "border-width", _props(BORDER_SIDES[key], f"{value}px"), ""
+        if key == "border":
+            css = _color_css("border-color", value, "--tw-border-opacity")
+            return css and ("border-color", css, "")
+        return None
+    if key.startswith("rounded-") and key[8:] in RADIUS_SIDES:
+        radius = RADII.get(value) if value else None
+        return radius and ("border-radius", _props(RADIUS_SIDES[key[8:]], radius), "")
+    if key == "rounded":
+        if value in RADIUS_SIDES:
+            return "border-radius", _props(RADIUS_SIDES[value], RADII[""]), ""
+        radius = RADII.get(value) or _arbitrary(value)
+        return radius and ("border-radius", f"border-radius:{radius}", "")
+    if key in ("divide-x", "divide-y"):
+        if not value.isdigit():
+            return None
+        first, last = ("border-left-width", "border-right-width") if key == "divide-x" else ("border-top-width", "border-bottom-width")
+        return "divide-width", f"{last}:0;{first}:{value}px", " > :not([hidden]) ~ :not([hidden])"
+    if key == "divide":
+        css = _color_css("border-color", value, "--tw-divide-opacity")
+        return css and ("divide-color", css, " > :not([hidden]) ~ :not([hidden])")
+
+    if key == "shadow":
+        shadow = SHADOWS.get(value)
+        return shadow and ("box-shadow", f"--tw-shadow:{shadow};{BOX_SHADOW}", "")
+    if key == "ring":
+        if value.isdigit():
+            return (
+                "ring-width",
+                "--tw-ring-offset-shadow:var(--tw-ring-inset,) 0 0 0 var(--tw-ring-offset-width,0px) var(--tw-ring-offset-color,#fff);"
+                f"--tw-ring-shadow:var(--tw-ring-inset,) 0 0 0 calc({value}px + var(--tw-ring-offset-width,0px)) "
+                f"var(--tw-ring-color,rgb(59 130 246 / 0.5));{BOX_SHADOW}",
+                "",
+            )
+        color = _gradient_color(value)
+        return color and ("ring-color", f"--tw-ring-color:{color}", "")
+    if key == "ring-offset":
+        if value.isdigit():
+            return "ring-offset-width", f"--tw-ring-offset-width:{value}px", ""
+        color = _gradient_color(value)
+        return color and ("ring-offset-color", f"--tw-ring-offset-color:{color}", "")
+    if key == "outline-offset" and value.isdigit():
+        return "outline", f"outline-offset:{value}px", ""
+    if key == "outline":
+        if value.isdigit():
+            return "outline", f"outline-width:{value}px", ""
+        css = _color_css("outline-color", value)
+        return css and ("outline", css, "")
+    if key in ("fill", "stroke"):
+        if key == "stroke" and value.isdigit():
+            return "svg", f"stroke-width:{value}", ""
+        css = _color_css(key, value)
+        return css and ("svg", css, "")
+
+    if key in ("translate-x", "translate-y"):
+        length = signed(_length(value, {"full": "100%"}, fractions=True))
+        return length and ("transform-value", f"--tw-{key}:{length};transform:{TRANSFORM}", "")
+    if key in ("scale", "scale-x", "scale-y"):
+        if not value.isdigit():
+            return None
+        amount = f"{int(value) / 100:g}"
+        axes = ("x", "y") if key == "scale" else (key[-1],)
+        return "transform-value", ";".join(f"--tw-scale-{axis}:{amount}" for axis in axes) + f";transform:{TRANSFORM}", ""
+    if key in ("rotate", "skew-x", "skew-y"):
+        degrees = f"{value}deg" if _NUMBER.match(value) else _arbitrary(value)
+        var = "--tw-rotate" if key == "rotate" else f"--tw-{key}"
+        return degrees and ("transform-value", f"{var}:{signed(degrees)};transform:{TRANSFORM}", "")
+    if key == "origin":
+        origin = value.replace("-", " ") if value in (
+            "center", "top", "top-right", "right", "bottom-right", "bottom", "bottom-left", "left", "top-left") else None
+        return origin and ("transform", f"transform-origin:{origin}", "")
+
+    if key == "blur":
+        blur = BLURS.get(value) or _arbitrary(value)
+        return blur and ("filter", f"filter:blur({blur})", "")
+    if key == "backdrop-blur":
+        blur = BLURS.get(value) or _arbitrary(value)
+        return blur and ("backdrop-filter", f"-webkit-backdrop-filter:blur({blur});backdrop-filter:blur({blur})", "")
+    if key in ("brightness", "contrast", "saturate") and value.isdigit():
+        return "filter", f"filter:{key}({int(value) / 100:g})", ""
+    if key == "transition":
+        props = TRANSITION_PROPERTIES.get(value)
+        if value == "none":
+            return "transition-property", "transition-property:none", ""
+        return props and (
+            "transition-property",
+            f"transition-property:{props};transition-timing-function:cubic-bezier(0.4,0,0.2,1);transition-duration:150ms",
+            "",
+        )
+    if key in ("duration", "delay") and value.isdigit():
+        group = "transition-duration" if key == "duration" else "transition-delay"
+        return group, f"transition-{'duration' if key == 'duration' else 'delay'}:{value}ms", ""
+    if key == "animate":
+        animation = ANIMATIONS.get(value)
+        return animation and ("animation", f"animation:{animation}", "")
+    return None
+
+
+def _resolve(utility: str) -> Optional[Tuple[str, str, str]]:
+    if utility in STATIC:
+        group, css = STATIC[utility]
+        return group, css, ""
+    # Bare forms of functional utilities
+    if utility in BORDER_SIDES:
+        return "border-width", _props(BORDER_SIDES[utility], "1px"), ""
+    if utility in ("rounded", "shadow", "blur", "backdrop-blur", "transition"):
+        return _resolve_functional(utility, "", False)
+    if utility in ("divide-x", "divide-y"):
+        return _resolve_functional(utility, "1", False)
+    if utility == "ring":
+        return _resolve_functional("ring", "3", False)
+
+    negative = utility.startswith("-")
+    if negative:
+        utility = utility[1:]
+    # Try the longest key first: "border-t-2" is key "border-t", "border-gray-200" is key "border"
+    index = len(utility)
+    while True:
+        index = utility.rfind("-", 0, index)
+        if index <= 0:
+            return None
+        resolved = _resolve_functional(utility[:index], utility[index + 1:], negative)
+        if resolved:
+            return resolved
+
+
+def _split_variants(name: str) -> List[str]:
+    parts, depth, start = [], 0, 0
+    for index, char in enumerate(name):
+        if char == "[":
+            depth += 1
+        elif char == "]":
+            depth -= 1
+        elif char == ":" and depth == 0:
+            parts.append(name[start:index])
+            start = index + 1
+    parts.append(name[start:])
+    return parts
+
+
+def _escape(name: str) -> str:
+    escaped = []
+    for index, char in enumerate(name):
+        if char.isalnum() or char in "-_":
+            if index == 0 and char.isdigit():
+                escaped.append(f"\\3{char} ")
+            else:
+                escaped.append(char)
+        else:
+            escaped.append("\\" + char)
+    return "".join(escaped)
+
+
+_BREAKPOINT_ORDER = {name: index + 1 for index, (name, _) in enumerate(BREAKPOINTS)}
+_DARK = len(BREAKPOINTS) + 1
+
+
+@lru_cache(maxsize=8192)
+def _rule(candidate: str) -> Optional[Tuple[int, int, int, str, str]]:
+    """Compile one class name to (media slot, order, variant depth, css, keyframe)"""
+    *variants, utility = _split_variants(candidate)
+    important = utility.startswith("!")
+    if important:
+        utility = utility[1:]
+    if not utility:
+        return None
+
+    if utility == "container" and not variants:
+        rules = [".container{width:100%}"] + [
+            f"@media (min-width:{width}px){{.container{{max-width:{width}px}}}}" for _, width in BREAKPOINTS
+        ]
+        return 0, -1, 0, "".join(rules), ""
+
+    resolved = _resolve(utility)
+    if resolved is None:
+        return None
+    group, css, suffix = resolved
+
+    media = 0
+    prefix = ""
+    pseudo = ""
+    for variant in variants:
+        if variant in _BREAKPOINT_ORDER and not media:
+            media = _BREAKPOINT_ORDER[variant]
+        elif variant == "dark" and not media:
+            media = _DARK
+        elif variant in PSEUDO_VARIANTS:
+            pseudo += PSEUDO_VARIANTS[variant]
+        elif variant in GROUP_VARIANTS:
+            prefix = f".group{GROUP_VARIANTS[variant]} "
+        elif variant == "placeholder":
+            suffix = "::placeholder"
+        else:
+            return None
+
+    if important:
+        css = ";".join(f"{declaration}!important" for declaration in css.split(";"))
+    selector = f"{prefix}.{_escape(candidate)}{pseudo}{suffix}"
+    keyframes = KEYFRAMES.get(utility[8:], "") if utility.startswith("animate-") else ""
+    return media, _ORDER[group], len(variants), f"{selector}{{{css}}}", keyframes
+
+
+PREFLIGHT = (
+    "*,::before,::after{box-sizing:border-box;border-width:0;border-style:solid;border-color:#e5e7eb}"
+    "::before,::after{--tw-content:''}"
+    f"html{{line-height:1.5;-webkit-text-size-adjust:100%;-moz-tab-size:4;tab-size:4;font-family:{FONT_FAMILIES['sans']}}}"
+    "body{margin:0;line-height:inherit}"
+    "hr{height:0;color:inherit;border-top-width:1px}"
+    "h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}"
+    "a{color:inherit;text-decoration:inherit}"
+    "b,strong{font-weight:bolder}"
+    f"code,kbd,samp,pre{{font-family:{FONT_FAMILIES['mono']};font-size:1em}}"
+    "small{font-size:80%}"
+    "sub,sup{font-size:75%;line-height:0;position:relative;vertical-align:baseline}sub{bottom:-.25em}sup{top:-.5em}"
+    "table{text-indent:0;border-color:inherit;border-collapse:collapse}"
+    "button,input,optgroup,select,textarea{font-family:inherit;font-size:100%;font-weight:inherit;line-height:inherit;color:inherit;margin:0;padding:0}"
+    "button,select{text-transform:none}"
+    "button,[type='button'],[type='reset'],[type='submit']{-webkit-appearance:button;background-color:transparent;background-image:none}"
+    ":-moz-focusring{outline:auto}"
+    "progress{vertical-align:baseline}"
+    "::-webkit-inner-spin-button,::-webkit-outer-spin-button{height:auto}"
+    "[type='search']{-webkit-appearance:textfield;outline-offset:-2px}"
+    "::-webkit-search-decoration{-webkit-appearance:none}"
+    "::-webkit-file-upload-button{-webkit-appearance:button;font:inherit}"
+    "summary{display:list-item}"
+    "blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}"
+    "fieldset{margin:0;padding:0}legend{padding:0}"
+    "ol,ul,menu{list-style:none;margin:0;padding:0}"
+    "textarea{resize:vertical}"
+    "input::placeholder,textarea::placeholder{opacity:1;color:#9ca3af}"
+    "button,[role='button']{cursor:pointer}"
+    ":disabled{cursor:default}"
+    "img,svg,video,canvas,audio,iframe,embed,object{display:block;vertical-align:middle}"
+    "img,video{max-width:100%;height:auto}"
+    "[hidden]{display:none}"
+    "*,::before,::after{--tw-translate-x:0;--tw-translate-y:0;--tw-rotate:0;--tw-skew-x:0;--tw-skew-y:0;"
+    "--tw-scale-x:1;--tw-scale-y:1;--tw-ring-offset-shadow:0 0 #0000;--tw-ring-shadow:0 0 #0000;--tw-shadow:0 0 #0000}"
+)
+
+# Anything that can't appear in a class name separates candidates
+_CANDIDATE_SPLIT = re.compile(r"[\s\"'`<>={};]+")
+
+
+def extract_classes(html: str) -> Set[str]:
+    """Candidate class names in a page, including ones only mentioned in scripts"""
+    candidates = set()
+    for token in _CANDIDATE_SPLIT.split(html):
+        if token:
+            candidates.add(token)
+            stripped = token.rstrip(".,:)")
+            if stripped and stripped != token:
+                candidates.add(stripped)
+    return candidates
+
+
+@lru_cache(maxsize=256)
+def _build(classes: FrozenSet[str], preflight: bool) -> str:
+    # Keyed on the resolved classes only, so pages sharing a design share the entry
+    rules = []
+    keyframes = set()
+    for candidate in classes:
+        rule = _rule(candidate)
+        if rule is not None:
+            media, order, depth, css, frames = rule
+            rules.append((media, order, depth, candidate, css))
+            if frames:
+                keyframes.add(frames)
+    rules.sort()
+
+    parts = [PREFLIGHT] if preflight else []
+    open_media = 0
+    for media, _, _, _, css in rules:
+        if media != open_media:
+            if open_media:
+                parts.append("}")
+            if media == _DARK:
+                parts.append("@media (prefers-color-scheme:dark){")
+            else:
+                parts.append(f"@media (min-width:{BREAKPOINTS[media - 1][1]}px){{")
+            open_media = media
+        parts.append(css)
+    if open_media:
+        parts.append("}")
+    parts.extend(sorted(keyframes))
+    return "".join(parts)
+
+
+def build_stylesheet(classes: Iterable[str], preflight: bool = True) -> str:
+    """Minimal CSS for the given class names, in Tailwind's cascade order"""
+    return _build(frozenset(name for name in classes if _rule(name) is not None), preflight)
+
+
+def stylesheet_for(html: str, preflight: bool = True) -> str:
+    """Minimal CSS for every Tailwind utility a page uses"""
+    return build_stylesheet(extract_classes(html), preflight)
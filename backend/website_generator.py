@@ -1,37 +1,101 @@
-from typing import Dict, Any
-import os
+from typing import Dict, Any, AsyncIterator, Optional, Set
+import asyncio
 import logging
+import os
+import threading
+import time
 from datetime import datetime
+from functools import lru_cache
+from html import escape
 
-from google import genai
+import metrics
+from async_runner import AsyncRunner
+from generation_cache import GenerationCache, make_cache_key
+from generation_store import GenerationStore
+from html_cleaner import HtmlCleaner, clean_html
+from output_compression import minify_html
+from page_optimizer import optimize_page
+from profiling import StageTimings
+from resilience import (
+    CircuitBreaker,
+    Deadline,
+    DeadlineExceeded,
+    LatencyTracker,
+    RetryPolicy,
+    call_with_retries,
+    within_deadline,
+)
+from section_editor import build_edit_prompt, locate_section, splice
+from similarity_index import SimilarityIndex, jaccard
+from single_flight import SingleFlight
+from tailwind_css import stylesheet_for
+from model_backends import DEFAULT_MODEL, ModelBackend, create_backend
 
 logger = logging.getLogger(__name__)
 
-class WebsiteGeneratorGraph:
-    """Simplified website generator using Google Gemini 2.5 Flash"""
-    
-    def __init__(self):
-        self.api_key = os.getenv("GEMINI_API_KEY")
-        if not self.api_key:
-            raise ValueError("GEMINI_API_KEY environment variable is required")
-        
-        # Configure Gemini client and model instance using new google.genai SDK
-        self.client = genai.Client(api_key=self.api_key)
+# Configuration shared by every entry point: the Flask app, the ASGI app and
+# the serverless handlers in api/
+GENERATION_MODEL = os.getenv("GENERATION_MODEL", DEFAULT_MODEL)
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "64"))
+OUTPUT_MINIFY = os.getenv("OUTPUT_MINIFY", "true").lower() != "false"
+# Lazy images, non-blocking scripts and fonts, plus a page weight estimate
+OUTPUT_OPTIMIZE = os.getenv("OUTPUT_OPTIMIZE", "true").lower() != "false"
+# End-to-end budget per generation; model retries and hedges must fit in it
+GENERATION_DEADLINE_SECONDS = float(os.getenv("GENERATION_DEADLINE_SECONDS", "90"))
+MODEL_MAX_ATTEMPTS = int(os.getenv("MODEL_MAX_ATTEMPTS", "3"))
+MODEL_RETRY_BASE_SECONDS = float(os.getenv("MODEL_RETRY_BASE_SECONDS", "0.5"))
+MODEL_RETRY_MAX_SECONDS = float(os.getenv("MODEL_RETRY_MAX_SECONDS", "8"))
+# Hedging sends a second copy of a call still running at the p95 latency
+MODEL_HEDGE_ENABLED = os.getenv("MODEL_HEDGE_ENABLED", "false").lower() == "true"
+MODEL_HEDGE_PERCENTILE = float(os.getenv("MODEL_HEDGE_PERCENTILE", "0.95"))
+# Consecutive model failures that open the circuit breaker, and how long it
+# stays open before letting a probe through
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RECOVERY_SECONDS = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+# Near-duplicate prompts (shingle Jaccard similarity at or above the
+# threshold) are answered with an earlier prompt's cached result. Off by
+# default: prompts differing in one detail (a city, a colour, a product name)
+# still score 0.75-0.8, so the threshold must stay high
+SIMILAR_CACHE_ENABLED = os.getenv("SIMILAR_CACHE_ENABLED", "false").lower() == "true"
+SIMILARITY_THRESHOLD = float(os.getenv("SIMILARITY_THRESHOLD", "0.95"))
+SIMILARITY_INDEX_PATH = os.getenv(
+    "SIMILARITY_INDEX_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "similarity.idx"),
+)
 
-        logger.info("Website generator initialized with Gemini 2.5 Flash")
-    
-    async def generate_website(self, prompt: str) -> Dict[str, Any]:
-        """Generate a complete website from a prompt"""
-        logger.info(f"Starting website generation for: {prompt[:100]}...")
-        
-        try:
-            # Create an enhanced prompt for better results
-            enhanced_prompt = f"""
+MODEL_CALL_SECONDS = metrics.histogram("generation_model_call_seconds", "Time spent waiting on the model per call")
+CLEAN_SECONDS = metrics.histogram("generation_clean_seconds", "Time spent cleaning model output per generation")
+GENERATION_SECONDS = metrics.histogram("generation_seconds", "End-to-end generation latency including cache hits and fallbacks")
+OUTPUT_BYTES = metrics.histogram("generation_output_bytes", "Size of the cleaned HTML returned", metrics.SIZE_BUCKETS)
+FALLBACKS = metrics.counter("generation_fallbacks_total", "Generations answered with the fallback page")
+ERRORS = metrics.counter("generation_errors_total", "Failed model calls, empty responses and stream failures")
+CACHE_HITS = metrics.counter("generation_cache_hits_total", "Generations served from the result cache")
+CACHE_MISSES = metrics.counter("generation_cache_misses_total", "Generations that missed the result cache")
+SIMILAR_HITS = metrics.counter("generation_similar_hits_total", "Generations served from the cached result of a near-duplicate prompt")
+COALESCED = metrics.counter("generation_coalesced_total", "Requests that joined an identical in-flight generation")
+EDIT_SECONDS = metrics.histogram("section_edit_seconds", "End-to-end latency of section edits")
+IN_FLIGHT = metrics.gauge("generation_in_flight", "Generations currently in progress")
+
+# Style hints that push design variants of the same prompt apart
+VARIANT_STYLES = [
+    "clean and minimal with generous whitespace",
+    "bold and colorful with strong gradients",
+    "dark theme with vibrant accent colors",
+    "playful with rounded shapes and illustrations",
+    "elegant and editorial with serif headings",
+    "corporate and structured with a card grid",
+    "glassmorphism with soft translucent panels",
+    "retro-inspired with warm muted tones",
+]
+MAX_VARIANTS = len(VARIANT_STYLES)
+
+ENHANCED_PROMPT_TEMPLATE = """
 Create a complete, modern, and visually stunning HTML website based on this description: "{prompt}"
 
 Requirements:
 1. Use modern HTML5 semantic elements
-2. Include Tailwind CSS classes for beautiful styling (use CDN)
+2. Style with standard Tailwind CSS utility classes (a static stylesheet is built from the classes you use, so do not add a Tailwind script tag)
 3. Make it fully responsive for all devices
 4. Add smooth animations and hover effects
 5. Include proper structure with header, main content, and footer
@@ -53,76 +117,21 @@ The HTML should be production-ready and look professional with:
 
 Make it visually appealing and interactive!
 """
+# Split once at import; building a prompt is then two concatenations
+_PROMPT_PREFIX, _PROMPT_SUFFIX = ENHANCED_PROMPT_TEMPLATE.split("{prompt}")
 
-            logger.info("Sending request to Gemini...")
 
-            # Generate content with Gemini using the new SDK
-            response = self.client.models.generate(
-                model="gemini-2.5-flash",
-                contents=enhanced_prompt,
-            )
+def build_prompt(prompt: str, style: Optional[str] = None) -> str:
+    """The model prompt for a description, with an optional visual style hint"""
+    enhanced_prompt = _PROMPT_PREFIX + prompt + _PROMPT_SUFFIX
+    if style:
+        enhanced_prompt += f"\nVisual style for this version: {style}.\n"
+    return enhanced_prompt
 
-            # The new SDK returns a response with a text property as well
-            if not getattr(response, "text", None):
-                raise Exception("No content generated by Gemini")
 
-            generated_code = response.text.strip()
-            logger.info(f"Generated code length: {len(generated_code)}")
-            
-            # Clean up the response
-            cleaned_code = self._clean_html_response(generated_code)
-            
-            logger.info("Website generated successfully")
-            
-            return {
-                "html_code": cleaned_code,
-                "metadata": {
-                    "generation_timestamp": datetime.now().isoformat(),
-                    "model": "gemini-2.5-flash",
-                    "original_length": len(generated_code),
-                    "cleaned_length": len(cleaned_code)
-                },
-                "requirements": {"prompt": prompt},
-                "errors": []
-            }
-            
-        except Exception as e:
-            error_msg = f"Website generation failed: {str(e)}"
-            logger.error(error_msg)
-            
-            # Return a fallback HTML if generation fails
-            fallback_html = self._create_fallback_html(prompt)
-            
-            return {
-                "html_code": fallback_html,
-                "metadata": {
-                    "generation_timestamp": datetime.now().isoformat(),
-                    "model": "fallback",
-                    "error": error_msg
-                },
-                "requirements": {"prompt": prompt},
-                "errors": [error_msg]
-            }
-    
-    def _clean_html_response(self, html: str) -> str:
-        """Clean up HTML response from Gemini"""
-        # Remove markdown code blocks
-        html = html.replace("```html", "").replace("```", "")
-        
-        # Remove any full document structure if present
-        html = html.replace("<!DOCTYPE html>", "")
-        html = html.replace("<html>", "").replace("</html>", "")
-        html = html.replace("<body>", "").replace("</body>", "")
-        
-        # Remove head section if present
-        import re
-        html = re.sub(r'<head[^>]*>.*?</head>', '', html, flags=re.DOTALL | re.IGNORECASE)
-        
-        return html.strip()
-    
-    def _create_fallback_html(self, prompt: str) -> str:
-        """Create a fallback HTML when generation fails"""
-        return f'''
+# Rendered once at import; only the echoed prompt varies per request, so the
+# fallback is two concatenations and its stylesheet is built once
+FALLBACK_HTML_TEMPLATE = '''
 <div class="min-h-screen bg-gradient-to-br from-blue-50 to-indigo-100">
     <!-- Navigation -->
     <nav class="bg-white shadow-lg">
@@ -221,46 +230,647 @@ Make it visually appealing and interactive!
 
 <script>
 // Smooth scrolling for navigation links
-document.querySelectorAll('a[href^="#"]').forEach(anchor => {{
-    anchor.addEventListener('click', function (e) {{
+document.querySelectorAll('a[href^="#"]').forEach(anchor => {
+    anchor.addEventListener('click', function (e) {
         e.preventDefault();
         const target = document.querySelector(this.getAttribute('href'));
-        if (target) {{
-            target.scrollIntoView({{
+        if (target) {
+            target.scrollIntoView({
                 behavior: 'smooth',
                 block: 'start'
-            }});
-        }}
-    }});
-}});
+            });
+        }
+    });
+});
 
 // Add fade-in animation on scroll
-const observerOptions = {{
+const observerOptions = {
     threshold: 0.1,
     rootMargin: '0px 0px -50px 0px'
-}};
+};
 
-const observer = new IntersectionObserver((entries) => {{
-    entries.forEach(entry => {{
-        if (entry.isIntersecting) {{
+const observer = new IntersectionObserver((entries) => {
+    entries.forEach(entry => {
+        if (entry.isIntersecting) {
             entry.target.style.opacity = '1';
             entry.target.style.transform = 'translateY(0)';
-        }}
-    }});
-}}, observerOptions);
+        }
+    });
+}, observerOptions);
 
 // Observe sections for animation
-document.querySelectorAll('section').forEach(section => {{
+document.querySelectorAll('section').forEach(section => {
     section.style.opacity = '0';
     section.style.transform = 'translateY(20px)';
     section.style.transition = 'opacity 0.6s ease, transform 0.6s ease';
     observer.observe(section);
-}});
+});
 
 // Form handling
-document.querySelector('form').addEventListener('submit', function(e) {{
+document.querySelector('form').addEventListener('submit', function(e) {
     e.preventDefault();
     alert('Thank you for your message! This is a demo form.');
-}});
+});
 </script>
 '''
+_FALLBACK_PREFIX, _FALLBACK_SUFFIX = FALLBACK_HTML_TEMPLATE.split("{prompt}")
+
+
+@lru_cache(maxsize=1)
+def fallback_stylesheet() -> str:
+    return stylesheet_for(_FALLBACK_PREFIX + _FALLBACK_SUFFIX)
+
+
+class WebsiteGeneratorGraph:
+    """Simplified website generator backed by a pluggable model (Gemini 2.5 Flash by default)"""
+    
+    def __init__(
+        self,
+        cache: Optional[GenerationCache] = None,
+        max_concurrency: int = GENERATION_CONCURRENCY,
+        backend: Optional[ModelBackend] = None,
+        minify: bool = OUTPUT_MINIFY,
+        optimize: bool = OUTPUT_OPTIMIZE,
+        deadline_seconds: float = GENERATION_DEADLINE_SECONDS,
+        retry_policy: Optional[RetryPolicy] = None,
+        hedge: bool = MODEL_HEDGE_ENABLED,
+        breaker: Optional[CircuitBreaker] = None,
+        similar: Optional[SimilarityIndex] = None,
+        store: Optional[GenerationStore] = None,
+    ):
+        # Gemini by default; MODEL_BACKEND=stub swaps in the offline stub
+        self.backend = backend or create_backend(model=GENERATION_MODEL)
+        self.cache = cache
+        # Only consulted together with the cache, which holds the results it points to
+        self.similar = similar if cache is not None else None
+        # Gives each successful result a stable id it can be fetched by later
+        self.store = store
+        # Background writes to the store; referenced so they aren't collected mid-flight
+        self._storing: Set["asyncio.Future"] = set()
+        self.minify = minify
+        self.optimize = optimize
+        # Bounds in-flight model calls; all callers share one event loop
+        self._model_slots = asyncio.Semaphore(max_concurrency)
+        self.single_flight = SingleFlight()
+        self.deadline_seconds = deadline_seconds
+        self.retry_policy = retry_policy or RetryPolicy(
+            MODEL_MAX_ATTEMPTS, MODEL_RETRY_BASE_SECONDS, MODEL_RETRY_MAX_SECONDS
+        )
+        self.hedge = hedge
+        # Recent successful call latencies; their p95 is the hedging delay
+        self.latencies = LatencyTracker()
+        # While open, model calls fail fast and requests get the cache or the fallback
+        self.breaker = breaker or CircuitBreaker(
+            CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_SECONDS, CIRCUIT_HALF_OPEN_PROBES
+        )
+
+        logger.info(f"Website generator initialized with {self.backend.model}")
+    
+    async def generate_website(self, prompt: str) -> Dict[str, Any]:
+        """Generate a complete website from a prompt.
+
+        Per-stage timings in milliseconds are returned under ``metadata.timings``.
+        The whole generation, retries included, must fit in ``deadline_seconds``.
+        """
+        timings = StageTimings()
+        deadline = Deadline(self.deadline_seconds)
+        IN_FLIGHT.inc()
+        try:
+            result = await self._generate_website(prompt, timings, deadline)
+        finally:
+            IN_FLIGHT.dec()
+            GENERATION_SECONDS.observe(time.perf_counter() - timings.started)
+        result["metadata"]["timings"] = timings.as_dict()
+        OUTPUT_BYTES.observe(len(result["html_code"]))
+        return result
+
+    async def _generate_website(self, prompt: str, timings: StageTimings, deadline: Deadline) -> Dict[str, Any]:
+        logger.info(f"Starting website generation for: {prompt[:100]}...")
+
+        cache_key = self.cache_key(prompt)
+        if self.cache is not None:
+            with timings.stage("cache_lookup"):
+                cached = await self._cache_get(cache_key)
+            if cached is not None:
+                logger.info("Serving website from generation cache")
+                CACHE_HITS.inc()
+                cached["metadata"]["cache"] = "hit"
+                return cached
+            CACHE_MISSES.inc()
+
+        if self.similar is not None:
+            with timings.stage("similarity_lookup"):
+                similar = await self._similar_result(prompt)
+            if similar is not None:
+                return similar
+        
+        waited = time.perf_counter()
+        try:
+            # Identical prompts arriving while a call is in flight share it
+            result, shared = await self.single_flight.do(
+                cache_key, lambda: self._generate_result(prompt, cache_key, deadline)
+            )
+            result = dict(result, metadata=dict(result["metadata"], coalesced=shared))
+            # Stages of the shared call, as seen by whichever caller started it
+            timings.stages.update(result["metadata"]["timings"])
+            result["metadata"]["cache"] = "miss"
+            if shared:
+                COALESCED.inc()
+            return result
+            
+        except Exception as e:
+            error_msg = f"Website generation failed: {str(e)}"
+            logger.error(error_msg)
+            timings.add("model_call", time.perf_counter() - waited)
+            
+            # Return a fallback HTML if generation fails
+            with timings.stage("fallback"):
+                return self._build_fallback(prompt, error_msg)
+
+    async def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        """A cached result; memory hits are served inline, the SQLite read runs in a thread"""
+        cached = self.cache.get_memory(key)
+        if cached is not None:
+            return cached
+        if self.cache.persistent:
+            return await asyncio.to_thread(self.cache.get, key)
+        # Memory only: get() just records the miss
+        return self.cache.get(key)
+
+    async def _similar_result(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """The cached result of the most similar earlier prompt, if close enough.
+
+        Index estimates are noisy, so each candidate is confirmed with the
+        exact similarity to the prompt stored with its cached result.
+        """
+        for key, _ in self.similar.lookup(prompt):
+            cached = await self._cache_get(key)
+            if cached is None:
+                # Expired or invalidated since it was indexed
+                await asyncio.to_thread(self.similar.discard, key)
+                continue
+            similarity = jaccard(prompt, cached["requirements"]["prompt"])
+            if similarity >= self.similar.threshold:
+                break
+        else:
+            return None
+        logger.info(f"Serving website from a similar prompt (similarity {similarity:.2f})")
+        SIMILAR_HITS.inc()
+        cached["metadata"]["cache"] = "similar"
+        cached["metadata"]["similarity"] = round(similarity, 3)
+        cached["metadata"]["similar_prompt"] = cached["requirements"]["prompt"]
+        cached["requirements"] = {"prompt": prompt}
+        return cached
+
+    async def _generate_result(self, prompt: str, cache_key: str, deadline: Deadline) -> Dict[str, Any]:
+        """Call the model once and build (and cache) the result"""
+        timings = StageTimings()
+
+        # Create an enhanced prompt for better results
+        with timings.stage("prompt_build"):
+            enhanced_prompt = build_prompt(prompt)
+
+        with timings.stage("model_call"):
+            generated_code = await self._call_model(enhanced_prompt, deadline=deadline)
+        
+        # Clean up the response
+        with timings.stage("clean"):
+            cleaned_code = self._clean_html_response(generated_code)
+
+        if self.minify:
+            with timings.stage("minify"):
+                cleaned_code = minify_html(cleaned_code)
+        
+        logger.info("Website generated successfully")
+        
+        with timings.stage("stylesheet"):
+            stylesheet = stylesheet_for(cleaned_code)
+
+        page_weight = None
+        if self.optimize:
+            with timings.stage("optimize"):
+                cleaned_code, page_weight = optimize_page(cleaned_code, stylesheet)
+
+        with timings.stage("cache_store"):
+            result = await self._build_result(prompt, cache_key, generated_code, cleaned_code, stylesheet, page_weight)
+        # Added after caching so cache hits don't report stale timings
+        result["metadata"]["timings"] = timings.as_dict(total=False)
+        return result
+
+    async def _call_model(
+        self,
+        contents: str,
+        temperature: Optional[float] = None,
+        seed: Optional[int] = None,
+        deadline: Optional[Deadline] = None,
+    ) -> str:
+        """Call the model and return its text, retrying transient failures.
+
+        Retries back off with jitter and stop when ``deadline`` (a fresh
+        ``deadline_seconds`` budget by default) can't fit another attempt.
+        With hedging on, an attempt still running at the p95 latency of recent
+        calls gets a second copy and the first to finish wins.
+        """
+        deadline = deadline or Deadline(self.deadline_seconds)
+        generated_code = await call_with_retries(
+            lambda: self._attempt_model_call(contents, temperature, seed, deadline),
+            deadline,
+            self.retry_policy,
+            self._hedge_delay if self.hedge else None,
+        )
+        logger.info(f"Generated code length: {len(generated_code)}")
+        return generated_code
+
+    async def _attempt_model_call(
+        self, contents: str, temperature: Optional[float], seed: Optional[int], deadline: Deadline
+    ) -> str:
+        """Run one model call within the concurrency limit"""
+        logger.info(f"Sending request to {self.backend.model}...")
+
+        # The slot comes first: time queued behind local calls says nothing
+        # about the model, so only the call itself goes through the breaker
+        async with self._model_slots:
+            with self.breaker.guard(deadline):
+                started = time.perf_counter()
+                try:
+                    text = await self.backend.agenerate(contents, temperature=temperature, seed=seed)
+                except Exception:
+                    ERRORS.inc()
+                    raise
+                finally:
+                    MODEL_CALL_SECONDS.observe(time.perf_counter() - started)
+
+                if not text:
+                    ERRORS.inc()
+                    raise Exception("No content generated by the model")
+        # A non-streamed call delivers its first byte with the whole response
+        self.latencies.record(time.perf_counter() - started)
+        return text.strip()
+
+    def _hedge_delay(self) -> Optional[float]:
+        return self.latencies.percentile(MODEL_HEDGE_PERCENTILE)
+
+    async def generate_variants(self, prompt: str, count: int, max_parallel: int = 4) -> AsyncIterator[Dict[str, Any]]:
+        """Generate ``count`` alternative designs concurrently.
+
+        Variants differ by style hint, temperature and seed. Each result is
+        yielded as soon as its model call finishes, so the total wall-clock time
+        tracks the slowest call rather than the sum of all of them. Variants are
+        not cached or coalesced because they are meant to differ.
+        """
+        count = max(1, min(count, MAX_VARIANTS))
+        logger.info(f"Starting {count} website variants for: {prompt[:100]}...")
+        parallel = asyncio.Semaphore(max_parallel)
+
+        async def run_variant(index: int) -> Dict[str, Any]:
+            async with parallel:
+                return await self._generate_variant(prompt, index)
+
+        tasks = [asyncio.ensure_future(run_variant(index)) for index in range(count)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _generate_variant(self, prompt: str, index: int) -> Dict[str, Any]:
+        style = VARIANT_STYLES[index % len(VARIANT_STYLES)]
+        temperature = round(min(0.6 + 0.15 * index, 1.5), 2)
+        variant = {"index": index, "style": style, "temperature": temperature, "seed": index}
+
+        try:
+            enhanced_prompt = build_prompt(prompt, style)
+            generated_code = await self._call_model(enhanced_prompt, temperature=temperature, seed=index)
+            cleaned_code = self._clean_html_response(generated_code)
+            if self.minify:
+                cleaned_code = minify_html(cleaned_code)
+            stylesheet = stylesheet_for(cleaned_code)
+            page_weight = None
+            if self.optimize:
+                cleaned_code, page_weight = optimize_page(cleaned_code, stylesheet)
+            result = {
+                "html_code": cleaned_code,
+                "stylesheet": stylesheet,
+                "metadata": {
+                    "generation_timestamp": datetime.now().isoformat(),
+                    "model": self.backend.model,
+                    "original_length": len(generated_code),
+                    "cleaned_length": len(cleaned_code),
+                },
+                "requirements": {"prompt": prompt},
+                "errors": []
+            }
+            if page_weight is not None:
+                result["metadata"]["page_weight"] = page_weight
+        except Exception as e:
+            error_msg = f"Website variant generation failed: {str(e)}"
+            logger.error(error_msg)
+            result = self._build_fallback(prompt, error_msg)
+
+        result["metadata"]["variant"] = variant
+        self._remember(result)
+        return result
+
+    async def edit_section(self, html: str, target: str, instruction: str) -> Dict[str, Any]:
+        """Regenerate one section of a page and splice it back in.
+
+        Only the targeted element and a summary of the page's classes are sent
+        to the model, so cost scales with the section rather than the page.
+        Raises ``SectionNotFound`` when the target is not in the document; if
+        the model call fails the page is returned unchanged with the error.
+        """
+        logger.info(f"Editing section {target}: {instruction[:100]}...")
+        timings = StageTimings()
+        errors = []
+
+        with timings.stage("locate"):
+            start, end = locate_section(html, target)
+
+        with timings.stage("prompt_build"):
+            edit_prompt = build_edit_prompt(html, start, end, instruction)
+
+        try:
+            with timings.stage("model_call"):
+                generated_code = await self._call_model(edit_prompt)
+            with timings.stage("clean"):
+                fragment = self._clean_html_response(generated_code)
+            if self.minify:
+                with timings.stage("minify"):
+                    fragment = minify_html(fragment)
+            if self.optimize:
+                # An edited section is rarely the hero, so its images all load lazily
+                with timings.stage("optimize"):
+                    fragment, _ = optimize_page(fragment, eager_images=0)
+            with timings.stage("splice"):
+                html_code = splice(html, start, end, fragment)
+        except Exception as e:
+            error_msg = f"Section edit failed: {str(e)}"
+            logger.error(error_msg)
+            errors.append(error_msg)
+            fragment = html[start:end]
+            html_code = html
+
+        with timings.stage("stylesheet"):
+            stylesheet = stylesheet_for(html_code)
+        EDIT_SECONDS.observe(time.perf_counter() - timings.started)
+
+        result = {
+            "html_code": html_code,
+            "stylesheet": stylesheet,
+            "metadata": {
+                "generation_timestamp": datetime.now().isoformat(),
+                "model": self.backend.model,
+                "edit": {
+                    "target": target,
+                    "applied": not errors,
+                    "original_fragment_length": end - start,
+                    "fragment_length": len(fragment),
+                    "prompt_length": len(edit_prompt),
+                },
+                "timings": timings.as_dict(),
+            },
+            "requirements": {"instruction": instruction},
+            "errors": errors
+        }
+        self._remember(result)
+        return result
+
+    async def stream_website(self, prompt: str) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a website generation as events.
+
+        Yields ``chunk`` events carrying HTML as the model produces it and ends
+        with a ``done`` event carrying the same metadata as ``generate_website``.
+        A ``reset`` event tells the client to discard everything received so far
+        because the stream failed and fallback HTML follows.
+        """
+        logger.info(f"Starting streamed website generation for: {prompt[:100]}...")
+
+        cache_key = self.cache_key(prompt)
+        if self.cache is not None:
+            cached = await self._cache_get(cache_key)
+            if cached is not None:
+                logger.info("Serving streamed website from generation cache")
+                CACHE_HITS.inc()
+                cached["metadata"]["cache"] = "hit"
+                yield {"event": "chunk", "data": {"html": cached.pop("html_code")}}
+                yield {"event": "done", "data": cached}
+                return
+            CACHE_MISSES.inc()
+
+        timings = StageTimings()
+        deadline = Deadline(self.deadline_seconds)
+        IN_FLIGHT.inc()
+        parts = []
+        cleaned_parts = []
+        cleaner = HtmlCleaner()
+        try:
+            enhanced_prompt = build_prompt(prompt)
+
+            logger.info(f"Sending streaming request to {self.backend.model}...")
+            async with self._model_slots:
+                if deadline.expired:
+                    # Spent queued for a slot; the model was never called
+                    raise DeadlineExceeded("Deadline exceeded waiting for a model slot")
+                with self.breaker.guard(deadline):
+                    model_started = time.perf_counter()
+                    try:
+                        async for text in within_deadline(self.backend.astream(enhanced_prompt), deadline):
+                            parts.append(text)
+                            with timings.stage("clean"):
+                                cleaned = cleaner.feed(text)
+                            if cleaned:
+                                cleaned_parts.append(cleaned)
+                                yield {"event": "chunk", "data": {"html": cleaned}}
+                    finally:
+                        MODEL_CALL_SECONDS.observe(time.perf_counter() - model_started)
+                        timings.add("model_call", time.perf_counter() - model_started)
+            with timings.stage("clean"):
+                cleaned = cleaner.close()
+            CLEAN_SECONDS.observe(timings.stages["clean"] / 1000)
+            if cleaned:
+                cleaned_parts.append(cleaned)
+                yield {"event": "chunk", "data": {"html": cleaned}}
+
+            generated_code = "".join(parts).strip()
+            if not generated_code:
+                raise Exception("No content generated by the model")
+            logger.info(f"Streamed code length: {len(generated_code)}")
+
+            # Chunks already went out as produced; what gets cached is minified and optimized
+            cleaned_code = "".join(cleaned_parts)
+            if self.minify:
+                with timings.stage("minify"):
+                    cleaned_code = minify_html(cleaned_code)
+            with timings.stage("stylesheet"):
+                stylesheet = stylesheet_for(cleaned_code)
+            page_weight = None
+            if self.optimize:
+                with timings.stage("optimize"):
+                    cleaned_code, page_weight = optimize_page(cleaned_code, stylesheet)
+            result = await self._build_result(prompt, cache_key, generated_code, cleaned_code, stylesheet, page_weight)
+            result["metadata"]["cache"] = "miss"
+
+        except Exception as e:
+            error_msg = f"Website generation failed: {str(e)}"
+            logger.error(error_msg)
+            ERRORS.inc()
+
+            with timings.stage("fallback"):
+                result = self._build_fallback(prompt, error_msg)
+            if cleaned_parts:
+                yield {"event": "reset", "data": {"error": error_msg}}
+            yield {"event": "chunk", "data": {"html": result["html_code"]}}
+
+        finally:
+            IN_FLIGHT.dec()
+            GENERATION_SECONDS.observe(time.perf_counter() - timings.started)
+
+        result["metadata"]["timings"] = timings.as_dict()
+        OUTPUT_BYTES.observe(len(result.pop("html_code")))
+        yield {"event": "done", "data": result}
+
+    async def _build_result(
+        self,
+        prompt: str,
+        cache_key: str,
+        generated_code: str,
+        cleaned_code: str,
+        stylesheet: str,
+        page_weight: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Assemble a successful generation result and store it (and its id) in the cache"""
+        result = {
+            "html_code": cleaned_code,
+            "stylesheet": stylesheet,
+            "metadata": {
+                "generation_timestamp": datetime.now().isoformat(),
+                "model": self.backend.model,
+                "original_length": len(generated_code),
+                "cleaned_length": len(cleaned_code),
+                "cache_key": cache_key
+            },
+            "requirements": {"prompt": prompt},
+            "errors": []
+        }
+        if page_weight is not None:
+            result["metadata"]["page_weight"] = page_weight
+        self._remember(result)
+        if self.cache is not None:
+            # The disk tier commits to SQLite; keep that off the event loop
+            await asyncio.to_thread(self.cache.set, cache_key, result)
+            if self.similar is not None:
+                # Inserting shifts every band array; at a million entries that takes milliseconds
+                await asyncio.to_thread(self.similar.add, prompt, cache_key)
+        return result
+
+    def _remember(self, result: Dict[str, Any]) -> None:
+        """Store a successful result's page, record its id in the metadata and finish storing it in the background"""
+        if self.store is None or result["errors"]:
+            return
+        try:
+            generation_id, document, record = self.store.prepare(result)
+        except Exception as e:
+            logger.error(f"Failed to store generation: {e}")
+            return
+        result["metadata"]["generation_id"] = generation_id
+        # The page is on disk, so the id can be served and deployed at once;
+        # compression and the record write don't hold up the response
+        task = asyncio.ensure_future(asyncio.to_thread(self.store.put, generation_id, document, record))
+        self._storing.add(task)
+        task.add_done_callback(self._stored)
+
+    def _stored(self, task: "asyncio.Future") -> None:
+        self._storing.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Failed to store generation: {task.exception()}")
+
+    def _build_fallback(self, prompt: str, error_msg: str) -> Dict[str, Any]:
+        """Assemble the fallback result returned when generation fails"""
+        FALLBACKS.inc()
+        html_code = self._create_fallback_html(prompt)
+        return {
+            "html_code": html_code,
+            "stylesheet": fallback_stylesheet(),
+            "metadata": {
+                "generation_timestamp": datetime.now().isoformat(),
+                "model": "fallback",
+                "error": error_msg,
+                "cache": "miss",
+                "circuit_breaker": self.breaker.state
+            },
+            "requirements": {"prompt": prompt},
+            "errors": [error_msg]
+        }
+    
+    def cache_key(self, prompt: str) -> str:
+        """Cache key for a prompt under the current model and prompt template"""
+        return make_cache_key(prompt, self.backend.model, ENHANCED_PROMPT_TEMPLATE)
+
+    def _clean_html_response(self, html: str) -> str:
+        """Clean up HTML response from the model"""
+        with CLEAN_SECONDS.time():
+            return clean_html(html)
+    
+    def _create_fallback_html(self, prompt: str) -> str:
+        """Create a fallback HTML when generation fails"""
+        return _FALLBACK_PREFIX + escape(prompt) + _FALLBACK_SUFFIX
+
+
+def create_generator(
+    cache: Optional[GenerationCache] = None,
+    api_key: Optional[str] = None,
+    store: Optional[GenerationStore] = None,
+) -> WebsiteGeneratorGraph:
+    """A generator configured from the shared environment settings"""
+    backend = create_backend(model=GENERATION_MODEL, api_key=api_key)
+    similar = None
+    if cache is not None and SIMILAR_CACHE_ENABLED:
+        similar = SimilarityIndex(
+            threshold=SIMILARITY_THRESHOLD,
+            # An index built for another model or prompt template is discarded
+            namespace=make_cache_key("", backend.model, ENHANCED_PROMPT_TEMPLATE),
+            path=SIMILARITY_INDEX_PATH,
+        )
+    return WebsiteGeneratorGraph(cache=cache, backend=backend, similar=similar, store=store)
+
+
+# Serverless handlers keep one generator (and so one client and its keep-alive
+# connections) and one event loop per warm container
+_shared_generator: Optional[WebsiteGeneratorGraph] = None
+_shared_api_key: Optional[str] = None
+_shared_runner: Optional[AsyncRunner] = None
+_shared_lock = threading.Lock()
+
+
+def shared_generator() -> WebsiteGeneratorGraph:
+    """The process-wide generator, rebuilt if the API key rotated"""
+    global _shared_generator, _shared_api_key
+    api_key = os.getenv("GEMINI_API_KEY")
+    with _shared_lock:
+        if _shared_generator is None or _shared_api_key != api_key:
+            _shared_generator = create_generator(api_key=api_key)
+            _shared_api_key = api_key
+        return _shared_generator
+
+
+def shared_runner() -> AsyncRunner:
+    """The process-wide event loop runner, started on first use"""
+    global _shared_runner
+    with _shared_lock:
+        if _shared_runner is None:
+            _shared_runner = AsyncRunner(name="generation-loop")
+        return _shared_runner
+
+
+def warm_up() -> None:
+    """Pay one-time startup costs before the first request needs them.
+
+    Loads the model SDK, builds the shared generator and its client, starts the
+    event loop and primes the stylesheet builder.
+    """
+    started = time.perf_counter()
+    shared_generator()
+    shared_runner()
+    stylesheet_for("")
+    logger.info(f"Warm-up finished in {(time.perf_counter() - started) * 1000:.0f}ms")